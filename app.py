@@ -1,14 +1,46 @@
 import streamlit as st
-import requests
-import urllib.parse
-import base64
-import json
-import time
-from datetime import datetime
-from PIL import Image
-import io
+from datetime import datetime, time as dt_time
+import math
 import os
-import hashlib
+import random
+import time
+import uuid
+import zlib
+
+from studio.archive import export_filename, import_archive, iter_export
+from studio.batch import prefetch
+from studio.bundle import APP_MAX_ITEMS, bundle_filename, iter_bundle
+from studio.catalog import (AVAILABLE_MODELS, IMAGE_SIZES, MODEL_IDS_BY_NAME, PROMPT_TEMPLATES, STYLE_OPTIONS,
+                            TEMPLATE_TEXTS, get_model_id)
+from studio.compare import COMPARE_MAX_MODELS, contact_sheet, latency_rows, run_comparison
+from studio.downloads import DOWNLOAD_FORMATS, get_downloader
+from studio.http_client import get_client
+from studio.image_cache import get_image_cache
+from studio.gallery import GalleryCollection
+from studio.jobs import DONE, FAILED, QUEUED, RUNNING, GenerationJob, get_job_queue
+from studio.markup import model_details, style_tag, template_card_html
+from studio.metrics import RERUN_SECONDS, start_exporters, timed
+from studio.renditions import RENDITION_PRESETS, get_rendition_pipeline, upscaled_presets
+from studio.store import get_store
+from studio.template_search import Template, get_template_index
+from studio.thumbnails import get_thumbnail_pipeline
+
+# 模板搜索最多展示的结果数
+TEMPLATE_RESULTS = 30
+# 有任务进行时状态面板的刷新间隔（秒）与展示的任务数
+JOB_POLL_INTERVAL = 1.0
+JOB_PANEL_LIMIT = 6
+JOB_STATUS_LABELS = {QUEUED: "🕓 排队中", RUNNING: "⏳ 生成中", DONE: "✅ 已完成", FAILED: "❌ 失败"}
+# 主内容区的视图；每次运行只渲染当前视图
+VIEWS = ["🎨 创作工作台", "📚 提示词模板库", "🤖 模型对比", "🖼️ 作品画廊", "⭐ 我的收藏", "📜 生成历史"]
+# 这些前缀的控件状态在切换视图后仍需保留
+PERSISTENT_WIDGETS = ("user_prompt", "template_search", "style_", "gallery_", "favorites_", "history_", "compare_", "prefetch_favorites")
+# 分页大小：网格每页 3x3，历史每页 20 条；无论翻到第几页，每次渲染的控件数都不变
+GRID_PAGE_SIZE = 9
+HISTORY_PAGE_SIZE = 20
+EXPORT_FORMATS = {"ndjson": "NDJSON（每行一条）", "json": "JSON 数组"}
+EXPORT_MIME = {"ndjson": "application/x-ndjson", "json": "application/json"}
+COMPARE_SIZES = (512, 768, 1024)
 
 # 页面配置
 st.set_page_config(
@@ -18,411 +50,137 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# 整次运行的耗时在脚本末尾记录；中途 st.rerun() 打断的运行不计入
+run_started = time.perf_counter()
+start_exporters()
+
 # 自定义CSS样式
-st.markdown("""
-<style>
-    .main-header {
-        font-size: 3rem;
-        font-weight: bold;
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 50%, #f093fb 100%);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        text-align: center;
-        padding: 2rem 0;
-    }
-    .stButton>button {
-        width: 100%;
-        border-radius: 12px;
-        height: 3.5em;
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        font-weight: bold;
-        border: none;
-        transition: all 0.3s;
-    }
-    .stButton>button:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 8px 16px rgba(102, 126, 234, 0.4);
-    }
-    .image-card {
-        border-radius: 15px;
-        padding: 15px;
-        background: white;
-        box-shadow: 0 4px 12px rgba(0,0,0,0.1);
-        transition: all 0.3s;
-        margin-bottom: 20px;
-    }
-    .image-card:hover {
-        transform: translateY(-5px);
-        box-shadow: 0 8px 24px rgba(0,0,0,0.15);
-    }
-    .stats-card {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        padding: 20px;
-        border-radius: 15px;
-        text-align: center;
-        margin: 10px 0;
-    }
-    .style-tag {
-        display: inline-block;
-        background: #f0f0f0;
-        padding: 5px 15px;
-        border-radius: 20px;
-        margin: 5px;
-        font-size: 0.9em;
-    }
-    .template-card {
-        background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%);
-        color: white;
-        padding: 15px;
-        border-radius: 12px;
-        margin: 10px 0;
-        cursor: pointer;
-        transition: all 0.3s;
-    }
-    .template-card:hover {
-        transform: scale(1.02);
-        box-shadow: 0 6px 20px rgba(245, 87, 108, 0.3);
-    }
-    .model-badge {
-        display: inline-block;
-        padding: 5px 12px;
-        border-radius: 15px;
-        font-size: 0.85em;
-        font-weight: bold;
-        margin: 2px;
-    }
-    .badge-flux { background: linear-gradient(135deg, #667eea, #764ba2); color: white; }
-    .badge-sd { background: linear-gradient(135deg, #f093fb, #f5576c); color: white; }
-    .badge-turbo { background: linear-gradient(135deg, #4facfe, #00f2fe); color: white; }
-    .badge-premium { background: linear-gradient(135deg, #ffd89b, #19547b); color: white; }
-    .scrollable-gallery {
-        max-height: 800px;
-        overflow-y: auto;
-        padding-right: 10px;
-    }
-    .scrollable-gallery::-webkit-scrollbar {
-        width: 8px;
-    }
-    .scrollable-gallery::-webkit-scrollbar-track {
-        background: #f1f1f1;
-        border-radius: 10px;
-    }
-    .scrollable-gallery::-webkit-scrollbar-thumb {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        border-radius: 10px;
-    }
-    .model-category {
-        background: #f8f9fa;
-        padding: 15px;
-        border-radius: 10px;
-        margin: 10px 0;
-        border-left: 4px solid #667eea;
-    }
-</style>
-""", unsafe_allow_html=True)
+st.markdown(style_tag(), unsafe_allow_html=True)
 
 # 初始化会话状态
-if 'gallery' not in st.session_state:
-    st.session_state.gallery = []
-if 'favorites' not in st.session_state:
-    st.session_state.favorites = []
-if 'generation_history' not in st.session_state:
-    st.session_state.generation_history = []
-if 'images_to_load' not in st.session_state:
-    st.session_state.images_to_load = 9
-if 'total_generated' not in st.session_state:
-    st.session_state.total_generated = 0
+# 作品库ID保存在URL中，重启或重连后打开同一链接即可找回画廊与历史
+if 'library_id' not in st.session_state:
+    library_id = st.query_params.get("lib", "")
+    if not (len(library_id) == 32 and all(c in "0123456789abcdef" for c in library_id)):
+        library_id = uuid.uuid4().hex
+        st.query_params["lib"] = library_id
+    st.session_state.library_id = library_id
+if 'collection' not in st.session_state:
+    st.session_state.collection = GalleryCollection(get_store(), st.session_state.library_id)
+if 'job_cursor' not in st.session_state:
+    # 本会话对各后台任务的收取进度；同一作品库开在多个标签页时各自收取
+    st.session_state.job_cursor = {}
 
-# Pollinations API配置
-POLLINATIONS_API_BASE = "https://image.pollinations.ai/prompt"
-POLLINATIONS_TEXT_API = "https://text.pollinations.ai"
+# 未渲染视图中的控件不会出现在本次运行里，Streamlit 会清掉它们的状态；重新赋值一遍即可保留
+for key in list(st.session_state.keys()):
+    if isinstance(key, str) and key.startswith(PERSISTENT_WIDGETS):
+        st.session_state[key] = st.session_state[key]
 
-# 完整的AI模型库（按类别分组）
-AVAILABLE_MODELS = {
-    "🚀 Flux 系列 - 最新高质量": {
-        "Flux 1.1 Pro": {
-            "model": "flux-pro-1.1", 
-            "badge": "badge-flux",
-            "description": "最新旗舰模型，6倍速提升，极致画质",
-            "best_for": "商业作品、高要求项目"
-        },
-        "Flux Pro": {
-            "model": "flux-pro",
-            "badge": "badge-flux",
-            "description": "专业级模型，顶级画质",
-            "best_for": "专业摄影、艺术创作"
-        },
-        "Flux Realism": {
-            "model": "flux-realism",
-            "badge": "badge-flux",
-            "description": "超写实风格，照片级效果",
-            "best_for": "人像摄影、产品拍摄"
-        },
-        "Flux Anime": {
-            "model": "flux-anime",
-            "badge": "badge-flux",
-            "description": "专业动漫风格",
-            "best_for": "日系动漫、角色设计"
-        },
-        "Flux 3D": {
-            "model": "flux-3d",
-            "badge": "badge-flux",
-            "description": "3D渲染风格",
-            "best_for": "3D建模、游戏美术"
-        },
-        "Flux Dev": {
-            "model": "flux-dev",
-            "badge": "badge-flux",
-            "description": "开发版本，快速迭代",
-            "best_for": "概念设计、原型测试"
-        },
-        "Flux Schnell": {
-            "model": "flux-schnell",
-            "badge": "badge-turbo",
-            "description": "极速生成版本",
-            "best_for": "快速预览、批量生成"
-        },
-        "Flux (标准)": {
-            "model": "flux",
-            "badge": "badge-flux",
-            "description": "通用标准模型",
-            "best_for": "日常创作、多用途"
-        }
-    },
-    
-    "🎨 Stable Diffusion 系列": {
-        "SD 3.5 Large": {
-            "model": "stable-diffusion-3.5-large",
-            "badge": "badge-sd",
-            "description": "SD 3.5大型模型，强大性能",
-            "best_for": "复杂场景、高细节"
-        },
-        "SD 3.5 Medium": {
-            "model": "stable-diffusion-3.5-medium",
-            "badge": "badge-sd",
-            "description": "SD 3.5中型模型，平衡性能",
-            "best_for": "平衡质量与速度"
-        },
-        "SD 3": {
-            "model": "stable-diffusion-3",
-            "badge": "badge-sd",
-            "description": "Stable Diffusion 3代",
-            "best_for": "文字渲染、精准构图"
-        },
-        "SD XL": {
-            "model": "sdxl",
-            "badge": "badge-sd",
-            "description": "大尺寸高清模型",
-            "best_for": "大幅作品、高分辨率"
-        },
-        "SD 2.1": {
-            "model": "stable-diffusion-2.1",
-            "badge": "badge-sd",
-            "description": "经典稳定版本",
-            "best_for": "传统风格、可靠输出"
-        },
-        "SD 1.5": {
-            "model": "stable-diffusion-1.5",
-            "badge": "badge-sd",
-            "description": "经典初代模型",
-            "best_for": "社区模型、微调基础"
-        }
-    },
-    
-    "⚡ 极速模型": {
-        "Turbo": {
-            "model": "turbo",
-            "badge": "badge-turbo",
-            "description": "超快速生成",
-            "best_for": "实时预览、快速迭代"
-        },
-        "Lightning": {
-            "model": "lightning",
-            "badge": "badge-turbo",
-            "description": "闪电级速度",
-            "best_for": "批量处理、即时反馈"
-        }
-    },
-    
-    "🌟 高级专业模型": {
-        "Kontext": {
-            "model": "kontext",
-            "badge": "badge-premium",
-            "description": "BPAIGen混合模型，支持参考图",
-            "best_for": "图生图、风格迁移"
-        },
-        "Nanobanana": {
-            "model": "nanobanana",
-            "badge": "badge-premium",
-            "description": "Google Gemini 2.5视觉模型",
-            "best_for": "自定义尺寸、参考图"
-        },
-        "Seedream": {
-            "model": "seedream",
-            "badge": "badge-premium",
-            "description": "ByteDance超高清模型",
-            "best_for": "高分辨率、电影级渲染"
-        }
-    },
-    
-    "🎭 特殊风格模型": {
-        "Dreamshaper": {
-            "model": "dreamshaper",
-            "badge": "badge-sd",
-            "description": "梦幻艺术风格",
-            "best_for": "奇幻场景、梦境效果"
-        },
-        "Openjourney": {
-            "model": "openjourney",
-            "badge": "badge-sd",
-            "description": "Midjourney开源替代",
-            "best_for": "艺术创作、插画"
-        },
-        "Anything V5": {
-            "model": "anything-v5",
-            "badge": "badge-sd",
-            "description": "通用动漫模型",
-            "best_for": "ACG内容、二次元"
-        }
-    }
-}
+collection = st.session_state.collection
+job_queue = get_job_queue()
 
-# 提示词模板库
-PROMPT_TEMPLATES = {
-    "人像摄影 Portrait": {
-        "专业人像": "professional portrait photography, studio lighting, 85mm lens, shallow depth of field, bokeh background, sharp focus, high detail, 8K quality",
-        "复古胶片": "vintage portrait, film grain, kodak portra 400, retro color grading, 1970s style, nostalgic atmosphere, analog photography",
-        "时尚大片": "high fashion editorial portrait, vogue magazine style, dramatic lighting, designer clothing, runway aesthetic, professional makeup",
-        "自然光": "natural light portrait, golden hour, soft diffused lighting, outdoor setting, candid moment, warm tones, lifestyle photography",
-        "黑白艺术": "fine art black and white portrait, dramatic contrast, Ansel Adams style, timeless elegance, high key lighting"
-    },
-    "风景艺术 Landscape": {
-        "中国山水": "traditional Chinese landscape painting, ink wash style, misty mountains, ancient pine trees, waterfall, tranquil atmosphere, Song dynasty aesthetic",
-        "赛博朋克": "cyberpunk cityscape, neon lights reflecting on wet streets, futuristic skyscrapers, rain, night scene, blade runner aesthetic, flying cars",
-        "奇幻世界": "fantasy landscape, floating islands, magical atmosphere, ethereal lighting, mystical creatures, epic vista, enchanted forest",
-        "自然风光": "breathtaking natural landscape, stunning mountain vista, dramatic cloudy sky, HDR photography, wide angle, national geographic style",
-        "科幻场景": "alien planet landscape, two suns in sky, strange rock formations, otherworldly plants, science fiction, concept art"
-    },
-    "动漫风格 Anime": {
-        "日系动漫": "anime style, detailed expressive eyes, vibrant colors, cel shading, manga aesthetic, clean linework, studio lighting",
-        "吉卜力风格": "Studio Ghibli animation style, soft watercolor colors, whimsical atmosphere, hand-painted look, Miyazaki inspired, dreamy clouds",
-        "赛璐璐": "cel shaded anime art, bold black outlines, flat vibrant colors, Japanese animation style, 90s anime aesthetic",
-        "水彩动漫": "watercolor anime illustration, soft edges, dreamy pastel atmosphere, light and airy, delicate details",
-        "漫画风格": "manga illustration style, dynamic composition, speed lines, dramatic shading, black and white with screentones"
-    },
-    "3D 渲染 3D Render": {
-        "写实渲染": "photorealistic 3D render, octane render, ray tracing, ultra detailed textures, perfect lighting, 8K quality, unreal engine",
-        "皮克斯风格": "Pixar 3D animation style, cute character design, colorful, soft studio lighting, family friendly, rounded shapes",
-        "低多边形": "low poly 3D art, geometric shapes, minimalist design, clean aesthetic, flat shading, isometric view",
-        "科幻机械": "sci-fi 3D mechanical render, intricate details, metallic materials, panel lines, futuristic technology, hard surface modeling",
-        "卡通渲染": "3D toon shader render, cartoon style, bold outlines, vibrant colors, stylized proportions, cel shaded"
-    },
-    "艺术流派 Art Movements": {
-        "印象派": "impressionist oil painting, visible brushstrokes, emphasis on light and color, Claude Monet style, outdoor scene",
-        "超现实": "surrealist art, dreamlike imagery, impossible scenes, Salvador Dali inspired, melting clocks aesthetic, subconscious imagery",
-        "抽象艺术": "abstract modern art, geometric shapes, bold primary colors, Mondrian inspired, minimalist composition, contemporary",
-        "波普艺术": "pop art style, bold colors, comic book aesthetic, Ben-Day dots, Andy Warhol inspired, mass culture imagery",
-        "新艺术": "art nouveau style, organic flowing lines, floral motifs, Alphonse Mucha inspired, elegant curves, decorative patterns"
-    },
-    "概念设计 Concept Art": {
-        "游戏概念": "video game concept art, detailed environment design, atmospheric perspective, fantasy RPG style, epic scale",
-        "电影概念": "cinematic concept art, movie production design, dramatic lighting, epic scale, Hollywood quality, matte painting",
-        "角色设计": "character concept art, multiple views, detailed costume design, turnaround sheet, professional quality, full body",
-        "载具设计": "vehicle concept design, sleek futuristic design, technical details, industrial design aesthetic, blueprint style",
-        "建筑概念": "architectural concept art, futuristic building design, glass and steel, modern sustainable design, aerial view"
-    }
-}
+# 辅助函数
+def download_image(url, mime=None):
+    """准备下载字节：默认透传原始字节，指定 mime 时转换格式（优先读本地缓存）"""
+    try:
+        return get_downloader().prepare(url, mime)
+    except Exception as e:
+        # 限流、超时等失败要让用户看到，而不是静默地没有下载按钮
+        st.error(f"下载失败: {e}")
+    return None
 
-# 艺术风格选项
-STYLE_OPTIONS = {
-    "摄影风格": ["专业摄影", "电影感", "复古胶片", "HDR", "黑白", "长曝光", "微距", "航拍", "街头摄影", "纪实"],
-    "绘画风格": ["油画", "水彩", "素描", "国画", "版画", "丙烯", "彩铅", "粉彩", "插画", "手绘"],
-    "艺术运动": ["印象派", "立体主义", "超现实", "抽象", "波普艺术", "未来主义", "表现主义", "巴洛克", "文艺复兴", "现代主义"],
-    "氛围感": ["梦幻", "神秘", "宁静", "戏剧性", "温暖", "冷峻", "浪漫", "史诗", "忧郁", "欢快"],
-    "技术特效": ["光线追踪", "体积光", "景深", "运动模糊", "辉光", "粒子特效", "镜头光晕", "色差", "HDR", "全局光照"],
-    "质量关键词": ["高质量", "8K", "4K", "超细节", "专业", "杰作", "获奖作品", "趋势", "史诗级", "精美"]
-}
+def render_renditions(item, presets):
+    """从同一张主图导出多个尺寸预设，失败时提示并返回空字典"""
+    try:
+        return get_rendition_pipeline().render(item, presets)
+    except Exception as e:
+        st.error(f"多尺寸导出失败: {e}")
+    return {}
 
-# 图片尺寸预设
-IMAGE_SIZES = {
-    "方形 1:1 (1024x1024)": (1024, 1024),
-    "横屏 16:9 (1920x1080)": (1920, 1080),
-    "竖屏 9:16 (1080x1920)": (1080, 1920),
-    "横幅 21:9 (2560x1080)": (2560, 1080),
-    "Instagram 4:5 (1080x1350)": (1080, 1350),
-    "4K 横屏 (3840x2160)": (3840, 2160),
-    "2K 方屏 (2048x2048)": (2048, 2048),
-    "HD 竖屏 (1080x1920)": (1080, 1920),
-    "自定义": (None, None)
-}
+def image_source(url):
+    """图片展示源：本地缓存命中时直接用缓存字节，否则交给浏览器从URL加载"""
+    cached = get_image_cache().get(url)
+    return cached.data if cached is not None else url
 
-# 辅助函数
-def generate_image_url(prompt, model="flux", width=1024, height=1024, seed=None, enhance=False, nologo=True):
-    """生成Pollinations API URL"""
-    encoded_prompt = urllib.parse.quote(prompt)
-    url = f"{POLLINATIONS_API_BASE}/{encoded_prompt}"
-    
-    params = []
-    if model and model != "flux":
-        params.append(f"model={model}")
-    if width:
-        params.append(f"width={width}")
-    if height:
-        params.append(f"height={height}")
-    if seed:
-        params.append(f"seed={seed}")
-    if enhance:
-        params.append("enhance=true")
-    if nologo:
-        params.append("nologo=true")
-    
-    if params:
-        url += "?" + "&".join(params)
-    
-    return url
+def load_thumbnails(items):
+    """为一组作品取已生成的缩略图，缺失的提交后台生成但不等待，返回 {url: 缩略图字节或None}"""
+    return get_thumbnail_pipeline().get_many([item.url for item in items])
 
-def enhance_prompt_with_ai(original_prompt):
-    """使用Pollinations文本API增强提示词"""
-    try:
-        enhancement_instruction = f"""You are an expert AI art prompt engineer. Enhance this image generation prompt by adding:
-- Detailed visual descriptions
-- Lighting and atmosphere details
-- Art style specifications
-- Quality and technical keywords
+def prefetch_thumbnails(items):
+    """后台提前生成下一页的缩略图，不等待结果"""
+    if items:
+        get_thumbnail_pipeline().get_many([item.url for item in items])
 
-Original prompt: {original_prompt}
+def set_page(key, page):
+    st.session_state[key] = page
 
-Enhanced prompt (respond with ONLY the enhanced prompt, no explanations):"""
-        
-        encoded_instruction = urllib.parse.quote(enhancement_instruction)
-        url = f"{POLLINATIONS_TEXT_API}/{encoded_instruction}"
-        
-        response = requests.get(url, timeout=15)
-        if response.status_code == 200:
-            enhanced = response.text.strip()
-            enhanced = enhanced.strip('"').strip("'").strip()
-            return enhanced if len(enhanced) > len(original_prompt) else original_prompt
-    except Exception as e:
-        st.warning(f"提示词增强失败: {str(e)}")
-    return original_prompt
+def page_nav(key, total, page_size):
+    """翻页导航：上一页、页码、下一页；返回当前页的起始偏移，页码（从1开始）存放在 session_state[key]"""
+    pages = max(1, math.ceil(total / page_size))
+    # 作品被删除或取消收藏后总页数可能变少
+    if st.session_state.get(key, 1) > pages:
+        st.session_state[key] = pages
+    page = st.session_state.get(key, 1)
+    
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        st.button("◀ 上一页", key=f"prev_{key}", disabled=page <= 1, on_click=set_page, args=(key, page - 1))
+    with col_page:
+        page = st.number_input(f"页码（共 {pages} 页）", min_value=1, max_value=pages, step=1, key=key)
+    with col_next:
+        st.button("下一页 ▶", key=f"next_{key}", disabled=page >= pages, on_click=set_page, args=(key, page + 1))
+    return (page - 1) * page_size
 
-def download_image(url):
-    """下载图片"""
-    try:
-        response = requests.get(url, timeout=30)
-        if response.status_code == 200:
-            return Image.open(io.BytesIO(response.content))
-    except:
-        pass
-    return None
+def jump_to_date(key, page_size, position_of):
+    """日期选择回调：跳到包含该日期作品的那一页"""
+    day = st.session_state[f"date_{key}"]
+    if day is not None:
+        st.session_state[key] = position_of(day) // page_size + 1
+
+def show_thumbnail(item, thumbs):
+    """展示缩略图；尚未生成时交给浏览器直接从URL加载原图，下次运行即换成缩略图"""
+    thumb = thumbs.get(item.url)
+    st.image(thumb if thumb is not None else item.url, use_container_width=True)
+
+@st.dialog("🔍 查看原图", width="large")
+def show_original(item):
+    """按需加载原图，可选转换格式后下载"""
+    st.image(image_source(item.url), use_container_width=True)
+    st.caption(f"🤖 {item.model} | 📐 {item.width}x{item.height}")
 
-def image_to_base64(image):
-    """将PIL图片转换为base64"""
-    buffered = io.BytesIO()
-    image.save(buffered, format="PNG")
-    return base64.b64encode(buffered.getvalue()).decode()
+    col_a, col_b = st.columns([2, 1])
+    with col_a:
+        format_name = st.selectbox("下载格式", list(DOWNLOAD_FORMATS.keys()), key=f"fmt_{item.id}")
+    with col_b:
+        with st.spinner("准备中..."):
+            download = download_image(item.url, DOWNLOAD_FORMATS[format_name])
+        if download:
+            st.download_button(
+                "💾 下载",
+                download.data,
+                file_name=f"ai_art_{item.id[:8]}.{download.extension}",
+                mime=download.mime,
+                key=f"dlorig_{item.id}"
+            )
+
+    with st.expander("📐 多尺寸导出"):
+        st.caption("各尺寸都从这张原图智能裁剪缩放得到，画面一致，不再重新生成")
+        upscaled = upscaled_presets((item.width, item.height))
+        presets = st.multiselect("尺寸预设", list(RENDITION_PRESETS.keys()), key=f"rend_{item.id}",
+                                 format_func=lambda name: f"{name}（放大）" if name in upscaled else name)
+        if upscaled.intersection(presets):
+            st.warning(f"标注“放大”的尺寸超过原图 {item.width}x{item.height}，由原图插值放大得到，不会增加细节")
+        if presets and st.button("✂️ 生成所选尺寸", key=f"rendbtn_{item.id}"):
+            with st.spinner("正在生成各尺寸..."):
+                renditions = render_renditions(item, presets)
+            for index, (name, rendition) in enumerate(renditions.items()):
+                st.download_button(
+                    f"💾 {name}" + ("（放大）" if name in upscaled else ""),
+                    rendition.data,
+                    file_name=f"ai_art_{item.id[:8]}_{rendition.width}x{rendition.height}.{rendition.extension}",
+                    mime=rendition.mime,
+                    key=f"dlrend_{item.id}_{index}"
+                )
 
 def generate_social_caption(prompt, styles, model):
     """生成社交媒体分享标题"""
@@ -435,42 +193,274 @@ def generate_social_caption(prompt, styles, model):
 {style_tags} #AIArt #DigitalArt #AI生成 #艺术创作 #Pollinations"""
     return caption
 
-def add_to_gallery(image_url, prompt, model, width, height, styles, seed=None):
-    """添加到画廊"""
-    gallery_item = {
-        "id": hashlib.md5(f"{image_url}{time.time()}".encode()).hexdigest(),
-        "url": image_url,
-        "prompt": prompt,
-        "model": model,
-        "width": width,
-        "height": height,
-        "styles": styles,
-        "seed": seed,
-        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "is_favorite": False
-    }
-    st.session_state.gallery.insert(0, gallery_item)
-    st.session_state.generation_history.insert(0, gallery_item)
-    st.session_state.total_generated += 1
+def harvest_jobs():
+    """把后台任务新完成的作品收进本会话的画廊，返回新收进的数量"""
+    items = job_queue.harvest(st.session_state.library_id, st.session_state.job_cursor)
+    return sum(1 for item in items if collection.adopt(item))
+
+def enqueue_generation(label, prompt, model_id, model_name, width, height, styles, seed=None, count=1, enhance=False):
+    """把生成请求加入后台队列后立即返回，进度见侧边栏任务面板"""
+    with timed("generate_enqueue"):
+        job_queue.submit(GenerationJob(
+            st.session_state.library_id, label, prompt, model_id, model_name, width, height, styles,
+            seed=seed, count=count, enhance=enhance
+        ))
+    message = f"📋 已加入队列：{label}"
+    if st.session_state.get("job_polling"):
+        st.toast(message)
+    else:
+        # 任务面板只在有任务时轮询，整页刷新一次让它开始轮询
+        st.session_state.pending_toast = message
+        st.rerun()
 
 def toggle_favorite(item_id):
     """切换收藏状态"""
-    for item in st.session_state.gallery:
-        if item["id"] == item_id:
-            item["is_favorite"] = not item["is_favorite"]
-            if item["is_favorite"]:
-                if item not in st.session_state.favorites:
-                    st.session_state.favorites.append(item)
-            else:
-                st.session_state.favorites = [f for f in st.session_state.favorites if f["id"] != item_id]
-            break
+    collection.toggle_favorite(item_id)
+
+@st.fragment
+def show_template_card(template):
+    """模板卡片：复制、直接生成、AI增强后生成；按钮只重跑本卡片"""
+    st.markdown(template_card_html(template.name, template.text), unsafe_allow_html=True)
+    
+    col_a, col_b, col_c = st.columns([1, 1, 1])
+    
+    with col_a:
+        if st.button("📋", key=f"copy_{template.key}"):
+            with st.expander("完整提示词", expanded=True):
+                st.code(template.text, language=None)
+    
+    with col_b:
+        if st.button("🚀", key=f"gen_{template.key}"):
+            enqueue_generation(f"模板 · {template.name}", template.text, selected_model, selected_model_name, img_width, img_height, [template.name], seed_value)
+    
+    with col_c:
+        if st.button("✨", key=f"enhance_{template.key}"):
+            enqueue_generation(f"模板增强 · {template.name}", template.text, selected_model, selected_model_name, img_width, img_height, [template.name], enhance=True)
 
-def get_model_by_name(model_name):
-    """根据模型名称获取模型ID"""
-    for category, models in AVAILABLE_MODELS.items():
-        if model_name in models:
-            return models[model_name]["model"]
-    return "flux"
+def gallery_actions(item):
+    """画廊作品的操作按钮：收藏、下载、重新生成、分享、查看原图"""
+    col_a, col_b, col_c, col_d, col_e = st.columns(5)
+    
+    with col_a:
+        fav_icon = "⭐" if item.is_favorite else "☆"
+        st.button(fav_icon, key=f"fav_{item.id}", on_click=toggle_favorite, args=(item.id,))
+    
+    with col_b:
+        if st.button("📥", key=f"dl_{item.id}"):
+            download = download_image(item.url)
+            if download:
+                st.download_button(
+                    "💾",
+                    download.data,
+                    file_name=f"ai_art_{item.id[:8]}.{download.extension}",
+                    mime=download.mime,
+                    key=f"dlbtn_{item.id}"
+                )
+    
+    with col_c:
+        if st.button("🔄", key=f"regen_{item.id}"):
+            enqueue_generation("重新生成", item.prompt, item.model_id, item.model, item.width, item.height, item.styles)
+    
+    with col_d:
+        if st.button("📤", key=f"share_{item.id}"):
+            caption = generate_social_caption(item.prompt, item.styles, item.model)
+            st.text_area("分享", caption, height=150, key=f"cap_{item.id}")
+    
+    with col_e:
+        if st.button("🔍", key=f"orig_{item.id}"):
+            show_original(item)
+
+@st.fragment
+def show_gallery_card(item, thumbs):
+    """画廊卡片；收藏等操作只重跑本卡片"""
+    st.markdown('<div class="image-card">', unsafe_allow_html=True)
+    show_thumbnail(item, thumbs)
+    
+    st.markdown(f"**{item.prompt[:50]}...**")
+    st.caption(f"🤖 {item.model} | 📐 {item.width}x{item.height}")
+    st.caption(f"🕐 {item.timestamp}")
+    
+    gallery_actions(item)
+    
+    st.markdown('</div>', unsafe_allow_html=True)
+
+@st.fragment
+def show_gallery_row(item, thumbs):
+    """画廊列表中的一行：左侧缩略图，右侧完整提示词与操作；操作只重跑本行"""
+    col_thumb, col_info = st.columns([1, 3])
+    with col_thumb:
+        show_thumbnail(item, thumbs)
+    with col_info:
+        st.markdown(f"**{item.prompt}**")
+        st.caption(f"🤖 {item.model} | 📐 {item.width}x{item.height} | 🕐 {item.timestamp}")
+        gallery_actions(item)
+
+@st.fragment
+def show_favorite_card(item, thumbs):
+    """收藏卡片；取消收藏会整页刷新以移除卡片，其余操作只重跑本卡片"""
+    show_thumbnail(item, thumbs)
+    st.markdown(f"**{item.prompt[:50]}...**")
+    st.caption(f"🤖 {item.model}")
+    
+    col_a, col_b, col_c = st.columns(3)
+    with col_a:
+        if st.button("💔", key=f"unfav_{item.id}"):
+            toggle_favorite(item.id)
+            st.rerun()
+    
+    with col_b:
+        # 只在用户点击时准备下载字节，原图由磁盘缓存按作品复用
+        if st.button("📥", key=f"prepfav_{item.id}"):
+            download = download_image(item.url)
+            if download:
+                st.download_button(
+                    "💾",
+                    download.data,
+                    file_name=f"fav_{item.id[:8]}.{download.extension}",
+                    mime=download.mime,
+                    key=f"dlfav_{item.id}"
+                )
+    
+    with col_c:
+        if st.button("🔍", key=f"origfav_{item.id}"):
+            show_original(item)
+
+@st.fragment
+def show_history_entry(idx, item, thumbs):
+    """一条历史记录"""
+    with st.expander(f"#{idx+1} | {item.timestamp} | {item.model}"):
+        col1, col2 = st.columns([1, 2])
+        
+        with col1:
+            show_thumbnail(item, thumbs)
+            if st.button("🔍 查看原图", key=f"orighist_{item.id}"):
+                show_original(item)
+        
+        with col2:
+            st.markdown("**提示词:**")
+            st.code(item.prompt, language=None)
+            st.markdown(f"**模型:** {item.model}")
+            st.markdown(f"**尺寸:** {item.width} x {item.height}")
+            if item.seed is not None:
+                st.markdown(f"**种子:** {item.seed}")
+            
+            if st.button("🔄 复用配置", key=f"reuse_{item.id}"):
+                enqueue_generation("复用配置", item.prompt, item.model_id, item.model, item.width, item.height, item.styles, item.seed)
+
+@st.fragment
+def history_export():
+    """按需导出历史：选择格式后点击才从存储流式编码，不经过内存中的作品集合"""
+    fmt = st.selectbox("导出格式", EXPORT_FORMATS, format_func=EXPORT_FORMATS.get, key="history_export_format")
+    compress = st.checkbox("gzip 压缩", key="history_export_gzip")
+    if st.button("📥 导出"):
+        data = b"".join(iter_export(get_store(), st.session_state.library_id, fmt, compress))
+        st.download_button(
+            "💾 下载",
+            data,
+            file_name=export_filename(fmt, compress),
+            mime="application/gzip" if compress else EXPORT_MIME[fmt],
+        )
+
+@st.fragment
+def bundle_download(name, scopes):
+    """打包下载：点击后才并发拉取原图、原样写入 ZIP 并显示进度；scopes 为 {范围名: 返回作品列表的函数}"""
+    if len(scopes) > 1:
+        scope = st.selectbox("打包范围", list(scopes), key=f"{name}_bundle_scope")
+    else:
+        scope = next(iter(scopes))
+    if st.button("📦 打包下载", key=f"bundle_{name}"):
+        items = scopes[scope]()
+        if not items:
+            st.info("没有可打包的作品")
+            return
+        if len(items) > APP_MAX_ITEMS:
+            # 下载按钮要把整个 ZIP 放在内存里，大包交给命令行直接流式写入文件
+            st.warning(f"共 {len(items)} 张，超过页面内打包上限 {APP_MAX_ITEMS} 张，请在服务器上使用命令行导出：")
+            st.code(f"python -m studio.bundle {st.session_state.library_id} {bundle_filename(name)}"
+                    + (" --favorites" if scope == "我的收藏" else ""), language="bash")
+            st.caption("可用 --favorites 只打包收藏、--model 按模型筛选")
+            return
+        progress = st.progress(0.0, text=f"正在打包 0/{len(items)}")
+        failed = []
+
+        def report(done, entry):
+            if entry.error:
+                failed.append(entry)
+            progress.progress(done / len(items), text=f"正在打包 {done}/{len(items)}")
+
+        data = b"".join(iter_bundle(items, on_progress=report))
+        progress.empty()
+        if failed:
+            st.warning(f"{len(failed)} 张原图拉取失败，已记入清单 manifest.jsonl")
+        st.download_button(
+            f"💾 下载 ZIP（{len(items) - len(failed)} 张）",
+            data,
+            file_name=bundle_filename(name),
+            mime="application/zip",
+            key=f"dlbundle_{name}"
+        )
+
+@st.fragment
+def model_comparison():
+    """实测对比：同一提示词与种子并行请求所选模型，展示首字节时间、总耗时与对比图"""
+    st.session_state.setdefault("compare_models", ["Flux 1.1 Pro", "SD 3.5 Large", "Turbo"])
+    st.session_state.setdefault("compare_seed", 42)
+    prompt = st.text_input("对比提示词", placeholder="例如：a lighthouse on a cliff at sunset", key="compare_prompt")
+    models = st.multiselect("对比模型", list(MODEL_IDS_BY_NAME), max_selections=COMPARE_MAX_MODELS,
+                            key="compare_models")
+    col1, col2 = st.columns(2)
+    with col1:
+        seed = st.number_input("种子", min_value=0, max_value=999999999, step=1, key="compare_seed")
+    with col2:
+        side = st.selectbox("尺寸", COMPARE_SIZES, format_func=lambda n: f"{n}x{n}", key="compare_size")
+
+    if st.button("⚡ 开始实测", key="run_compare", disabled=not (prompt.strip() and models)):
+        progress = st.progress(0.0, text=f"已完成 0/{len(models)}")
+
+        def report(done, total, result):
+            status = "失败" if result.error else f"{result.total:.1f}s"
+            progress.progress(done / total, text=f"已完成 {done}/{total}：{result.model} {status}")
+
+        start = time.perf_counter()
+        results = run_comparison(prompt.strip(), [get_model_id(name) for name in models], int(seed),
+                                 side, side, on_result=report)
+        wall = time.perf_counter() - start
+        progress.empty()
+        st.session_state.comparison = {
+            "sheet": contact_sheet(results),
+            "rows": latency_rows(results),
+            "wall": wall,
+        }
+
+    comparison = st.session_state.get("comparison")
+    if comparison:
+        st.caption(f"总用时 {comparison['wall']:.1f}s（各模型并行请求，取决于最慢的一个）")
+        st.image(comparison["sheet"], use_container_width=True)
+        st.dataframe(comparison["rows"], use_container_width=True, hide_index=True)
+        st.download_button("💾 下载对比图", comparison["sheet"], file_name="model_comparison.jpg",
+                           mime="image/jpeg", key="dlcompare")
+
+def history_import():
+    """导入导出文件，已存在的作品跳过；导入后重建会话中的作品集合"""
+    with st.expander("📤 导入历史"):
+        uploaded = st.file_uploader("选择导出文件（JSON / NDJSON，可为 gzip）", type=["json", "ndjson", "gz"],
+                                    key="import_file")
+        if uploaded is not None and st.button("开始导入"):
+            try:
+                inserted, skipped = import_archive(get_store(), st.session_state.library_id, uploaded)
+            except (ValueError, KeyError, TypeError, OSError, EOFError, zlib.error) as e:
+                # 导入按批提交，出错前写入的批次已保存，同样要重建会话中的作品集合
+                st.session_state.collection = GalleryCollection(get_store(), st.session_state.library_id)
+                st.error(f"导入失败（已导入的部分保留）: {e}")
+                return
+            st.session_state.collection = GalleryCollection(get_store(), st.session_state.library_id)
+            st.session_state.pending_toast = f"导入完成：新增 {inserted} 件，跳过已存在的 {skipped} 件"
+            st.rerun()
+
+# 收取后台任务已完成的作品
+harvest_jobs()
+if "pending_toast" in st.session_state:
+    st.toast(st.session_state.pop("pending_toast"))
 
 # 主标题
 st.markdown('<h1 class="main-header">🎨 AI 艺术创作工作室 Pro</h1>', unsafe_allow_html=True)
@@ -547,43 +537,37 @@ with st.sidebar:
     st.markdown("### 📊 创作统计")
     st.markdown(f"""
     <div class="stats-card">
-        <h3>{st.session_state.total_generated}</h3>
+        <h3>{collection.total_generated}</h3>
         <p>总生成数</p>
     </div>
     """, unsafe_allow_html=True)
     
     st.markdown(f"""
     <div class="stats-card">
-        <h3>{len(st.session_state.favorites)}</h3>
+        <h3>{collection.count_favorites()}</h3>
         <p>收藏作品</p>
     </div>
     """, unsafe_allow_html=True)
     
     st.markdown(f"""
     <div class="stats-card">
-        <h3>{len(st.session_state.gallery)}</h3>
+        <h3>{collection.count_gallery()}</h3>
         <p>画廊作品</p>
     </div>
     """, unsafe_allow_html=True)
 
-# 主内容区 - 标签页
-tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
-    "🎨 创作工作台", 
-    "📚 提示词模板库", 
-    "🤖 模型对比", 
-    "🖼️ 作品画廊", 
-    "⭐ 我的收藏", 
-    "📜 生成历史"
-])
+# 主内容区 - 视图导航（与标签页不同，未选中的视图不会渲染）
+active_view = st.radio("视图", VIEWS, horizontal=True, key="active_view", label_visibility="collapsed")
 
 # Tab 1: 创作工作台
-with tab1:
+if active_view == VIEWS[0]:
     st.markdown("## 🎨 开始创作你的AI艺术作品")
     
     col1, col2 = st.columns([3, 1])
     with col1:
         user_prompt = st.text_area(
             "📝 描述你想要的艺术作品",
+            key="user_prompt",
             height=150,
             placeholder="例如：一个赛博朋克风格的女战士，霓虹灯背景，未来主义城市，高细节，8K画质...",
             help="详细描述你想要生成的图像"
@@ -593,55 +577,24 @@ with tab1:
         st.markdown("### ")
         if st.button("🚀 立即生成", type="primary", use_container_width=True):
             if user_prompt:
-                with st.spinner(f"🎨 正在使用 {selected_model_name} 生成{batch_count}张作品..."):
-                    final_prompt = user_prompt
-                    if use_ai_enhance:
-                        with st.spinner("✨ AI正在增强提示词..."):
-                            final_prompt = enhance_prompt_with_ai(user_prompt)
-                            if final_prompt != user_prompt:
-                                st.success(f"✨ 提示词已增强！")
-                                with st.expander("查看增强后的提示词"):
-                                    st.code(final_prompt, language=None)
-                    
-                    progress_bar = st.progress(0)
-                    for i in range(batch_count):
-                        current_seed = seed_value + i if seed_value else None
-                        image_url = generate_image_url(
-                            final_prompt,
-                            model=selected_model,
-                            width=img_width,
-                            height=img_height,
-                            seed=current_seed,
-                            enhance=False,
-                            nologo=True
-                        )
-                        
-                        add_to_gallery(
-                            image_url,
-                            final_prompt,
-                            selected_model_name,
-                            img_width,
-                            img_height,
-                            [],
-                            current_seed
-                        )
-                        progress_bar.progress((i + 1) / batch_count)
-                    
-                    st.success(f"✅ 成功生成 {batch_count} 张作品！")
-                    st.balloons()
-                    time.sleep(1)
-                    st.rerun()
+                enqueue_generation(
+                    f"{selected_model_name} × {batch_count}",
+                    user_prompt,
+                    selected_model,
+                    selected_model_name,
+                    img_width,
+                    img_height,
+                    [],
+                    seed=seed_value,
+                    count=batch_count,
+                    enhance=use_ai_enhance
+                )
             else:
                 st.warning("⚠️ 请输入提示词")
         
         st.markdown("---")
         if st.button("🎲 随机灵感", use_container_width=True):
-            random_templates = []
-            for category in PROMPT_TEMPLATES.values():
-                random_templates.extend(list(category.values()))
-            import random
-            random_prompt = random.choice(random_templates)
-            st.info(f"💡 {random_prompt}")
+            st.info(f"💡 {random.choice(TEMPLATE_TEXTS)}")
     
     # 风格混合区
     st.markdown("---")
@@ -675,349 +628,239 @@ with tab1:
                     style_text = ", ".join(selected_styles)
                     combined = f"{user_prompt}, {style_text}"
                     
-                    with st.spinner("生成中..."):
-                        image_url = generate_image_url(
-                            combined,
-                            model=selected_model,
-                            width=img_width,
-                            height=img_height,
-                            seed=seed_value,
-                            nologo=True
-                        )
-                        add_to_gallery(image_url, combined, selected_model_name, img_width, img_height, selected_styles, seed_value)
-                        st.success("✅ 生成完成！")
-                        st.rerun()
+                    enqueue_generation("风格混合", combined, selected_model, selected_model_name, img_width, img_height, selected_styles, seed_value)
                 else:
                     st.warning("请先输入提示词")
     
     # 最新作品预览
-    if st.session_state.gallery:
+    latest = collection.gallery(limit=4)
+    if latest:
         st.markdown("---")
         st.markdown("### 🖼️ 最新作品")
-        cols = st.columns(min(4, len(st.session_state.gallery[:4])))
-        for idx, item in enumerate(st.session_state.gallery[:4]):
+        thumbs = load_thumbnails(latest)
+        cols = st.columns(min(4, len(latest)))
+        for idx, item in enumerate(latest):
             with cols[idx]:
-                st.image(item["url"], use_container_width=True)
-                st.caption(f"🤖 {item['model']}")
+                show_thumbnail(item, thumbs)
+                st.caption(f"🤖 {item.model}")
 
 # Tab 2: 提示词模板库
-with tab2:
+if active_view == VIEWS[1]:
     st.markdown("## 📚 专业提示词模板库")
     
-    search_term = st.text_input("🔍 搜索模板", placeholder="输入关键词...")
-    
-    for category, templates in PROMPT_TEMPLATES.items():
-        if search_term:
-            filtered = {k: v for k, v in templates.items() if search_term.lower() in k.lower() or search_term.lower() in v.lower()}
-            if not filtered:
-                continue
-            templates = filtered
-        
-        st.markdown(f"### {category}")
+    template_index = get_template_index()
+    search_term = st.text_input("🔍 搜索模板", placeholder="输入关键词...", key="template_search")
+    if template_index.errors:
+        st.caption("⚠️ 以下模板文件无法读取，已跳过：" + "；".join(
+            f"{os.path.basename(path)}（{error}）" for path, error in sorted(template_index.errors.items())
+        ))
+    
+    if search_term:
+        # 倒排索引按相关度排序，名称命中优先；最后一个英文词按前缀匹配
+        results = template_index.search(search_term, limit=TEMPLATE_RESULTS)
+        st.caption(f"共 {len(template_index)} 个模板，显示最相关的 {len(results)} 个")
+        if not results:
+            st.info("没有找到匹配的模板")
         cols = st.columns(2)
-        
-        for idx, (name, template) in enumerate(templates.items()):
+        for idx, template in enumerate(results):
             with cols[idx % 2]:
-                st.markdown(f"""
-                <div class="template-card">
-                    <h4>✨ {name}</h4>
-                    <p style="font-size:0.9em; opacity:0.95; margin-top: 10px;">{template[:100]}...</p>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                col_a, col_b, col_c = st.columns([1, 1, 1])
-                
-                with col_a:
-                    if st.button("📋", key=f"copy_{category}_{name}"):
-                        with st.expander("完整提示词", expanded=True):
-                            st.code(template, language=None)
-                
-                with col_b:
-                    if st.button("🚀", key=f"gen_{category}_{name}"):
-                        with st.spinner("生成中..."):
-                            image_url = generate_image_url(
-                                template,
-                                model=selected_model,
-                                width=img_width,
-                                height=img_height,
-                                seed=seed_value,
-                                nologo=True
-                            )
-                            add_to_gallery(image_url, template, selected_model_name, img_width, img_height, [name], seed_value)
-                            st.success("✅ 完成！")
-                            time.sleep(0.5)
-                            st.rerun()
-                
-                with col_c:
-                    if st.button("✨", key=f"enhance_{category}_{name}"):
-                        with st.spinner("增强中..."):
-                            enhanced = enhance_prompt_with_ai(template)
-                            image_url = generate_image_url(
-                                enhanced,
-                                model=selected_model,
-                                width=img_width,
-                                height=img_height,
-                                nologo=True
-                            )
-                            add_to_gallery(image_url, enhanced, selected_model_name, img_width, img_height, [name])
-                            st.success("✅ 完成！")
-                            st.rerun()
+                st.caption(f"📂 {template.category}")
+                show_template_card(template)
+    else:
+        for category, templates in PROMPT_TEMPLATES.items():
+            st.markdown(f"### {category}")
+            cols = st.columns(2)
+            
+            for idx, (name, template) in enumerate(templates.items()):
+                with cols[idx % 2]:
+                    show_template_card(Template(f"{category}_{name}", category, name, template))
 
 # Tab 3: 模型对比
-with tab3:
+if active_view == VIEWS[2]:
     st.markdown("## 🤖 AI模型完整对比")
     
-    for category, models in AVAILABLE_MODELS.items():
+    st.markdown("### ⚡ 实测对比")
+    model_comparison()
+    st.markdown("---")
+    
+    for category, models in model_details():
         st.markdown(f"### {category}")
         
-        for model_name, model_info in models.items():
+        for model_name, details, badge in models:
             with st.expander(f"🔹 {model_name}"):
                 col1, col2 = st.columns([2, 1])
                 
                 with col1:
-                    st.markdown(f"""
-                    **模型ID:** `{model_info['model']}`
-                    
-                    **描述:** {model_info['description']}
-                    
-                    **最适合:** {model_info['best_for']}
-                    """)
+                    st.markdown(details)
                 
                 with col2:
-                    st.markdown(f'<span class="model-badge {model_info["badge"]}">{model_name}</span>', unsafe_allow_html=True)
+                    st.markdown(badge, unsafe_allow_html=True)
         
         st.markdown("---")
-    
-    st.markdown("### 💡 使用建议")
-    
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        st.markdown("""
-        **🚀 追求速度**
-        - Turbo
-        - Lightning
-        - Flux Schnell
-        """)
-    
-    with col2:
-        st.markdown("""
-        **🎨 追求质量**
-        - Flux 1.1 Pro
-        - Flux Pro
-        - SD 3.5 Large
-        """)
-    
-    with col3:
-        st.markdown("""
-        **💰 平衡选择**
-        - Flux (标准)
-        - SD 3
-        - Flux Dev
-        """)
 
 # Tab 4: 作品画廊
-with tab4:
+if active_view == VIEWS[3]:
     st.markdown("## 🖼️ 作品画廊")
     
-    if st.session_state.gallery:
+    if collection.count_gallery():
         col1, col2, col3, col4 = st.columns([2, 2, 2, 1])
         
         with col1:
             filter_model = st.multiselect(
                 "按模型筛选",
-                options=list(set([item["model"] for item in st.session_state.gallery])),
-                default=[]
+                options=collection.gallery_models(),
+                key="gallery_models",
+                on_change=set_page,
+                args=("gallery_page", 1)
             )
         
         with col2:
-            sort_by = st.selectbox("排序", ["最新", "最旧", "仅收藏"])
+            sort_by = st.selectbox("排序", ["最新", "最旧", "仅收藏"], key="gallery_sort", on_change=set_page, args=("gallery_page", 1))
         
         with col3:
-            view_mode = st.selectbox("视图", ["网格", "列表"])
+            view_mode = st.selectbox("视图", ["网格", "列表"], key="gallery_view")
         
         with col4:
             if st.button("🗑️"):
-                st.session_state.gallery = []
+                collection.clear_gallery()
                 st.rerun()
         
-        filtered_gallery = st.session_state.gallery
-        if filter_model:
-            filtered_gallery = [item for item in filtered_gallery if item["model"] in filter_model]
-        
-        if sort_by == "最旧":
-            filtered_gallery = list(reversed(filtered_gallery))
-        elif sort_by == "仅收藏":
-            filtered_gallery = [item for item in filtered_gallery if item["is_favorite"]]
-        
-        total_images = len(filtered_gallery)
+        gallery_query = {
+            "models": filter_model,
+            "oldest_first": sort_by == "最旧",
+            "favorites_only": sort_by == "仅收藏",
+        }
+        total_images = collection.count_gallery(gallery_query["models"], gallery_query["favorites_only"])
         st.markdown(f"**共 {total_images} 张作品**")
+        bundle_download("gallery", {
+            "当前筛选": lambda: collection.gallery(**gallery_query),
+            "全部作品": lambda: collection.gallery(),
+            "我的收藏": lambda: collection.favorites(),
+        })
         
-        if filtered_gallery:
-            images_to_show = filtered_gallery[:st.session_state.images_to_load]
+        if total_images:
+            def gallery_position(day):
+                # 倒序时跳到该日最后一件作品，正序时跳到该日第一件
+                moment = dt_time.min if gallery_query["oldest_first"] else dt_time.max
+                return collection.gallery_position(datetime.combine(day, moment).timestamp(), **gallery_query)
+            
+            st.date_input("📅 跳转到日期", value=None, key="date_gallery_page",
+                          on_change=jump_to_date, args=("gallery_page", GRID_PAGE_SIZE, gallery_position))
+            offset = page_nav("gallery_page", total_images, GRID_PAGE_SIZE)
+            images_to_show = collection.gallery(limit=GRID_PAGE_SIZE, offset=offset, **gallery_query)
+            thumbs = load_thumbnails(images_to_show)
             
             if view_mode == "网格":
                 for i in range(0, len(images_to_show), 3):
                     cols = st.columns(3)
                     for j in range(3):
                         if i + j < len(images_to_show):
-                            item = images_to_show[i + j]
                             with cols[j]:
-                                st.markdown('<div class="image-card">', unsafe_allow_html=True)
-                                st.image(item["url"], use_container_width=True)
-                                
-                                st.markdown(f"**{item['prompt'][:50]}...**")
-                                st.caption(f"🤖 {item['model']} | 📐 {item['width']}x{item['height']}")
-                                st.caption(f"🕐 {item['timestamp']}")
-                                
-                                col_a, col_b, col_c, col_d = st.columns(4)
-                                
-                                with col_a:
-                                    fav_icon = "⭐" if item["is_favorite"] else "☆"
-                                    if st.button(fav_icon, key=f"fav_{item['id']}"):
-                                        toggle_favorite(item['id'])
-                                        st.rerun()
-                                
-                                with col_b:
-                                    if st.button("📥", key=f"dl_{item['id']}"):
-                                        img = download_image(item["url"])
-                                        if img:
-                                            buf = io.BytesIO()
-                                            img.save(buf, format="PNG")
-                                            st.download_button(
-                                                "💾",
-                                                buf.getvalue(),
-                                                file_name=f"ai_art_{item['id'][:8]}.png",
-                                                mime="image/png",
-                                                key=f"dlbtn_{item['id']}"
-                                            )
-                                
-                                with col_c:
-                                    if st.button("🔄", key=f"regen_{item['id']}"):
-                                        with st.spinner("重新生成..."):
-                                            model_id = get_model_by_name(item["model"])
-                                            new_url = generate_image_url(
-                                                item["prompt"],
-                                                model=model_id,
-                                                width=item["width"],
-                                                height=item["height"],
-                                                nologo=True
-                                            )
-                                            add_to_gallery(new_url, item["prompt"], item["model"], item["width"], item["height"], item["styles"])
-                                            st.rerun()
-                                
-                                with col_d:
-                                    if st.button("📤", key=f"share_{item['id']}"):
-                                        caption = generate_social_caption(item["prompt"], item["styles"], item["model"])
-                                        st.text_area("分享", caption, height=150, key=f"cap_{item['id']}")
-                                
-                                st.markdown('</div>', unsafe_allow_html=True)
+                                show_gallery_card(images_to_show[i + j], thumbs)
+            else:
+                for item in images_to_show:
+                    show_gallery_row(item, thumbs)
+                    st.divider()
             
-            if len(images_to_show) < total_images:
-                if st.button(f"📜 加载更多 (还有 {total_images - len(images_to_show)} 张)"):
-                    st.session_state.images_to_load += 9
-                    st.rerun()
+            prefetch_thumbnails(collection.gallery(limit=GRID_PAGE_SIZE, offset=offset + GRID_PAGE_SIZE, **gallery_query))
         else:
             st.info("没有符合条件的作品")
     else:
         st.info("🎨 画廊是空的，开始创作吧！")
 
 # Tab 5: 我的收藏
-with tab5:
+if active_view == VIEWS[4]:
     st.markdown("## ⭐ 我的收藏")
     
-    if st.session_state.favorites:
-        st.markdown(f"共 **{len(st.session_state.favorites)}** 件收藏")
+    favorites_count = collection.count_favorites()
+    if favorites_count:
+        st.markdown(f"共 **{favorites_count}** 件收藏")
+        bundle_download("favorites", {"我的收藏": lambda: collection.favorites()})
+        if st.toggle("⚡ 后台预取原图", key="prefetch_favorites", help="提前把收藏原图拉到本地缓存，点击下载时即可立即获得"):
+            prefetch([item.url for item in collection.favorites()])
+        offset = page_nav("favorites_page", favorites_count, GRID_PAGE_SIZE)
+        favorites = collection.favorites(limit=GRID_PAGE_SIZE, offset=offset)
+        thumbs = load_thumbnails(favorites)
         
-        for i in range(0, len(st.session_state.favorites), 3):
+        for i in range(0, len(favorites), 3):
             cols = st.columns(3)
             for j in range(3):
-                if i + j < len(st.session_state.favorites):
-                    item = st.session_state.favorites[i + j]
+                if i + j < len(favorites):
                     with cols[j]:
-                        st.image(item["url"], use_container_width=True)
-                        st.markdown(f"**{item['prompt'][:50]}...**")
-                        st.caption(f"🤖 {item['model']}")
-                        
-                        col_a, col_b = st.columns(2)
-                        with col_a:
-                            if st.button("💔", key=f"unfav_{item['id']}"):
-                                toggle_favorite(item['id'])
-                                st.rerun()
-                        
-                        with col_b:
-                            img = download_image(item["url"])
-                            if img:
-                                buf = io.BytesIO()
-                                img.save(buf, format="PNG")
-                                st.download_button(
-                                    "📥",
-                                    buf.getvalue(),
-                                    file_name=f"fav_{item['id'][:8]}.png",
-                                    mime="image/png",
-                                    key=f"dlfav_{item['id']}"
-                                )
+                        show_favorite_card(favorites[i + j], thumbs)
+        
+        prefetch_thumbnails(collection.favorites(limit=GRID_PAGE_SIZE, offset=offset + GRID_PAGE_SIZE))
     else:
         st.info("⭐ 还没有收藏，去画廊收藏作品吧！")
 
 # Tab 6: 生成历史
-with tab6:
+if active_view == VIEWS[5]:
     st.markdown("## 📜 生成历史")
     
-    if st.session_state.generation_history:
-        st.markdown(f"共 **{len(st.session_state.generation_history)}** 张")
+    history_count = collection.count_history()
+    if history_count:
+        st.markdown(f"共 **{history_count}** 张")
         
         col1, col2 = st.columns(2)
         
         with col1:
-            history_json = json.dumps(st.session_state.generation_history, ensure_ascii=False, indent=2)
-            st.download_button(
-                "📥 导出JSON",
-                history_json,
-                file_name=f"history_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-                mime="application/json"
-            )
+            history_export()
         
         with col2:
             if st.button("🗑️ 清空历史"):
-                st.session_state.generation_history = []
+                collection.clear_history()
                 st.rerun()
         
         st.markdown("---")
         
-        show_limit = st.slider("显示数量", 10, 100, 20, 10)
+        st.date_input("📅 跳转到日期", value=None, key="date_history_page",
+                      on_change=jump_to_date,
+                      args=("history_page", HISTORY_PAGE_SIZE,
+                            lambda day: collection.history_position(datetime.combine(day, dt_time.max).timestamp())))
+        offset = page_nav("history_page", history_count, HISTORY_PAGE_SIZE)
+        history_to_show = collection.history(limit=HISTORY_PAGE_SIZE, offset=offset)
+        thumbs = load_thumbnails(history_to_show)
         
-        for idx, item in enumerate(st.session_state.generation_history[:show_limit]):
-            with st.expander(f"#{idx+1} | {item['timestamp']} | {item['model']}"):
-                col1, col2 = st.columns([1, 2])
-                
-                with col1:
-                    st.image(item["url"], use_container_width=True)
-                
-                with col2:
-                    st.markdown("**提示词:**")
-                    st.code(item['prompt'], language=None)
-                    st.markdown(f"**模型:** {item['model']}")
-                    st.markdown(f"**尺寸:** {item['width']} x {item['height']}")
-                    if item.get("seed"):
-                        st.markdown(f"**种子:** {item['seed']}")
-                    
-                    if st.button("🔄 复用配置", key=f"reuse_{item['id']}"):
-                        with st.spinner("生成中..."):
-                            model_id = get_model_by_name(item["model"])
-                            new_url = generate_image_url(
-                                item["prompt"],
-                                model=model_id,
-                                width=item["width"],
-                                height=item["height"],
-                                seed=item.get("seed"),
-                                nologo=True
-                            )
-                            add_to_gallery(new_url, item["prompt"], item["model"], item["width"], item["height"], item["styles"], item.get("seed"))
-                            st.success("完成！")
-                            st.rerun()
+        for idx, item in enumerate(history_to_show):
+            show_history_entry(offset + idx, item, thumbs)
+        
+        prefetch_thumbnails(collection.history(limit=HISTORY_PAGE_SIZE, offset=offset + HISTORY_PAGE_SIZE))
     else:
         st.info("📜 还没有历史记录")
+    
+    history_import()
+
+# 侧边栏 - 任务队列状态（局部刷新，不阻塞页面）
+def job_panel(polling):
+    """展示本作品库的生成任务；有新作品或任务全部结束时整页刷新一次以更新画廊"""
+    if harvest_jobs() or (polling and not job_queue.has_active(st.session_state.library_id)):
+        st.rerun()
+    jobs = job_queue.jobs(st.session_state.library_id)[:JOB_PANEL_LIMIT]
+    if not jobs:
+        return
+    st.markdown("### 📋 生成任务")
+    upstream = get_client().limiter.snapshot()["endpoints"]
+    if upstream:
+        st.caption(" · ".join(
+            f"{host}: 并发 {stats['in_flight']}/{stats['limit']}，排队 {stats['waiting'] + stats['bucket']['waiting']}"
+            for host, stats in upstream.items()
+        ))
+    for job in jobs:
+        st.markdown(f"**{JOB_STATUS_LABELS[job.status]}** · {job.label}")
+        if job.status == QUEUED:
+            st.caption(f"已等待 {job.wait_time:.1f}s")
+        else:
+            st.progress(job.done / job.total, text=f"{job.done}/{job.total} · 排队 {job.wait_time:.1f}s · 执行 {job.run_time:.1f}s")
+        if job.final_prompt != job.prompt:
+            with st.expander("查看增强后的提示词"):
+                st.code(job.final_prompt, language=None)
+        if job.errors:
+            st.caption(f"⚠️ {len(job.errors)} 个错误: {job.errors[0]}")
+
+with st.sidebar:
+    polling = job_queue.has_active(st.session_state.library_id)
+    st.session_state.job_polling = polling
+    st.fragment(job_panel, run_every=JOB_POLL_INTERVAL if polling else None)(polling)
 
 # 页脚
 st.markdown("---")
@@ -1029,3 +872,5 @@ st.markdown("""
     <p style="font-size: 0.9em; margin-top: 15px;">✨ 释放创造力，让AI成为你的艺术伙伴 ✨</p>
 </div>
 """, unsafe_allow_html=True)
+
+RERUN_SECONDS.observe(time.perf_counter() - run_started, view=active_view)
@@ -0,0 +1 @@
+"""离线基准测试：本地 Pollinations 替身服务与各项性能测量（python -m bench.run）"""
@@ -0,0 +1,250 @@
+"""本地 Pollinations 替身服务：与 generate_image_url、enhance_prompt 使用同一套URL，返回所需尺寸的合成图片
+
+延迟按分布抽样，可按比例注入 500 错误与带 Retry-After 的 429 限流。单独运行::
+
+    python -m bench.fake_server --port 8765 --latency lognormal:0.8,0.5 --rate-limit-rate 0.05
+
+然后按输出设置 STUDIO_IMAGE_API / STUDIO_TEXT_API 启动应用，即可离线使用全部功能。
+"""
+import argparse
+import io
+import random
+import sys
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from PIL import Image
+
+DEFAULT_SIZE = 1024
+# 合成图片按 (宽, 高, 种子) 缓存，避免编码耗时混入延迟
+IMAGE_CACHE_ENTRIES = 64
+
+
+class Latency:
+    """延迟分布：fixed:秒、uniform:下限,上限、lognormal:中位数,sigma、exponential:均值"""
+
+    KINDS = ("fixed", "uniform", "lognormal", "exponential")
+
+    def __init__(self, spec="fixed:0"):
+        kind, _, args = spec.partition(":")
+        if kind not in self.KINDS:
+            raise ValueError(f"未知的延迟分布: {kind}")
+        try:
+            self.params = tuple(float(x) for x in args.split(",")) if args else (0.0,)
+        except ValueError:
+            raise ValueError(f"延迟参数不合法: {spec}") from None
+        expected = 2 if kind in ("uniform", "lognormal") else 1
+        if len(self.params) != expected:
+            raise ValueError(f"{kind} 需要 {expected} 个参数: {spec}")
+        self.kind = kind
+        self.spec = spec
+
+    def sample(self, rng=random):
+        if self.kind == "fixed":
+            return self.params[0]
+        if self.kind == "uniform":
+            return rng.uniform(*self.params)
+        if self.kind == "lognormal":
+            median, sigma = self.params
+            return median * rng.lognormvariate(0, sigma) if median > 0 else 0.0
+        mean = self.params[0]
+        return rng.expovariate(1 / mean) if mean > 0 else 0.0
+
+    def __repr__(self):
+        return self.spec
+
+
+class FakePollinations:
+    """在后台线程中运行的替身服务，记录请求、错误与限流次数"""
+
+    def __init__(self, host="127.0.0.1", port=0, latency="fixed:0", text_latency="fixed:0",
+                 error_rate=0.0, rate_limit_rate=0.0, retry_after=1.0, image_format="JPEG", seed=None):
+        self.latency = Latency(latency)
+        self.text_latency = Latency(text_latency)
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.image_format = image_format
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+        self._rng = random.Random(seed)
+        self._images = OrderedDict()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), partial(_Handler, self))
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def image_api(self):
+        return f"{self.base_url}/prompt"
+
+    @property
+    def text_api(self):
+        return self.base_url
+
+    def environ(self):
+        """让 studio 指向本服务所需的环境变量（须在导入 studio 之前设置）"""
+        return {"STUDIO_IMAGE_API": self.image_api, "STUDIO_TEXT_API": self.text_api}
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-pollinations", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """在当前线程中运行，直到中断"""
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stats(self):
+        with self._lock:
+            return {"requests": self.requests, "errors": self.errors, "throttled": self.throttled}
+
+    def config(self):
+        return {
+            "latency": self.latency.spec,
+            "text_latency": self.text_latency.spec,
+            "error_rate": self.error_rate,
+            "rate_limit_rate": self.rate_limit_rate,
+            "retry_after": self.retry_after,
+            "image_format": self.image_format,
+        }
+
+    def _decide(self, latency):
+        """本次请求的 (延迟, 状态码)"""
+        with self._lock:
+            self.requests += 1
+            delay = latency.sample(self._rng)
+            roll = self._rng.random()
+            if roll < self.rate_limit_rate:
+                self.throttled += 1
+                return 0.0, 429
+            if roll < self.rate_limit_rate + self.error_rate:
+                self.errors += 1
+                return delay, 500
+            return delay, 200
+
+    def image(self, width, height, seed):
+        key = (width, height, seed)
+        with self._lock:
+            data = self._images.get(key)
+            if data is not None:
+                self._images.move_to_end(key)
+                return data
+        # 种子决定底色，不同种子得到不同的字节
+        color = (seed * 37 % 256, seed * 91 % 256, seed * 53 % 256)
+        buffer = io.BytesIO()
+        Image.new("RGB", (width, height), color).save(buffer, self.image_format)
+        data = buffer.getvalue()
+        with self._lock:
+            self._images[key] = data
+            while len(self._images) > IMAGE_CACHE_ENTRIES:
+                self._images.popitem(last=False)
+        return data
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # 头部与正文分两次写出，不关 Nagle 会与客户端的延迟确认叠出约 40ms 的假延迟
+    disable_nagle_algorithm = True
+
+    def __init__(self, fake, *args, **kwargs):
+        self.fake = fake
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        parts = urllib.parse.urlsplit(self.path)
+        query = dict(urllib.parse.parse_qsl(parts.query))
+        is_image = parts.path.startswith("/prompt/")
+        delay, status = self.fake._decide(self.fake.latency if is_image else self.fake.text_latency)
+        if delay:
+            time.sleep(delay)
+        if status == 429:
+            self._send(429, b"Too Many Requests", "text/plain", {"Retry-After": f"{self.fake.retry_after:g}"})
+        elif status != 200:
+            self._send(status, b"Internal Server Error", "text/plain")
+        elif is_image:
+            try:
+                width = int(query.get("width", DEFAULT_SIZE))
+                height = int(query.get("height", DEFAULT_SIZE))
+                seed = int(query.get("seed", 0))
+            except ValueError:
+                self._send(400, b"Bad Request", "text/plain")
+                return
+            self._send(200, self.fake.image(width, height, seed), Image.MIME[self.fake.image_format])
+        else:
+            # 文本接口：从增强指令中取出原始提示词，返回更长的“增强”结果
+            instruction = urllib.parse.unquote(parts.path.lstrip("/"))
+            original = instruction.partition("Original prompt: ")[2].partition("\n")[0] or instruction[:80]
+            body = f"{original}, highly detailed, cinematic lighting, volumetric light, 8k, masterpiece"
+            self._send(200, body.encode("utf-8"), "text/plain; charset=utf-8")
+
+    def _send(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def add_server_arguments(parser):
+    """替身服务的命令行参数，供本模块与 bench.run 共用"""
+    parser.add_argument("--latency", default="fixed:0.05", help="图片延迟分布，如 fixed:0.2、uniform:0.1,0.5、"
+                                                                "lognormal:0.8,0.5、exponential:0.3")
+    parser.add_argument("--text-latency", default="fixed:0.02", help="文本接口延迟分布")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 500 的比例")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="返回 429 的比例")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="429 响应的 Retry-After 秒数")
+    parser.add_argument("--format", default="JPEG", choices=("JPEG", "PNG", "WEBP"), help="合成图片格式")
+
+
+def server_from_args(args, port=0):
+    return FakePollinations(port=port, latency=args.latency, text_latency=args.text_latency,
+                            error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+                            retry_after=args.retry_after, image_format=args.format)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="运行本地 Pollinations 替身服务")
+    parser.add_argument("--port", type=int, default=8765)
+    add_server_arguments(parser)
+    args = parser.parse_args(argv)
+    fake = server_from_args(args, port=args.port)
+    for name, value in fake.environ().items():
+        print(f"export {name}={value}")
+    try:
+        fake.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
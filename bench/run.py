@@ -0,0 +1,422 @@
+"""离线基准测试：启动本地替身服务，测量冷启动、批量吞吐、下载延迟、打包下载、每次重跑的脚本耗时与作品集合内存，结果写为 JSON
+
+命令行::
+
+    python -m bench.run                                   # 全部套件
+    python -m bench.run --suite rerun --sizes 100,1000 -o bench.json
+    python -m bench.run --suite batch --latency lognormal:0.5,0.6 --rate-limit-rate 0.05
+    python -m bench.run --suite startup                   # 冷启动超出预算时退出码为 1
+
+studio 在导入时读取环境变量，所以这里先启动替身服务、写好环境变量（临时的缓存与数据目录），再导入 studio。
+默认按线上的限速配置运行（自适应令牌桶与并发窗口），测的是用户实际得到的吞吐；加 --unlimited-rates 则放开令牌桶，只测代码本身。
+"""
+import argparse
+import gc
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+
+from .fake_server import add_server_arguments, server_from_args
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+# 放开客户端限速时使用的速率；替身服务的 429 仍会触发自适应并发收缩
+UNLIMITED_RATE = "100000"
+
+# 冷启动预算（毫秒）：导入 studio 各模块、空作品库首屏的完整脚本运行；超出时 startup 套件报告 over_budget
+STARTUP_BUDGET_MS = {"studio_import": 60, "first_paint": 600}
+
+# 在全新子进程中测量：先导入 Streamlit（服务进程本来就有），再导入 studio，最后用 AppTest 跑首屏与一次重跑
+_STARTUP_PROBE = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+start = time.perf_counter()
+import studio.archive, studio.batch, studio.bundle, studio.catalog, studio.compare, studio.downloads
+import studio.gallery, studio.http_client, studio.image_cache, studio.jobs, studio.markup, studio.metrics
+import studio.renditions, studio.store, studio.template_search, studio.thumbnails
+imported = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=120)
+at.run()
+painted = time.perf_counter()
+at.run()
+rerun = time.perf_counter()
+print(json.dumps({
+    "studio_import": imported - start,
+    "first_paint": painted - imported,
+    "rerun": rerun - painted,
+    "lazy": {name: name not in sys.modules for name in ("PIL.Image", "requests")},
+    "errors": [str(e.value) for e in at.exception],
+}))
+"""
+
+# 每张图的种子全局递增，保证URL互不相同，不会被缓存或请求合并吃掉
+_seeds = itertools.count(1)
+
+
+def summarize(samples):
+    """样本的秒数 -> 毫秒统计"""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 2),
+        "p50_ms": round(percentile(50) * 1000, 2),
+        "p95_ms": round(percentile(95) * 1000, 2),
+        "p99_ms": round(percentile(99) * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2),
+    }
+
+
+def _delta(after, before):
+    return {key: after[key] - before[key] for key in after}
+
+
+def _image_urls(label, count, size):
+    from studio.pollinations import generate_image_url
+
+    return [generate_image_url(f"bench {label}", width=size, height=size, seed=next(_seeds)) for _ in range(count)]
+
+
+def populate(store, library, count, size=64):
+    """向作品库写入 count 件合成作品：模型、风格轮换，时间间隔一分钟，每三件收藏一件"""
+    from studio.catalog import MODELS_BY_ID, STYLE_OPTIONS, TEMPLATE_TEXTS
+    from studio.gallery import GalleryItem
+
+    models = [(info["name"], model_id) for model_id, info in MODELS_BY_ID.items()]
+    styles = [style for group in STYLE_OPTIONS.values() for style in group]
+    start = time.time() - count * 60
+    records = []
+    for i in range(count):
+        model, model_id = models[i % len(models)]
+        item = GalleryItem(
+            f"{library[:8]}{i:08d}",
+            f"{TEMPLATE_TEXTS[i % len(TEMPLATE_TEXTS)]}, variation {i}",
+            model,
+            model_id,
+            size,
+            size,
+            (styles[i % len(styles)], styles[(i * 7) % len(styles)]),
+            next(_seeds),
+            created=start + i * 60,
+            is_favorite=i % 3 == 0,
+        )
+        records.append((item, True, True))
+        if len(records) >= 1000:
+            store.import_items(library, records)
+            records = []
+    if records:
+        store.import_items(library, records)
+
+
+def bench_batch(fake, args):
+    """批量吞吐：共享批量线程池并发拉取一组互不相同的图片"""
+    from studio.batch import MAX_BATCH_WORKERS, run_batch
+    from studio.pollinations import fetch_original
+
+    def fetch(url):
+        return fetch_original(url, use_cache=False).data
+
+    runs = []
+    for count in args.batch_counts:
+        urls = _image_urls(f"batch {count}", count, args.image_size)
+        before = fake.stats()
+        start = time.perf_counter()
+        results = run_batch(urls, fetch=fetch)
+        wall = time.perf_counter() - start
+        ok = sum(1 for result in results if result.error is None)
+        runs.append({
+            "images": count,
+            "ok": ok,
+            "failed": count - ok,
+            "wall_s": round(wall, 3),
+            "images_per_s": round(ok / wall, 2) if wall else None,
+            "latency": summarize([result.elapsed for result in results]),
+            "upstream": _delta(fake.stats(), before),
+        })
+    return {"workers": MAX_BATCH_WORKERS, "image_size": args.image_size, "runs": runs}
+
+
+def bench_download(fake, args):
+    """单张下载延迟：首次拉取（经限流器、重试并写入磁盘缓存）与缓存命中"""
+    from studio.pollinations import fetch_original
+
+    results = []
+    for size in args.image_sizes:
+        urls = _image_urls(f"download {size}", args.downloads, size)
+        cold, warm, failed, size_bytes = [], [], 0, 0
+        before = fake.stats()
+        for url in urls:
+            start = time.perf_counter()
+            try:
+                size_bytes = len(fetch_original(url).data)
+            except Exception:
+                failed += 1
+                continue
+            cold.append(time.perf_counter() - start)
+        upstream = _delta(fake.stats(), before)
+        for url in urls:
+            start = time.perf_counter()
+            try:
+                fetch_original(url)
+            except Exception:
+                continue
+            warm.append(time.perf_counter() - start)
+        results.append({
+            "size": size,
+            "bytes": size_bytes,
+            "failed": failed,
+            "cold": summarize(cold),
+            "cached": summarize(warm),
+            "upstream": upstream,
+        })
+    return {"runs": results}
+
+
+def bench_rerun(fake, args):
+    """每次重跑的脚本耗时：用 AppTest 在不同大小的作品库上逐个视图测量"""
+    from streamlit.testing.v1 import AppTest
+
+    from studio.store import get_store
+
+    store = get_store()
+    results = []
+    for count in args.sizes:
+        library = uuid.uuid4().hex
+        populate(store, library, count)
+        at = AppTest.from_file(APP_PATH, default_timeout=args.timeout)
+        at.query_params["lib"] = library
+        at.run()
+        views = at.radio(key="active_view").options
+        timings = {}
+        errors = []
+        for view in views:
+            at.radio(key="active_view").set_value(view).run()
+            # 预热：首屏缩略图与各类缓存
+            for _ in range(args.warmup):
+                at.run()
+            samples = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                at.run()
+                samples.append(time.perf_counter() - start)
+            timings[view] = summarize(samples)
+            errors.extend(str(e.value) for e in at.exception)
+        results.append({"items": count, "views": timings, "errors": errors})
+    return {"repeat": args.repeat, "runs": results}
+
+
+def bench_memory(fake, args):
+    """作品集合内存：会话载入不同大小的作品库后常驻的字节数"""
+    from studio.gallery import GalleryCollection
+    from studio.store import get_store
+
+    store = get_store()
+    results = []
+    for count in args.sizes:
+        library = uuid.uuid4().hex
+        populate(store, library, count)
+        gc.collect()
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            start = time.perf_counter()
+            collection = GalleryCollection(store, library)
+            load_time = time.perf_counter() - start
+            gc.collect()
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        retained = current - before
+        results.append({
+            "items": count,
+            "loaded": collection.count_history(),
+            "load_ms": round(load_time * 1000, 2),
+            "retained_bytes": retained,
+            "peak_bytes": peak - before,
+            "bytes_per_item": round(retained / count, 1) if count else None,
+        })
+        del collection
+    return {"runs": results}
+
+
+def bench_bundle(fake, args):
+    """打包下载：把整个画廊流式写成 ZIP，首次（全部从替身服务拉取）与再次（缓存命中）的耗时与内存峰值"""
+    import zipfile
+
+    from studio.bundle import DEFAULT_WINDOW, iter_bundle
+    from studio.store import get_store
+
+    store = get_store()
+    results = []
+    for count in args.bundle_counts:
+        library = uuid.uuid4().hex
+        populate(store, library, count, size=args.bundle_image_size)
+        items = store.gallery(library)
+        runs = {}
+        for label in ("cold", "cached"):
+            path = os.path.join(os.path.dirname(os.environ["STUDIO_CACHE_DIR"]), f"bundle-{library[:8]}-{label}.zip")
+            before = fake.stats()
+            gc.collect()
+            tracemalloc.start()
+            try:
+                start = time.perf_counter()
+                with open(path, "wb") as f:
+                    for chunk in iter_bundle(items):
+                        f.write(chunk)
+                wall = time.perf_counter() - start
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+            with zipfile.ZipFile(path) as archive:
+                names = archive.namelist()
+                corrupt = archive.testzip()
+            runs[label] = {
+                "wall_s": round(wall, 3),
+                "images_per_s": round(count / wall, 2) if wall else None,
+                "peak_bytes": peak,
+                "zip_bytes": os.path.getsize(path),
+                "entries": len(names),
+                "valid": corrupt is None,
+                "upstream": _delta(fake.stats(), before),
+            }
+            os.remove(path)
+        results.append({"images": count, **runs})
+    return {"window": DEFAULT_WINDOW, "image_size": args.bundle_image_size, "runs": results}
+
+
+def bench_startup(fake, args):
+    """冷启动：在全新进程中测量 studio 的导入耗时与首屏脚本耗时，并与预算比较"""
+    samples = {name: [] for name in ("studio_import", "first_paint", "rerun")}
+    lazy, errors = {}, []
+    root = os.path.dirname(APP_PATH)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, (root, os.environ.get("PYTHONPATH")))))
+    for _ in range(args.startup_runs):
+        output = subprocess.run([sys.executable, "-c", _STARTUP_PROBE, APP_PATH], capture_output=True, text=True,
+                                cwd=root, env=env, timeout=args.timeout, check=True).stdout
+        probe = json.loads(output.strip().splitlines()[-1])
+        for name in samples:
+            samples[name].append(probe[name])
+        lazy = probe["lazy"]
+        errors.extend(probe["errors"])
+    timings = {name: summarize(values) for name, values in samples.items()}
+    over_budget = [name for name, budget in STARTUP_BUDGET_MS.items() if timings[name]["p50_ms"] > budget]
+    return {
+        "runs": args.startup_runs,
+        "timings": timings,
+        "budget_ms": STARTUP_BUDGET_MS,
+        "over_budget": over_budget,
+        "not_imported_at_first_paint": lazy,
+        "errors": errors,
+    }
+
+
+SUITES = {
+    "startup": bench_startup,
+    "batch": bench_batch,
+    "download": bench_download,
+    "rerun": bench_rerun,
+    "memory": bench_memory,
+    "bundle": bench_bundle,
+}
+
+
+def _int_list(text):
+    return [int(x) for x in text.split(",") if x.strip()]
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(APP_PATH), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _configure_environment(fake, args):
+    workdir = args.workdir or tempfile.mkdtemp(prefix="studio-bench-")
+    os.environ.update(fake.environ())
+    os.environ["STUDIO_CACHE_DIR"] = os.path.join(workdir, "cache")
+    os.environ["STUDIO_DATA_DIR"] = os.path.join(workdir, "data")
+    if args.unlimited_rates:
+        for name in ("STUDIO_RATE_PER_HOST", "STUDIO_RATE_PER_HOST_BURST",
+                     "STUDIO_RATE_PER_MODEL", "STUDIO_RATE_PER_MODEL_BURST"):
+            os.environ[name] = UNLIMITED_RATE
+    return workdir
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="离线性能基准（本地 Pollinations 替身服务）")
+    parser.add_argument("--suite", default=",".join(SUITES), help=f"要运行的套件，逗号分隔：{','.join(SUITES)}")
+    parser.add_argument("-o", "--output", help="结果 JSON 文件；缺省输出到标准输出")
+    parser.add_argument("--workdir", help="缓存与数据目录；缺省为新的临时目录")
+    parser.add_argument("--unlimited-rates", action="store_true", help="放开客户端令牌桶（并发窗口仍自适应）")
+    parser.add_argument("--sizes", type=_int_list, default=[100, 1000, 5000], help="rerun/memory 的作品库大小")
+    parser.add_argument("--batch-counts", type=_int_list, default=[4, 16, 64], help="batch 每轮的图片数")
+    parser.add_argument("--image-size", type=int, default=1024, help="batch 的图片边长")
+    parser.add_argument("--image-sizes", type=_int_list, default=[512, 1024], help="download 的图片边长")
+    parser.add_argument("--downloads", type=int, default=20, help="download 每种尺寸的次数")
+    parser.add_argument("--repeat", type=int, default=5, help="rerun 每个视图的计时次数")
+    parser.add_argument("--warmup", type=int, default=1, help="rerun 每个视图计时前的预热次数")
+    parser.add_argument("--timeout", type=float, default=120, help="rerun、startup 单次运行的超时秒数")
+    parser.add_argument("--bundle-counts", type=_int_list, default=[100, 500], help="bundle 每轮打包的作品数")
+    parser.add_argument("--bundle-image-size", type=int, default=512, help="bundle 的图片边长")
+    parser.add_argument("--startup-runs", type=int, default=5, help="startup 启动的进程数")
+    add_server_arguments(parser)
+    args = parser.parse_args(argv)
+
+    suites = [name.strip() for name in args.suite.split(",") if name.strip()]
+    unknown = [name for name in suites if name not in SUITES]
+    if unknown:
+        parser.error(f"未知套件: {', '.join(unknown)}")
+
+    with server_from_args(args) as fake:
+        workdir = _configure_environment(fake, args)
+        report = {
+            "meta": {
+                "started": datetime.now().isoformat(timespec="seconds"),
+                "revision": _git_revision(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "workdir": workdir,
+                "rate_limits": "unlimited" if args.unlimited_rates else "default",
+                "server": fake.config(),
+            },
+            "results": {},
+        }
+        for name in suites:
+            print(f"[bench] {name} ...", file=sys.stderr)
+            start = time.perf_counter()
+            report["results"][name] = SUITES[name](fake, args)
+            report["results"][name]["elapsed_s"] = round(time.perf_counter() - start, 2)
+        report["meta"]["upstream"] = fake.stats()
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"结果已写入 {args.output}", file=sys.stderr)
+    else:
+        print(text)
+    over_budget = report["results"].get("startup", {}).get("over_budget")
+    if over_budget:
+        print(f"超出冷启动预算: {', '.join(over_budget)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
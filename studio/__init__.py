@@ -0,0 +1 @@
+"""AI 艺术创作工作室的后端组件（与 Streamlit 界面解耦，可在命令行中复用）"""
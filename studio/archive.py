@@ -0,0 +1,257 @@
+"""作品库导出与导入：按批从存储流式读出，逐条编码为 NDJSON 或 JSON 数组，可选 gzip；导入同样逐条解析、按批写入
+
+导出记录与旧版“导出JSON”的字段一致，另附 model_id、in_gallery、in_history，旧版导出的文件也可以直接导入。
+
+命令行::
+
+    python -m studio.archive export <作品库ID> history.ndjson.gz
+    python -m studio.archive import <作品库ID> history.ndjson.gz
+"""
+import argparse
+import gzip
+import io
+import json
+import sys
+import zlib
+from datetime import datetime
+
+from .catalog import get_model_id
+from .gallery import TIMESTAMP_FORMAT, GalleryItem
+from .pollinations import model_from_url
+
+FORMATS = ("ndjson", "json")
+IMPORT_BATCH = 500
+# 流式输出时攒够这么多字节再产出一块
+CHUNK_SIZE = 64 * 1024
+READ_SIZE = 64 * 1024
+
+_GZIP_MAGIC = b"\x1f\x8b"
+
+
+def export_record(item, in_gallery=True, in_history=True):
+    """一件作品的导出记录"""
+    record = item.to_dict()
+    record.update(model_id=item.model_id, in_gallery=in_gallery, in_history=in_history)
+    return record
+
+
+def _encode(records, fmt):
+    if fmt == "ndjson":
+        for record in records:
+            yield json.dumps(record, ensure_ascii=False) + "\n"
+        return
+    # JSON 数组：与旧版导出相同的缩进格式，但逐条输出
+    yield "["
+    first = True
+    for record in records:
+        body = json.dumps(record, ensure_ascii=False, indent=2).replace("\n", "\n  ")
+        yield ("\n  " if first else ",\n  ") + body
+        first = False
+    yield "]" if first else "\n]"
+
+
+def _gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 输出 gzip 格式
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def iter_export(store, library, fmt="ndjson", compress=False):
+    """逐块产出导出文件的字节；内存占用与作品库大小无关"""
+    if fmt not in FORMATS:
+        raise ValueError(f"不支持的导出格式: {fmt}")
+    records = (export_record(*row) for row in store.iter_items(library))
+
+    def chunks():
+        buffer, size = [], 0
+        for text in _encode(records, fmt):
+            data = text.encode("utf-8")
+            buffer.append(data)
+            size += len(data)
+            if size >= CHUNK_SIZE:
+                yield b"".join(buffer)
+                buffer, size = [], 0
+        if buffer:
+            yield b"".join(buffer)
+
+    return _gzip_chunks(chunks()) if compress else chunks()
+
+
+def export_filename(fmt="ndjson", compress=False):
+    extension = "ndjson" if fmt == "ndjson" else "json"
+    return f"history_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}{'.gz' if compress else ''}"
+
+
+def _iter_json_array(stream):
+    """逐个解析 JSON 数组中的元素；缓冲区只保留尚未解析完的部分"""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    started = False
+    eof = False
+    while True:
+        position = 0
+        while True:
+            # 跳过空白与分隔符
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if not started and position < len(buffer):
+                if buffer[position] != "[":
+                    raise ValueError("JSON 导出文件应为数组")
+                started = True
+                position += 1
+                continue
+            if position < len(buffer) and buffer[position] == "]":
+                return
+            if position >= len(buffer):
+                break
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                break  # 元素还没读完整
+            yield value
+            position = end
+        buffer = buffer[position:]
+        if eof:
+            if buffer.strip():
+                raise ValueError("JSON 导出文件不完整")
+            return
+        chunk = stream.read(READ_SIZE)
+        if not chunk:
+            eof = True
+        buffer += chunk
+
+
+def iter_records(fileobj):
+    """从二进制文件对象中逐条读出导出记录，自动识别 gzip 与 NDJSON / JSON 数组"""
+    if not hasattr(fileobj, "peek"):
+        # BytesIO（如上传的文件）没有 peek
+        fileobj = io.BufferedReader(fileobj)
+    if fileobj.peek(2)[:2] == _GZIP_MAGIC:
+        fileobj = gzip.GzipFile(fileobj=fileobj, mode="rb")
+    text = io.TextIOWrapper(fileobj, encoding="utf-8")
+
+    first = ""
+    while True:
+        ch = text.read(1)
+        if not ch or not ch.isspace():
+            first = ch
+            break
+    if not first:
+        return
+    if first == "[":
+        yield from _iter_json_array(_Prepend(first, text))
+        return
+    # NDJSON：逐行解析
+    line = first + text.readline()
+    while line:
+        if line.strip():
+            yield json.loads(line)
+        line = text.readline()
+
+
+class _Prepend:
+    """把已读出的开头字符放回流前面"""
+
+    def __init__(self, prefix, stream):
+        self._prefix = prefix
+        self._stream = stream
+
+    def read(self, size):
+        if self._prefix:
+            data, self._prefix = self._prefix, ""
+            return data + self._stream.read(max(0, size - len(data)))
+        return self._stream.read(size)
+
+
+def record_to_item(record):
+    """导出记录 -> (作品, 在画廊中, 在历史中)；旧版导出没有 model_id 时从URL或模型名恢复，记录不合法时抛出 ValueError"""
+    try:
+        return _record_to_item(record)
+    except (TypeError, AttributeError) as e:
+        # 字段类型不对（如 "model": null）与缺字段一样按坏记录处理
+        raise ValueError(f"导出记录不合法（{record.get('id') if isinstance(record, dict) else record!r}）: {e}") from None
+
+
+def _record_to_item(record):
+    for field in ("id", "prompt", "model"):
+        if not isinstance(record[field], str):
+            raise TypeError(f"{field} 应为字符串")
+    model = record["model"]
+    model_id = record.get("model_id") or (model_from_url(record["url"]) if record.get("url") else None)
+    if model_id is None:
+        try:
+            model_id = get_model_id(model)
+        except KeyError:
+            # 只有旧版导出的历史记录在此回退：作品早已生成，模型名可能已从目录中下线
+            model_id = "flux"
+    created = record.get("created")
+    if created is None:
+        created = datetime.strptime(record["timestamp"], TIMESTAMP_FORMAT).timestamp()
+    item = GalleryItem(
+        record["id"],
+        record["prompt"],
+        model,
+        model_id,
+        record.get("width"),
+        record.get("height"),
+        record.get("styles") or (),
+        record.get("seed"),
+        created=created,
+        is_favorite=bool(record.get("is_favorite", False)),
+    )
+    return item, bool(record.get("in_gallery", True)), bool(record.get("in_history", True))
+
+
+def import_archive(store, library, fileobj, batch_size=IMPORT_BATCH):
+    """流式导入一份导出文件，按批写入；返回 (新增数, 已存在而跳过的数)
+
+    每批单独提交：中途遇到坏记录或文件截断时，之前的批次已经保存，调用方应据此刷新内存中的视图。
+    """
+    inserted = total = 0
+    batch = []
+    for record in iter_records(fileobj):
+        batch.append(record_to_item(record))
+        if len(batch) >= batch_size:
+            inserted += store.import_items(library, batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        inserted += store.import_items(library, batch)
+        total += len(batch)
+    return inserted, total - inserted
+
+
+def main(argv=None):
+    from .store import get_store
+
+    parser = argparse.ArgumentParser(description="导出或导入作品库（NDJSON / JSON，可选 gzip）")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="导出作品库")
+    export_parser.add_argument("library", help="作品库ID（页面URL中的 lib 参数）")
+    export_parser.add_argument("output", help="输出文件；以 .gz 结尾时自动压缩")
+    export_parser.add_argument("--format", choices=FORMATS, default="ndjson")
+    import_parser = commands.add_parser("import", help="导入导出文件")
+    import_parser.add_argument("library", help="作品库ID")
+    import_parser.add_argument("input", help="导出文件（自动识别 gzip 与格式）")
+    args = parser.parse_args(argv)
+
+    store = get_store()
+    if args.command == "export":
+        with open(args.output, "wb") as f:
+            for chunk in iter_export(store, args.library, args.format, compress=args.output.endswith(".gz")):
+                f.write(chunk)
+        print(f"已导出到 {args.output}")
+    else:
+        with open(args.input, "rb") as f:
+            inserted, skipped = import_archive(store, args.library, f)
+        print(f"导入完成：新增 {inserted} 件，跳过已存在的 {skipped} 件")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
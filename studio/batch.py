@@ -0,0 +1,80 @@
+"""批量生成引擎：在有界线程池中并发拉取多张图片，逐张汇报进度"""
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .image_cache import get_image_cache
+from .metrics import record_error
+from .pollinations import fetch_image
+
+# 进程级并发上限，所有会话共享同一个线程池
+MAX_BATCH_WORKERS = int(os.environ.get("STUDIO_BATCH_WORKERS", "8"))
+
+BatchResult = namedtuple("BatchResult", ["index", "url", "data", "error", "elapsed"])
+
+_executor = None
+_executor_lock = threading.Lock()
+
+_prefetching = set()
+_prefetch_lock = threading.Lock()
+
+
+def get_executor():
+    """获取进程共享的批量拉取线程池"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=MAX_BATCH_WORKERS, thread_name_prefix="batch")
+    return _executor
+
+
+def _fetch_one(fetch, index, url):
+    start = time.perf_counter()
+    try:
+        data = fetch(url)
+        return BatchResult(index, url, data, None, time.perf_counter() - start)
+    except Exception as e:
+        return BatchResult(index, url, None, e, time.perf_counter() - start)
+
+
+def run_batch(urls, on_progress=None, fetch=fetch_image):
+    """并发拉取一组URL，结果按输入顺序返回；每完成一张调用 on_progress(done, total, result)"""
+    executor = get_executor()
+    futures = [executor.submit(_fetch_one, fetch, i, url) for i, url in enumerate(urls)]
+    results = [None] * len(futures)
+    for done, future in enumerate(as_completed(futures), 1):
+        result = future.result()
+        results[result.index] = result
+        if on_progress:
+            on_progress(done, len(futures), result)
+    return results
+
+
+def _prefetch_one(fetch, url):
+    try:
+        fetch(url)
+    except Exception as e:
+        # 预取只是优化，失败时留给真正的下载请求处理，这里只计数
+        record_error("prefetch", e)
+    finally:
+        with _prefetch_lock:
+            _prefetching.discard(url)
+
+
+def prefetch(urls, fetch=fetch_image):
+    """在共享线程池中后台预取图片到磁盘缓存；已缓存或正在预取的URL会被跳过，返回新提交的数量"""
+    cache = get_image_cache()
+    submitted = 0
+    for url in urls:
+        if url in cache:
+            continue
+        with _prefetch_lock:
+            if url in _prefetching:
+                continue
+            _prefetching.add(url)
+        get_executor().submit(_prefetch_one, fetch, url)
+        submitted += 1
+    return submitted
@@ -0,0 +1,254 @@
+"""无界面批量生成：读取 JSONL 任务文件，在有界线程池中生成并落盘，附带清单与断点续跑
+
+任务文件每行一个 JSON 对象::
+
+    {"id": "cat-001", "prompt": "a cat", "model": "Flux 1.1 Pro", "size": "方形 1:1 (1024x1024)", "seed": 42}
+
+- ``prompt`` 必填；``id`` 缺省时按任务内容生成，同一任务重跑时ID不变
+- ``model`` 可以是显示名或模型ID，缺省为 flux
+- ``size`` 取 IMAGE_SIZES 中的名称，或直接给出 ``width``/``height``，缺省 1024x1024
+- ``seed`` 缺省时由任务ID推导，重跑得到同一张图
+- ``enhance`` 为 true 时先经AI增强提示词（走提示词缓存），缺省取命令行 --enhance
+
+输出目录中 ``images/`` 存放图片，``manifest.jsonl`` 逐条记录结果，``completed.txt`` 为已完成任务ID的断点文件。
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .batch import MAX_BATCH_WORKERS
+from .catalog import IMAGE_SIZES, get_model_id, get_model_info
+from .downloads import FILE_EXTENSIONS
+from .pollinations import MAX_SEED, fetch_original, generate_image_url
+from .prompt_cache import enhance_prompt_cached
+
+DEFAULT_MODEL = "flux"
+DEFAULT_SIZE = (1024, 1024)
+
+MANIFEST_FILE = "manifest.jsonl"
+CHECKPOINT_FILE = "completed.txt"
+IMAGE_SUBDIR = "images"
+
+Job = namedtuple("Job", ["id", "prompt", "model", "model_id", "width", "height", "seed", "enhance"])
+
+
+class JobError(ValueError):
+    """任务记录不合法"""
+
+
+def _resolve_model(model):
+    if model is None:
+        model = DEFAULT_MODEL
+    info = get_model_info(model)
+    if info is not None:
+        return info["name"], model
+    try:
+        return model, get_model_id(model)
+    except KeyError:
+        raise JobError(f"未知模型: {model}") from None
+
+
+def _resolve_size(record):
+    if "size" in record:
+        if record["size"] not in IMAGE_SIZES or None in IMAGE_SIZES[record["size"]]:
+            raise JobError(f"未知尺寸: {record['size']}")
+        return IMAGE_SIZES[record["size"]]
+    width, height = record.get("width", DEFAULT_SIZE[0]), record.get("height", DEFAULT_SIZE[1])
+    # JSON 的 true/false 在 Python 中也是 int，需单独排除
+    if not (type(width) is int and type(height) is int and width > 0 and height > 0):
+        raise JobError(f"尺寸不合法: {width}x{height}")
+    return width, height
+
+
+def _derive_seed(job_id):
+    digest = hashlib.sha256(job_id.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % (MAX_SEED + 1)
+
+
+def parse_job(record, enhance=False):
+    """把一条任务记录规范化为 Job，不合法时抛出 JobError"""
+    prompt = record.get("prompt")
+    if not isinstance(prompt, str) or not prompt.strip():
+        raise JobError("缺少 prompt")
+    model, model_id = _resolve_model(record.get("model"))
+    width, height = _resolve_size(record)
+    enhance = bool(record.get("enhance", enhance))
+    job_id = record.get("id")
+    if job_id is None:
+        canonical = json.dumps([prompt, model_id, width, height, record.get("seed"), enhance], ensure_ascii=False)
+        job_id = hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+    job_id = str(job_id).strip()
+    if not job_id or "\n" in job_id:
+        raise JobError(f"任务ID不合法: {job_id!r}")
+    seed = record.get("seed")
+    if seed is None:
+        seed = _derive_seed(job_id)
+    elif type(seed) is not int or not 0 <= seed <= MAX_SEED:
+        raise JobError(f"种子不合法: {seed!r}")
+    return Job(job_id, prompt, model, model_id, width, height, seed, enhance)
+
+
+def read_jobs(path, enhance=False, on_error=None):
+    """逐行读取任务文件，产出 (行号, Job)；坏行交给 on_error(行号, 异常) 后跳过"""
+    with open(path, encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise JobError("每行应为一个 JSON 对象")
+                yield lineno, parse_job(record, enhance)
+            except (ValueError, TypeError) as e:
+                if on_error:
+                    on_error(lineno, e)
+
+
+def load_checkpoint(output_dir):
+    """读取已完成的任务ID"""
+    path = os.path.join(output_dir, CHECKPOINT_FILE)
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+
+def _safe_name(job_id):
+    # 任务ID可能含路径分隔符等字符，文件名取可读部分加ID摘要，避免冲突
+    readable = "".join(c if c.isalnum() or c in "-_" else "_" for c in job_id)[:48]
+    return f"{readable}-{hashlib.sha256(job_id.encode('utf-8')).hexdigest()[:8]}"
+
+
+class BulkRunner:
+    """执行一批任务；清单与断点在每个任务完成后立即追加落盘，进程中断后重跑会跳过已完成的任务"""
+
+    def __init__(self, output_dir, workers=MAX_BATCH_WORKERS, fetch=fetch_original, enhance=enhance_prompt_cached):
+        self.output_dir = output_dir
+        self.image_dir = os.path.join(output_dir, IMAGE_SUBDIR)
+        self.workers = workers
+        self._fetch = fetch
+        self._enhance = enhance
+        self._write_lock = threading.Lock()
+        os.makedirs(self.image_dir, exist_ok=True)
+
+    def _run_job(self, job):
+        start = time.perf_counter()
+        entry = {
+            "id": job.id,
+            "prompt": job.prompt,
+            "model": job.model,
+            "model_id": job.model_id,
+            "width": job.width,
+            "height": job.height,
+            "seed": job.seed,
+        }
+        try:
+            prompt = job.prompt
+            if job.enhance:
+                try:
+                    prompt = self._enhance(job.prompt)
+                except Exception as e:
+                    # 与界面行为一致：增强失败时使用原始提示词
+                    entry["enhance_error"] = str(e)
+            entry["final_prompt"] = prompt
+            url = generate_image_url(prompt, model=job.model_id, width=job.width, height=job.height,
+                                     seed=job.seed, enhance=False, nologo=True)
+            entry["url"] = url
+            image = self._fetch(url, use_cache=False)
+            filename = f"{_safe_name(job.id)}.{FILE_EXTENSIONS.get(image.content_type, 'bin')}"
+            path = os.path.join(self.image_dir, filename)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(image.data)
+            os.replace(tmp_path, path)
+            entry.update(file=os.path.join(IMAGE_SUBDIR, filename), content_type=image.content_type,
+                         bytes=len(image.data), error=None)
+        except Exception as e:
+            entry["error"] = str(e) or type(e).__name__
+        entry["elapsed"] = round(time.perf_counter() - start, 3)
+        entry["finished_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self._record(entry)
+        return entry
+
+    def _record(self, entry):
+        with self._write_lock:
+            with open(os.path.join(self.output_dir, MANIFEST_FILE), "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            if entry["error"] is None:
+                # 图片已经落盘后才写断点，崩溃时最多重做正在进行的任务
+                with open(os.path.join(self.output_dir, CHECKPOINT_FILE), "a", encoding="utf-8") as f:
+                    f.write(entry["id"] + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+
+    def run(self, jobs, on_result=None):
+        """执行任务（可为惰性迭代器），已完成或重复的ID跳过；返回 (成功数, 失败数, 跳过数)"""
+        completed = load_checkpoint(self.output_dir)
+        seen = set()
+        ok = failed = skipped = 0
+        # 在途任务数有上限，任务文件再大也只按需读取
+        in_flight = set()
+        max_in_flight = self.workers * 2
+
+        def harvest(futures):
+            nonlocal ok, failed
+            for future in futures:
+                entry = future.result()
+                if entry["error"] is None:
+                    ok += 1
+                else:
+                    failed += 1
+                if on_result:
+                    on_result(entry)
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bulk") as pool:
+            for job in jobs:
+                if job.id in completed or job.id in seen:
+                    skipped += 1
+                    continue
+                seen.add(job.id)
+                if len(in_flight) >= max_in_flight:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    harvest(done)
+                in_flight.add(pool.submit(self._run_job, job))
+            done, _ = wait(in_flight)
+            harvest(done)
+        return ok, failed, skipped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="从 JSONL 任务文件批量生成图片（可断点续跑）")
+    parser.add_argument("jobs", help="任务文件路径（JSONL）")
+    parser.add_argument("-o", "--output", default="bulk-output", help="输出目录")
+    parser.add_argument("--workers", type=int, default=MAX_BATCH_WORKERS, help="并发任务数")
+    parser.add_argument("--enhance", action="store_true", help="任务未指定时默认先AI增强提示词")
+    args = parser.parse_args(argv)
+
+    def report_invalid(lineno, error):
+        print(f"[跳过] 第 {lineno} 行: {error}", file=sys.stderr)
+
+    def report(entry):
+        status = f"失败: {entry['error']}" if entry["error"] else f"完成 {entry['elapsed']}s"
+        print(f"[{status}] {entry['id']} {entry['prompt'][:50]}", file=sys.stderr)
+
+    runner = BulkRunner(args.output, workers=args.workers)
+    jobs = (job for _, job in read_jobs(args.jobs, enhance=args.enhance, on_error=report_invalid))
+    try:
+        ok, failed, skipped = runner.run(jobs, on_result=report)
+    except KeyboardInterrupt:
+        # 线程池退出时会等在途任务写完清单与断点
+        print("已中断，重新运行同一命令即可从断点继续", file=sys.stderr)
+        return 130
+    print(f"批量生成完成：成功 {ok} 个，失败 {failed} 个，跳过 {skipped} 个；结果见 {args.output}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+"""作品打包下载：在独立的小线程池中并发拉取原图（优先读磁盘缓存），按到达顺序原样写入 ZIP，附带元数据清单
+
+ZIP 逐块流式产出：同一时刻内存中只有在途窗口内的几张图片，与打包的作品数无关。图片本身已经压缩，
+按 STORED 写入不再重复压缩，也不做任何编解码。
+
+命令行::
+
+    python -m studio.bundle <作品库ID> gallery.zip
+    python -m studio.bundle <作品库ID> favorites.zip --favorites
+    python -m studio.bundle <作品库ID> flux.zip --model "Flux 1.1 Pro"
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import zipfile
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+
+from .archive import export_record
+from .downloads import FILE_EXTENSIONS
+from .pollinations import fetch_original
+
+MANIFEST_FILE = "manifest.jsonl"
+IMAGE_DIR = "images"
+# 打包专用的拉取线程数；与生成、预取共用的批量线程池分开，大包不会拖慢其他会话的生成
+BUNDLE_WORKERS = int(os.environ.get("STUDIO_BUNDLE_WORKERS", "4"))
+# 在途（已提交、尚未写入 ZIP）的图片数上限，决定内存中最多同时持有几张图片
+DEFAULT_WINDOW = BUNDLE_WORKERS * 2
+# 页面内打包的作品数上限：下载按钮需要整个 ZIP 在内存中，更大的包请用命令行流式写入文件
+APP_MAX_ITEMS = int(os.environ.get("STUDIO_BUNDLE_APP_MAX_ITEMS", "200"))
+
+BundleEntry = namedtuple("BundleEntry", ["index", "item", "file", "content_type", "size", "error"])
+
+# ZIP 时间戳不能早于 1980 年
+_ZIP_EPOCH = (1980, 1, 1, 0, 0, 0)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """获取进程共享的打包线程池"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=BUNDLE_WORKERS, thread_name_prefix="bundle")
+    return _executor
+
+
+class _Sink:
+    """只追加的输出端；zipfile 检测到不可 seek 后改用数据描述符，写完即可取走"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _fetch_one(fetch, index, item):
+    try:
+        return index, item, fetch(item.url), None
+    except Exception as e:
+        return index, item, None, e
+
+
+def _zip_info(name, created):
+    date_time = time.localtime(created)[:6] if created else time.localtime()[:6]
+    info = zipfile.ZipInfo(name, date_time=max(date_time, _ZIP_EPOCH))
+    info.compress_type = zipfile.ZIP_STORED
+    return info
+
+
+def iter_bundle(items, fetch=fetch_original, window=DEFAULT_WINDOW, on_progress=None):
+    """逐块产出包含 items 原图与清单的 ZIP 字节；items 可为惰性迭代器
+
+    每写完一张调用 on_progress(已完成数, BundleEntry)；拉取失败的作品只记入清单，不中断打包。
+    """
+    sink = _Sink()
+    manifest = []
+    executor = get_executor()
+    in_flight = set()
+    done_count = 0
+    with zipfile.ZipFile(sink, "w", allowZip64=True) as archive:
+
+        def write(futures):
+            nonlocal done_count
+            for future in futures:
+                index, item, image, error = future.result()
+                if error is None:
+                    extension = FILE_EXTENSIONS.get(image.content_type, "bin")
+                    name = f"{IMAGE_DIR}/{index:04d}_{item.id[:8]}.{extension}"
+                    archive.writestr(_zip_info(name, item.created), image.data)
+                    entry = BundleEntry(index, item, name, image.content_type, len(image.data), None)
+                else:
+                    entry = BundleEntry(index, item, None, None, 0, str(error) or type(error).__name__)
+                record = export_record(item)
+                record.update(index=index, file=entry.file, content_type=entry.content_type, bytes=entry.size,
+                              error=entry.error)
+                manifest.append(record)
+                done_count += 1
+                if on_progress:
+                    on_progress(done_count, entry)
+
+        try:
+            for index, item in enumerate(items, 1):
+                if len(in_flight) >= window:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    write(done)
+                    yield sink.drain()
+                in_flight.add(executor.submit(_fetch_one, fetch, index, item))
+            while in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                write(done)
+                yield sink.drain()
+        finally:
+            # 提前停止读取时，还没开始的拉取不必再做
+            for future in in_flight:
+                future.cancel()
+
+        # 清单按作品原顺序排列，与图片到达的先后无关
+        manifest.sort(key=lambda record: record["index"])
+        info = zipfile.ZipInfo(MANIFEST_FILE, date_time=time.localtime()[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED
+        with archive.open(info, "w") as f:
+            for record in manifest:
+                f.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+    yield sink.drain()
+
+
+def bundle_filename(scope="gallery"):
+    return f"ai_art_{scope}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+
+
+def main(argv=None):
+    from .store import get_store
+
+    parser = argparse.ArgumentParser(description="把画廊或收藏打包为 ZIP（原图原样写入，附带清单）")
+    parser.add_argument("library", help="作品库ID（页面URL中的 lib 参数）")
+    parser.add_argument("output", help="输出的 ZIP 文件")
+    parser.add_argument("--favorites", action="store_true", help="只打包收藏")
+    parser.add_argument("--model", action="append", help="只打包这些模型的作品（显示名，可重复）")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW, help="在途图片数上限")
+    args = parser.parse_args(argv)
+
+    store = get_store()
+    if args.favorites and not args.model:
+        items = store.favorites(args.library)
+    else:
+        items = store.gallery(args.library, models=args.model, favorites_only=args.favorites)
+    failed = 0
+
+    def report(done, entry):
+        nonlocal failed
+        if entry.error:
+            failed += 1
+            print(f"[失败] {entry.item.id}: {entry.error}", file=sys.stderr)
+        if done % 50 == 0 or done == len(items):
+            print(f"{done}/{len(items)}", file=sys.stderr)
+
+    with open(args.output, "wb") as f:
+        for chunk in iter_bundle(items, window=args.window, on_progress=report):
+            f.write(chunk)
+    print(f"已打包 {len(items) - failed} 张到 {args.output}" + (f"，{failed} 张失败" if failed else ""))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
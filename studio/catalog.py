@@ -0,0 +1,253 @@
+"""模型、提示词模板、风格与尺寸目录"""
+
+# 完整的AI模型库（按类别分组）
+AVAILABLE_MODELS = {
+    "🚀 Flux 系列 - 最新高质量": {
+        "Flux 1.1 Pro": {
+            "model": "flux-pro-1.1", 
+            "badge": "badge-flux",
+            "description": "最新旗舰模型，6倍速提升，极致画质",
+            "best_for": "商业作品、高要求项目"
+        },
+        "Flux Pro": {
+            "model": "flux-pro",
+            "badge": "badge-flux",
+            "description": "专业级模型，顶级画质",
+            "best_for": "专业摄影、艺术创作"
+        },
+        "Flux Realism": {
+            "model": "flux-realism",
+            "badge": "badge-flux",
+            "description": "超写实风格，照片级效果",
+            "best_for": "人像摄影、产品拍摄"
+        },
+        "Flux Anime": {
+            "model": "flux-anime",
+            "badge": "badge-flux",
+            "description": "专业动漫风格",
+            "best_for": "日系动漫、角色设计"
+        },
+        "Flux 3D": {
+            "model": "flux-3d",
+            "badge": "badge-flux",
+            "description": "3D渲染风格",
+            "best_for": "3D建模、游戏美术"
+        },
+        "Flux Dev": {
+            "model": "flux-dev",
+            "badge": "badge-flux",
+            "description": "开发版本，快速迭代",
+            "best_for": "概念设计、原型测试"
+        },
+        "Flux Schnell": {
+            "model": "flux-schnell",
+            "badge": "badge-turbo",
+            "description": "极速生成版本",
+            "best_for": "快速预览、批量生成"
+        },
+        "Flux (标准)": {
+            "model": "flux",
+            "badge": "badge-flux",
+            "description": "通用标准模型",
+            "best_for": "日常创作、多用途"
+        }
+    },
+    
+    "🎨 Stable Diffusion 系列": {
+        "SD 3.5 Large": {
+            "model": "stable-diffusion-3.5-large",
+            "badge": "badge-sd",
+            "description": "SD 3.5大型模型，强大性能",
+            "best_for": "复杂场景、高细节"
+        },
+        "SD 3.5 Medium": {
+            "model": "stable-diffusion-3.5-medium",
+            "badge": "badge-sd",
+            "description": "SD 3.5中型模型，平衡性能",
+            "best_for": "平衡质量与速度"
+        },
+        "SD 3": {
+            "model": "stable-diffusion-3",
+            "badge": "badge-sd",
+            "description": "Stable Diffusion 3代",
+            "best_for": "文字渲染、精准构图"
+        },
+        "SD XL": {
+            "model": "sdxl",
+            "badge": "badge-sd",
+            "description": "大尺寸高清模型",
+            "best_for": "大幅作品、高分辨率"
+        },
+        "SD 2.1": {
+            "model": "stable-diffusion-2.1",
+            "badge": "badge-sd",
+            "description": "经典稳定版本",
+            "best_for": "传统风格、可靠输出"
+        },
+        "SD 1.5": {
+            "model": "stable-diffusion-1.5",
+            "badge": "badge-sd",
+            "description": "经典初代模型",
+            "best_for": "社区模型、微调基础"
+        }
+    },
+    
+    "⚡ 极速模型": {
+        "Turbo": {
+            "model": "turbo",
+            "badge": "badge-turbo",
+            "description": "超快速生成",
+            "best_for": "实时预览、快速迭代"
+        },
+        "Lightning": {
+            "model": "lightning",
+            "badge": "badge-turbo",
+            "description": "闪电级速度",
+            "best_for": "批量处理、即时反馈"
+        }
+    },
+    
+    "🌟 高级专业模型": {
+        "Kontext": {
+            "model": "kontext",
+            "badge": "badge-premium",
+            "description": "BPAIGen混合模型，支持参考图",
+            "best_for": "图生图、风格迁移"
+        },
+        "Nanobanana": {
+            "model": "nanobanana",
+            "badge": "badge-premium",
+            "description": "Google Gemini 2.5视觉模型",
+            "best_for": "自定义尺寸、参考图"
+        },
+        "Seedream": {
+            "model": "seedream",
+            "badge": "badge-premium",
+            "description": "ByteDance超高清模型",
+            "best_for": "高分辨率、电影级渲染"
+        }
+    },
+    
+    "🎭 特殊风格模型": {
+        "Dreamshaper": {
+            "model": "dreamshaper",
+            "badge": "badge-sd",
+            "description": "梦幻艺术风格",
+            "best_for": "奇幻场景、梦境效果"
+        },
+        "Openjourney": {
+            "model": "openjourney",
+            "badge": "badge-sd",
+            "description": "Midjourney开源替代",
+            "best_for": "艺术创作、插画"
+        },
+        "Anything V5": {
+            "model": "anything-v5",
+            "badge": "badge-sd",
+            "description": "通用动漫模型",
+            "best_for": "ACG内容、二次元"
+        }
+    }
+}
+
+# 提示词模板库
+PROMPT_TEMPLATES = {
+    "人像摄影 Portrait": {
+        "专业人像": "professional portrait photography, studio lighting, 85mm lens, shallow depth of field, bokeh background, sharp focus, high detail, 8K quality",
+        "复古胶片": "vintage portrait, film grain, kodak portra 400, retro color grading, 1970s style, nostalgic atmosphere, analog photography",
+        "时尚大片": "high fashion editorial portrait, vogue magazine style, dramatic lighting, designer clothing, runway aesthetic, professional makeup",
+        "自然光": "natural light portrait, golden hour, soft diffused lighting, outdoor setting, candid moment, warm tones, lifestyle photography",
+        "黑白艺术": "fine art black and white portrait, dramatic contrast, Ansel Adams style, timeless elegance, high key lighting"
+    },
+    "风景艺术 Landscape": {
+        "中国山水": "traditional Chinese landscape painting, ink wash style, misty mountains, ancient pine trees, waterfall, tranquil atmosphere, Song dynasty aesthetic",
+        "赛博朋克": "cyberpunk cityscape, neon lights reflecting on wet streets, futuristic skyscrapers, rain, night scene, blade runner aesthetic, flying cars",
+        "奇幻世界": "fantasy landscape, floating islands, magical atmosphere, ethereal lighting, mystical creatures, epic vista, enchanted forest",
+        "自然风光": "breathtaking natural landscape, stunning mountain vista, dramatic cloudy sky, HDR photography, wide angle, national geographic style",
+        "科幻场景": "alien planet landscape, two suns in sky, strange rock formations, otherworldly plants, science fiction, concept art"
+    },
+    "动漫风格 Anime": {
+        "日系动漫": "anime style, detailed expressive eyes, vibrant colors, cel shading, manga aesthetic, clean linework, studio lighting",
+        "吉卜力风格": "Studio Ghibli animation style, soft watercolor colors, whimsical atmosphere, hand-painted look, Miyazaki inspired, dreamy clouds",
+        "赛璐璐": "cel shaded anime art, bold black outlines, flat vibrant colors, Japanese animation style, 90s anime aesthetic",
+        "水彩动漫": "watercolor anime illustration, soft edges, dreamy pastel atmosphere, light and airy, delicate details",
+        "漫画风格": "manga illustration style, dynamic composition, speed lines, dramatic shading, black and white with screentones"
+    },
+    "3D 渲染 3D Render": {
+        "写实渲染": "photorealistic 3D render, octane render, ray tracing, ultra detailed textures, perfect lighting, 8K quality, unreal engine",
+        "皮克斯风格": "Pixar 3D animation style, cute character design, colorful, soft studio lighting, family friendly, rounded shapes",
+        "低多边形": "low poly 3D art, geometric shapes, minimalist design, clean aesthetic, flat shading, isometric view",
+        "科幻机械": "sci-fi 3D mechanical render, intricate details, metallic materials, panel lines, futuristic technology, hard surface modeling",
+        "卡通渲染": "3D toon shader render, cartoon style, bold outlines, vibrant colors, stylized proportions, cel shaded"
+    },
+    "艺术流派 Art Movements": {
+        "印象派": "impressionist oil painting, visible brushstrokes, emphasis on light and color, Claude Monet style, outdoor scene",
+        "超现实": "surrealist art, dreamlike imagery, impossible scenes, Salvador Dali inspired, melting clocks aesthetic, subconscious imagery",
+        "抽象艺术": "abstract modern art, geometric shapes, bold primary colors, Mondrian inspired, minimalist composition, contemporary",
+        "波普艺术": "pop art style, bold colors, comic book aesthetic, Ben-Day dots, Andy Warhol inspired, mass culture imagery",
+        "新艺术": "art nouveau style, organic flowing lines, floral motifs, Alphonse Mucha inspired, elegant curves, decorative patterns"
+    },
+    "概念设计 Concept Art": {
+        "游戏概念": "video game concept art, detailed environment design, atmospheric perspective, fantasy RPG style, epic scale",
+        "电影概念": "cinematic concept art, movie production design, dramatic lighting, epic scale, Hollywood quality, matte painting",
+        "角色设计": "character concept art, multiple views, detailed costume design, turnaround sheet, professional quality, full body",
+        "载具设计": "vehicle concept design, sleek futuristic design, technical details, industrial design aesthetic, blueprint style",
+        "建筑概念": "architectural concept art, futuristic building design, glass and steel, modern sustainable design, aerial view"
+    }
+}
+
+# 艺术风格选项
+STYLE_OPTIONS = {
+    "摄影风格": ["专业摄影", "电影感", "复古胶片", "HDR", "黑白", "长曝光", "微距", "航拍", "街头摄影", "纪实"],
+    "绘画风格": ["油画", "水彩", "素描", "国画", "版画", "丙烯", "彩铅", "粉彩", "插画", "手绘"],
+    "艺术运动": ["印象派", "立体主义", "超现实", "抽象", "波普艺术", "未来主义", "表现主义", "巴洛克", "文艺复兴", "现代主义"],
+    "氛围感": ["梦幻", "神秘", "宁静", "戏剧性", "温暖", "冷峻", "浪漫", "史诗", "忧郁", "欢快"],
+    "技术特效": ["光线追踪", "体积光", "景深", "运动模糊", "辉光", "粒子特效", "镜头光晕", "色差", "HDR", "全局光照"],
+    "质量关键词": ["高质量", "8K", "4K", "超细节", "专业", "杰作", "获奖作品", "趋势", "史诗级", "精美"]
+}
+
+# 图片尺寸预设
+IMAGE_SIZES = {
+    "方形 1:1 (1024x1024)": (1024, 1024),
+    "横屏 16:9 (1920x1080)": (1920, 1080),
+    "竖屏 9:16 (1080x1920)": (1080, 1920),
+    "横幅 21:9 (2560x1080)": (2560, 1080),
+    "Instagram 4:5 (1080x1350)": (1080, 1350),
+    "4K 横屏 (3840x2160)": (3840, 2160),
+    "2K 方屏 (2048x2048)": (2048, 2048),
+    "HD 竖屏 (1080x1920)": (1080, 1920),
+    "自定义": (None, None)
+}
+
+
+def _build_model_registry(catalog):
+    """导入时一次性展开模型目录，显示名或模型ID重复时直接报错，避免查找时静默命中错误的模型"""
+    ids_by_name = {}
+    models_by_id = {}
+    for category, models in catalog.items():
+        for name, info in models.items():
+            model_id = info["model"]
+            if name in ids_by_name:
+                raise ValueError(f"模型显示名重复: {name}")
+            if model_id in models_by_id:
+                raise ValueError(f"模型ID重复: {model_id}（{models_by_id[model_id]['name']} / {name}）")
+            ids_by_name[name] = model_id
+            models_by_id[model_id] = dict(info, name=name, category=category)
+    return ids_by_name, models_by_id
+
+
+# 显示名 -> 模型ID，模型ID -> 元数据（含显示名与类别）
+MODEL_IDS_BY_NAME, MODELS_BY_ID = _build_model_registry(AVAILABLE_MODELS)
+
+# 全部模板正文，随机灵感与离线预热直接取用，不必每次展开嵌套字典
+TEMPLATE_TEXTS = tuple(text for templates in PROMPT_TEMPLATES.values() for text in templates.values())
+
+
+def get_model_id(model_name):
+    """根据显示名获取模型ID；未知的显示名抛出 KeyError，不回退到默认模型"""
+    return MODEL_IDS_BY_NAME[model_name]
+
+
+def get_model_info(model_id):
+    """根据模型ID获取元数据，未知ID返回 None"""
+    return MODELS_BY_ID.get(model_id)
@@ -0,0 +1,163 @@
+"""多模型实测对比：同一提示词与种子并行请求多个模型，记录各自的首字节时间与总耗时，拼成一张对比图
+
+每个模型在独立的工作线程中拉取并就地缩成小图，主线程只把小图粘贴到预先分配好的画布上。
+"""
+import io
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .catalog import get_model_info
+from .http_client import get_client
+from .image_cache import get_image_cache
+from .metrics import MODEL_TTFB_SECONDS, record_error, timed
+from .pollinations import IMAGE_TIMEOUT, generate_image_url
+
+# 一次对比的模型数上限，同时也是线程池大小：所有模型同时发出，总耗时取决于最慢的一个
+COMPARE_MAX_MODELS = int(os.environ.get("STUDIO_COMPARE_MAX_MODELS", "8"))
+
+# 对比图版式
+TILE_SIZE = 384
+LABEL_HEIGHT = 32
+GAP = 8
+MAX_COLUMNS = 4
+BACKGROUND = (245, 245, 245)
+FAILED_TILE = (220, 220, 220)
+TEXT_COLOR = (40, 40, 40)
+
+ComparisonResult = namedtuple("ComparisonResult",
+                              ["model_id", "model", "url", "size", "ttfb", "total", "tile", "error"])
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """获取进程共享的对比线程池"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=COMPARE_MAX_MODELS, thread_name_prefix="compare")
+    return _executor
+
+
+def make_tile(data, tile_size=TILE_SIZE):
+    """把原图解码并缩到 tile_size 见方以内；JPEG 借助 draft 在解码时直接降采样"""
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as img:
+        img.draft("RGB", (tile_size, tile_size))
+        tile = img.convert("RGB")
+    tile.thumbnail((tile_size, tile_size), Image.Resampling.LANCZOS, reducing_gap=2.0)
+    return tile
+
+
+def _fetch_model(model_id, url, timeout, tile_size):
+    info = get_model_info(model_id)
+    model = info["name"] if info else model_id
+    start = time.perf_counter()
+    try:
+        response = get_client().get(url, timeout=timeout, model=model_id)
+        response.raise_for_status()
+        content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        if not content_type.startswith("image/"):
+            raise ValueError(f"非图片响应: {content_type or '未知类型'}")
+        # elapsed 是从发出请求到解析完响应头的时间，即首字节时间（不含限流排队）
+        ttfb = response.elapsed.total_seconds()
+        data = response.content
+        total = time.perf_counter() - start
+    except Exception as e:
+        record_error("compare", e)
+        return ComparisonResult(model_id, model, url, 0, None, time.perf_counter() - start, None,
+                                str(e) or type(e).__name__)
+    MODEL_TTFB_SECONDS.observe(ttfb, model=model_id)
+    # 写入磁盘缓存，之后用同样的配置生成或查看原图时直接命中
+    get_image_cache().put(url, data, content_type)
+    try:
+        tile = make_tile(data, tile_size)
+    except Exception as e:
+        return ComparisonResult(model_id, model, url, len(data), ttfb, total, None, f"无法解码: {e}")
+    return ComparisonResult(model_id, model, url, len(data), ttfb, total, tile, None)
+
+
+def run_comparison(prompt, model_ids, seed, width=1024, height=1024, on_result=None, timeout=IMAGE_TIMEOUT,
+                   tile_size=TILE_SIZE):
+    """并行请求各模型，结果按 model_ids 的顺序返回；每完成一个调用 on_result(已完成数, 总数, 结果)"""
+    model_ids = list(dict.fromkeys(model_ids))
+    if len(model_ids) > COMPARE_MAX_MODELS:
+        raise ValueError(f"一次最多对比 {COMPARE_MAX_MODELS} 个模型")
+    executor = get_executor()
+    with timed("compare"):
+        futures = {
+            executor.submit(
+                _fetch_model, model_id,
+                generate_image_url(prompt, model=model_id, width=width, height=height, seed=seed,
+                                   enhance=False, nologo=True),
+                timeout, tile_size,
+            ): model_id
+            for model_id in model_ids
+        }
+        results = {}
+        for done, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            results[result.model_id] = result
+            if on_result:
+                on_result(done, len(futures), result)
+    return [results[model_id] for model_id in model_ids]
+
+
+def _label(result):
+    if result.error:
+        return f"{result.model_id}\nerror"
+    return f"{result.model_id}\nTTFB {result.ttfb:.2f}s / total {result.total:.2f}s"
+
+
+@timed("contact_sheet")
+def contact_sheet(results, tile_size=TILE_SIZE, columns=None, quality=88):
+    """把各模型的小图拼成一张 JPEG 对比图：画布一次分配，逐个 paste，不做中间拷贝"""
+    from PIL import Image, ImageDraw, ImageFont
+
+    columns = columns or min(MAX_COLUMNS, max(1, len(results)))
+    rows = (len(results) + columns - 1) // columns
+    # 同一次对比的小图宽高比相同，格子按实际小图收紧，非方形时不留大片空白
+    tiles = [result.tile for result in results if result.tile is not None]
+    tile_width = max((tile.width for tile in tiles), default=tile_size)
+    tile_height = max((tile.height for tile in tiles), default=tile_size)
+    cell_height = tile_height + LABEL_HEIGHT
+    canvas = Image.new("RGB", (columns * tile_width + (columns + 1) * GAP, rows * cell_height + (rows + 1) * GAP),
+                       BACKGROUND)
+    draw = ImageDraw.Draw(canvas)
+    # 内置字体只含西文字符，标注使用模型ID
+    font = ImageFont.load_default()
+    for i, result in enumerate(results):
+        left = GAP + (i % columns) * (tile_width + GAP)
+        top = GAP + (i // columns) * (cell_height + GAP)
+        if result.tile is not None:
+            tile = result.tile
+            canvas.paste(tile, (left + (tile_width - tile.width) // 2, top + (tile_height - tile.height) // 2))
+        else:
+            draw.rectangle((left, top, left + tile_width - 1, top + tile_height - 1), fill=FAILED_TILE)
+        draw.multiline_text((left + 4, top + tile_height + 4), _label(result), fill=TEXT_COLOR, font=font,
+                            spacing=2)
+    buffered = io.BytesIO()
+    canvas.save(buffered, format="JPEG", quality=quality)
+    return buffered.getvalue()
+
+
+def latency_rows(results):
+    """对比结果的表格行，按总耗时从快到慢，失败的排在最后"""
+    ordered = sorted(results, key=lambda r: (r.error is not None, r.total))
+    return [
+        {
+            "模型": r.model,
+            "模型ID": r.model_id,
+            "首字节 (s)": None if r.ttfb is None else round(r.ttfb, 2),
+            "总耗时 (s)": round(r.total, 2),
+            "大小 (KB)": round(r.size / 1024, 1) if r.size else None,
+            "状态": r.error or "成功",
+        }
+        for r in ordered
+    ]
@@ -0,0 +1,97 @@
+"""下载准备：默认直接透传原始响应字节与MIME类型；格式转换需显式指定，在调用线程中完成并按作品与格式缓存"""
+import io
+import os
+import threading
+from collections import namedtuple
+
+from .image_cache import CACHE_DIR, ImageCache
+from .metrics import timed
+from .pollinations import fetch_original
+
+CONVERSION_DIR = os.path.join(CACHE_DIR, "conversions")
+CONVERSION_MAX_BYTES = int(os.environ.get("STUDIO_CONVERSION_MAX_BYTES", str(512 * 1024 * 1024)))
+# 进程内同时进行的格式转换数上限；转换占满 CPU，多个会话同时转换时其余的排队等待
+CONVERSION_WORKERS = int(os.environ.get("STUDIO_CONVERSION_WORKERS", "2"))
+
+# 下载格式选项：None 表示原样透传
+DOWNLOAD_FORMATS = {
+    "原始格式": None,
+    "PNG": "image/png",
+    "JPEG": "image/jpeg",
+    "WebP": "image/webp",
+}
+
+_PIL_FORMATS = {
+    "image/png": ("PNG", {"optimize": True}),
+    "image/jpeg": ("JPEG", {"quality": 92}),
+    "image/webp": ("WEBP", {"quality": 90}),
+}
+
+FILE_EXTENSIONS = {
+    "image/jpeg": "jpg",
+    "image/png": "png",
+    "image/webp": "webp",
+    "image/gif": "gif",
+}
+
+Download = namedtuple("Download", ["data", "mime", "extension"])
+
+
+def _download(data, mime):
+    return Download(data, mime, FILE_EXTENSIONS.get(mime, "bin"))
+
+
+def convert_image(data, mime):
+    """把原图字节转换为目标MIME格式；只有真正转换时才导入 PIL"""
+    from PIL import Image
+
+    pil_format, options = _PIL_FORMATS[mime]
+    with timed(f"encode_{pil_format.lower()}"), Image.open(io.BytesIO(data)) as img:
+        if pil_format == "JPEG" and img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        buffered = io.BytesIO()
+        img.save(buffered, format=pil_format, **options)
+        return buffered.getvalue()
+
+
+class Downloader:
+    """为作品准备下载字节；转换结果按 (URL, 格式) 缓存到磁盘"""
+
+    def __init__(self, cache, workers=CONVERSION_WORKERS, fetch=fetch_original):
+        self.cache = cache
+        self._fetch = fetch
+        self._slots = threading.BoundedSemaphore(workers)
+
+    def _convert(self, url, mime):
+        original = self._fetch(url)
+        if original.content_type == mime:
+            return _download(original.data, mime)
+        with self._slots:
+            data = convert_image(original.data, mime)
+        self.cache.put(url, data, mime, variant=mime)
+        return _download(data, mime)
+
+    @timed("download_prepare")
+    def prepare(self, url, mime=None):
+        """返回 Download；mime 为 None 时原样透传，不做任何编解码，否则在调用线程中转换（结果缓存，只转换一次）"""
+        if mime is None:
+            original = self._fetch(url)
+            return _download(original.data, original.content_type)
+        cached = self.cache.get(url, variant=mime)
+        if cached is not None:
+            return _download(cached.data, mime)
+        return self._convert(url, mime)
+
+
+_downloader = None
+_downloader_lock = threading.Lock()
+
+
+def get_downloader():
+    """获取进程共享的下载器"""
+    global _downloader
+    if _downloader is None:
+        with _downloader_lock:
+            if _downloader is None:
+                _downloader = Downloader(ImageCache(CONVERSION_DIR, CONVERSION_MAX_BYTES, name="conversion"))
+    return _downloader
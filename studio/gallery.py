@@ -0,0 +1,224 @@
+"""会话内作品集合：画廊、收藏、历史都是同一批作品对象上的视图，写操作同步落库"""
+import heapq
+import itertools
+import sys
+from collections import deque
+from datetime import datetime
+
+from .pollinations import generate_image_url
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class GalleryItem:
+    """紧凑的作品记录：模型与风格标签驻留复用，时间存为整数秒，URL 按参数现算而不常驻内存"""
+
+    __slots__ = ("id", "prompt", "model", "model_id", "width", "height", "styles", "seed", "created", "is_favorite")
+
+    def __init__(self, id, prompt, model, model_id, width, height, styles=(), seed=None, created=0, is_favorite=False):
+        self.id = id
+        self.prompt = prompt
+        self.model = sys.intern(model)
+        self.model_id = sys.intern(model_id)
+        self.width = width
+        self.height = height
+        self.styles = tuple(sys.intern(style) for style in styles)
+        self.seed = seed
+        self.created = int(created)
+        self.is_favorite = is_favorite
+
+    @property
+    def url(self):
+        return generate_image_url(self.prompt, model=self.model_id, width=self.width, height=self.height,
+                                  seed=self.seed, enhance=False, nologo=True)
+
+    @property
+    def timestamp(self):
+        return datetime.fromtimestamp(self.created).strftime(TIMESTAMP_FORMAT)
+
+    def to_dict(self):
+        """导出格式，与旧版画廊字典的字段和顺序一致"""
+        return {
+            "id": self.id,
+            "url": self.url,
+            "prompt": self.prompt,
+            "model": self.model,
+            "width": self.width,
+            "height": self.height,
+            "styles": list(self.styles),
+            "seed": self.seed,
+            "timestamp": self.timestamp,
+            "is_favorite": self.is_favorite,
+        }
+
+
+class GalleryCollection:
+    """id→作品映射、保持收藏顺序的收藏集合、按模型的二级索引；新作品 O(1) 头插"""
+
+    def __init__(self, store, library):
+        self._store = store
+        self._library = library
+        self._items = {}
+        self._gallery = deque()   # 作品ID，最新在前
+        self._history = deque()
+        self._in_gallery = set()
+        self._in_history = set()
+        self._by_model = {}       # 模型 -> 画廊中该模型的作品ID，最新在前
+        self._favorites = {}      # 作品ID -> None，dict 保持收藏先后顺序
+        self._total_generated = store.total_generated(library)
+        self._load()
+
+    def _load(self):
+        # 画廊、历史、收藏查询会各自返回一份对象，这里合并为同一条记录，同批变体共享提示词字符串
+        prompts = {}
+
+        def intern(item):
+            existing = self._items.get(item.id)
+            if existing is not None:
+                return existing
+            item.prompt = prompts.setdefault(item.prompt, item.prompt)
+            self._items[item.id] = item
+            return item
+
+        for item in self._store.gallery(self._library):
+            item = intern(item)
+            self._gallery.append(item.id)
+            self._in_gallery.add(item.id)
+            self._by_model.setdefault(item.model, deque()).append(item.id)
+        for item in self._store.history(self._library):
+            item = intern(item)
+            self._history.append(item.id)
+            self._in_history.add(item.id)
+        for item in self._store.favorites(self._library):
+            self._favorites[intern(item).id] = None
+
+    # 写操作
+    def add(self, item):
+        """新作品同时进入画廊与历史"""
+        self._store.add(self._library, item)
+        self.adopt(item)
+
+    def adopt(self, item):
+        """接收已由后台任务写入存储的作品，只更新内存中的视图；已有该作品时返回 False"""
+        if item.id in self._items:
+            return False
+        self._items[item.id] = item
+        self._gallery.appendleft(item.id)
+        self._history.appendleft(item.id)
+        self._in_gallery.add(item.id)
+        self._in_history.add(item.id)
+        self._by_model.setdefault(item.model, deque()).appendleft(item.id)
+        self._total_generated += 1
+        return True
+
+    def toggle_favorite(self, item_id):
+        """切换收藏状态，返回新状态；作品不存在时返回 None"""
+        item = self._items.get(item_id)
+        if item is None:
+            return None
+        favorite = not item.is_favorite
+        self._store.set_favorite(self._library, item_id, favorite)
+        item.is_favorite = favorite
+        if favorite:
+            self._favorites[item_id] = None
+        else:
+            self._favorites.pop(item_id, None)
+            self._forget_if_orphaned(item_id)
+        return favorite
+
+    def clear_gallery(self):
+        self._store.clear_gallery(self._library)
+        orphans = list(self._gallery)
+        self._gallery.clear()
+        self._in_gallery.clear()
+        self._by_model.clear()
+        for item_id in orphans:
+            self._forget_if_orphaned(item_id)
+
+    def clear_history(self):
+        self._store.clear_history(self._library)
+        orphans = list(self._history)
+        self._history.clear()
+        self._in_history.clear()
+        for item_id in orphans:
+            self._forget_if_orphaned(item_id)
+
+    def _forget_if_orphaned(self, item_id):
+        if item_id in self._favorites or item_id in self._in_gallery or item_id in self._in_history:
+            return
+        self._items.pop(item_id, None)
+
+    # 查询
+    def get(self, item_id):
+        return self._items.get(item_id)
+
+    @property
+    def total_generated(self):
+        return self._total_generated
+
+    def gallery_models(self):
+        return [model for model, ids in self._by_model.items() if ids]
+
+    def _favorite_gallery_ids(self, models=None, oldest_first=False):
+        # 收藏通常远少于画廊，直接在收藏集合上筛选再排序
+        items = [
+            self._items[i] for i in self._favorites
+            if i in self._in_gallery and (not models or self._items[i].model in models)
+        ]
+        items.sort(key=lambda item: item.created, reverse=not oldest_first)
+        return [item.id for item in items]
+
+    def _gallery_ids(self, models=None, oldest_first=False, favorites_only=False):
+        if favorites_only:
+            return iter(self._favorite_gallery_ids(models, oldest_first))
+        if models:
+            sources = [self._by_model.get(model, ()) for model in models]
+            if oldest_first:
+                sources = [reversed(ids) for ids in sources]
+            # 各模型索引内部已按时间有序，多路归并即可
+            ids = heapq.merge(
+                *[((self._items[i].created, i) for i in ids) for ids in sources],
+                reverse=not oldest_first,
+            )
+            ids = (i for _, i in ids)
+        else:
+            ids = reversed(self._gallery) if oldest_first else iter(self._gallery)
+        return ids
+
+    def gallery(self, models=None, oldest_first=False, favorites_only=False, limit=None, offset=0):
+        """画廊分页视图"""
+        ids = self._gallery_ids(models, oldest_first, favorites_only)
+        stop = None if limit is None else offset + limit
+        return [self._items[i] for i in itertools.islice(ids, offset, stop)]
+
+    def count_gallery(self, models=None, favorites_only=False):
+        if favorites_only:
+            return len(self._favorite_gallery_ids(models))
+        if models:
+            return sum(len(self._by_model.get(model, ())) for model in models)
+        return len(self._gallery)
+
+    def gallery_position(self, timestamp, models=None, oldest_first=False, favorites_only=False):
+        """按当前排序，第一件不晚于 timestamp（正序时不早于）的作品在结果中的位置，用于按日期跳页"""
+        ids = self._gallery_ids(models, oldest_first, favorites_only)
+        if oldest_first:
+            return sum(1 for _ in itertools.takewhile(lambda i: self._items[i].created < timestamp, ids))
+        return sum(1 for _ in itertools.takewhile(lambda i: self._items[i].created > timestamp, ids))
+
+    def favorites(self, limit=None, offset=0):
+        stop = None if limit is None else offset + limit
+        return [self._items[i] for i in itertools.islice(self._favorites, offset, stop)]
+
+    def count_favorites(self):
+        return len(self._favorites)
+
+    def history(self, limit=None, offset=0):
+        stop = None if limit is None else offset + limit
+        return [self._items[i] for i in itertools.islice(self._history, offset, stop)]
+
+    def history_position(self, timestamp):
+        """第一条不晚于 timestamp 的历史记录的位置"""
+        return sum(1 for _ in itertools.takewhile(lambda i: self._items[i].created > timestamp, self._history))
+
+    def count_history(self):
+        return len(self._history)
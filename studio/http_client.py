@@ -0,0 +1,148 @@
+"""进程级共享 HTTP 客户端：连接池与 keep-alive、抖动退避重试、分离的连接/读取超时、按主机与模型的自适应限流"""
+import os
+import random
+import threading
+import time
+import urllib.parse
+
+from .metrics import (
+    HTTP_QUEUE_SECONDS,
+    HTTP_REQUESTS,
+    HTTP_RETRIES,
+    HTTP_SECONDS,
+    RATE_LIMIT_IN_FLIGHT,
+    RATE_LIMIT_WAITING,
+    RATE_LIMIT_WINDOW,
+    register_collector,
+)
+from .rate_limit import MAX_CONCURRENCY, RateLimiter
+
+CONNECT_TIMEOUT = float(os.environ.get("STUDIO_HTTP_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.environ.get("STUDIO_HTTP_READ_TIMEOUT", "60"))
+MAX_RETRIES = int(os.environ.get("STUDIO_HTTP_RETRIES", "3"))
+BACKOFF_BASE = float(os.environ.get("STUDIO_HTTP_BACKOFF", "0.5"))
+BACKOFF_MAX = 20.0
+POOL_SIZE = 32
+
+# 只对限流与服务端错误重试；4xx 是请求本身的问题，重试无意义
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# 说明上游过载的响应，触发并发窗口减半
+OVERLOAD_STATUSES = frozenset({429, 503, 504})
+
+
+class HttpClient:
+    """线程安全的共享客户端，所有对外请求都应经过这里"""
+
+    def __init__(self, max_retries=MAX_RETRIES, backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX,
+                 connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 pool_size=POOL_SIZE, limiter=None):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        # 在途请求数不超过连接池大小，否则多出的请求只会在连接池里排队
+        self.limiter = limiter if limiter is not None else RateLimiter(max_concurrency=min(MAX_CONCURRENCY, pool_size))
+
+        # requests 连同 urllib3 导入约需 0.15s，首屏用不到，创建客户端时才导入
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self._session = requests.Session()
+        # 重试由本类负责（需要感知 Retry-After 与按主机限流），关闭 urllib3 自带重试
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+
+    @staticmethod
+    def _parse_retry_after(value):
+        try:
+            return float(value) if value else None
+        except ValueError:
+            # HTTP 日期格式的 Retry-After 不常见，按未给出处理
+            return None
+
+    def _backoff(self, attempt, retry_after=None):
+        """全抖动指数退避；服务端给出 Retry-After 时不早于它"""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        retry_after = self._parse_retry_after(retry_after)
+        if retry_after:
+            delay = max(delay, min(retry_after, self.backoff_max))
+        return delay
+
+    def get(self, url, timeout=None, read_timeout=None, model=None, **kwargs):
+        """GET 请求；先经限流器放行，对 429/5xx 与连接失败按退避重试，最终仍失败时返回最后的响应或抛出异常"""
+        import requests
+
+        if timeout is None:
+            timeout = (self.connect_timeout, read_timeout or self.read_timeout)
+        host = urllib.parse.urlsplit(url).netloc
+        model_label = model or ""
+
+        attempt = 0
+        while True:
+            response, error = None, None
+            queued = time.perf_counter()
+            with self.limiter.slot(host, model) as ticket:
+                started = time.perf_counter()
+                HTTP_QUEUE_SECONDS.observe(started - queued, endpoint=host)
+                status = None
+                try:
+                    response = self._session.get(url, timeout=timeout, **kwargs)
+                    status = str(response.status_code)
+                except requests.ConnectionError as e:
+                    # 包含连接超时；读超时说明上游仍在渲染，不重试以免重复占用
+                    ticket.overloaded()
+                    error = e
+                    status = "connection_error"
+                except requests.Timeout:
+                    ticket.overloaded()
+                    status = "timeout"
+                    raise
+                finally:
+                    HTTP_SECONDS.observe(time.perf_counter() - started, endpoint=host, model=model_label)
+                    HTTP_REQUESTS.inc(endpoint=host, model=model_label, status=status or "error")
+                if response is not None and response.status_code in OVERLOAD_STATUSES:
+                    retry_after = self._parse_retry_after(response.headers.get("Retry-After"))
+                    ticket.overloaded(min(retry_after, self.backoff_max) if retry_after else None)
+
+            if response is not None and response.status_code not in RETRY_STATUSES:
+                return response
+            if attempt >= self.max_retries:
+                if response is not None:
+                    return response
+                raise error
+
+            retry_after = None
+            if response is not None:
+                retry_after = response.headers.get("Retry-After")
+                response.close()
+            HTTP_RETRIES.inc(endpoint=host, model=model_label)
+            time.sleep(self._backoff(attempt, retry_after))
+            attempt += 1
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """获取进程共享的 HttpClient"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HttpClient()
+    return _client
+
+
+def _collect_rate_limits():
+    if _client is None:
+        return
+    for endpoint, stats in _client.limiter.snapshot()["endpoints"].items():
+        RATE_LIMIT_WINDOW.set(stats["limit"], endpoint=endpoint)
+        RATE_LIMIT_IN_FLIGHT.set(stats["in_flight"], endpoint=endpoint)
+        RATE_LIMIT_WAITING.set(stats["waiting"] + stats["bucket"]["waiting"], endpoint=endpoint)
+
+
+register_collector(_collect_rate_limits)
@@ -0,0 +1,186 @@
+"""内容寻址的磁盘图片缓存：按规范化URL寻址，保存原始响应字节，按字节预算做LRU淘汰，重启后依然有效"""
+import hashlib
+import os
+import tempfile
+import threading
+import urllib.parse
+from collections import OrderedDict, namedtuple
+
+from .metrics import record_cache_lookup
+
+CACHE_DIR = os.environ.get("STUDIO_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "ai-art-studio"))
+IMAGE_CACHE_DIR = os.path.join(CACHE_DIR, "images")
+CACHE_MAX_BYTES = int(os.environ.get("STUDIO_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+CachedImage = namedtuple("CachedImage", ["data", "content_type"])
+
+_EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+    "image/gif": ".gif",
+}
+_CONTENT_TYPES = {ext: ctype for ctype, ext in _EXTENSIONS.items()}
+_DEFAULT_EXTENSION = ".bin"
+
+
+def canonical_url(url):
+    """URL规范化：小写协议与主机、统一路径编码、查询参数排序，保证同一请求得到同一键"""
+    parts = urllib.parse.urlsplit(url)
+    path = urllib.parse.quote(urllib.parse.unquote(parts.path), safe="/")
+    query = sorted(urllib.parse.parse_qsl(parts.query, keep_blank_values=False))
+    return urllib.parse.urlunsplit((
+        parts.scheme.lower(),
+        parts.netloc.lower(),
+        path,
+        urllib.parse.urlencode(query, quote_via=urllib.parse.quote),
+        "",
+    ))
+
+
+def cache_key(url, variant=None):
+    """规范化URL的内容地址；variant 区分同一原图的不同衍生版本（如转换格式）"""
+    canonical = canonical_url(url)
+    if variant:
+        canonical += "\n" + variant
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ImageCache:
+    """线程安全的磁盘LRU缓存；访问顺序用文件 mtime 持久化，启动时据此重建索引"""
+
+    def __init__(self, root=IMAGE_CACHE_DIR, max_bytes=CACHE_MAX_BYTES, name="image"):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._index = OrderedDict()  # key -> (path, size)，按最近访问排序
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        entries = []
+        for shard in os.listdir(self.root):
+            shard_dir = os.path.join(self.root, shard)
+            if len(shard) != 2 or not os.path.isdir(shard_dir):
+                continue
+            for filename in os.listdir(shard_dir):
+                key, ext = os.path.splitext(filename)
+                if len(key) != 64 or not ext or ext == ".tmp":
+                    continue
+                path = os.path.join(shard_dir, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, key, path, stat.st_size))
+        for _, key, path, size in sorted(entries):
+            self._index[key] = (path, size)
+            self._total_bytes += size
+        self._evict()
+
+    def _path_for(self, key, content_type):
+        ext = _EXTENSIONS.get((content_type or "").split(";")[0].strip().lower(), _DEFAULT_EXTENSION)
+        return os.path.join(self.root, key[:2], key + ext)
+
+    def _drop(self, key):
+        path, size = self._index.pop(key)
+        self._total_bytes -= size
+        return path
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and self._index:
+            key = next(iter(self._index))
+            path = self._drop(key)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def get(self, url, variant=None):
+        """读取缓存，未命中返回 None"""
+        key = cache_key(url, variant)
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                self.misses += 1
+                record_cache_lookup(self.name, hit=False)
+                return None
+            self._index.move_to_end(key)
+        path = entry[0]
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            # 被其他进程淘汰
+            with self._lock:
+                if key in self._index:
+                    self._drop(key)
+                self.misses += 1
+            record_cache_lookup(self.name, hit=False)
+            return None
+        with self._lock:
+            self.hits += 1
+        record_cache_lookup(self.name, hit=True)
+        content_type = _CONTENT_TYPES.get(os.path.splitext(path)[1], "application/octet-stream")
+        return CachedImage(data, content_type)
+
+    def __contains__(self, url):
+        with self._lock:
+            return cache_key(url) in self._index
+
+    def put(self, url, data, content_type, variant=None):
+        """写入缓存（原子替换），超出预算时淘汰最久未访问的条目"""
+        if len(data) > self.max_bytes:
+            return
+        key = cache_key(url, variant)
+        path = self._path_for(key, content_type)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        with self._lock:
+            if key in self._index:
+                old_path = self._drop(key)
+                if old_path != path and os.path.exists(old_path):
+                    os.remove(old_path)
+            self._index[key] = (path, len(data))
+            self._total_bytes += len(data)
+            self._evict()
+
+    def stats(self):
+        """缓存统计：条目数、占用字节、命中率"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._index),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_image_cache():
+    """获取进程共享的图片缓存"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ImageCache()
+    return _cache
@@ -0,0 +1,222 @@
+"""后台生成任务队列：按钮只负责入队，进程级工作线程完成提示词增强、拉图与落库；会话在脚本线程中收取新作品"""
+import hashlib
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .batch import run_batch
+from .gallery import GalleryItem
+from .metrics import JOBS, register_collector, timed
+from .pollinations import fetch_image, generate_image_url, resolve_seeds
+from .prompt_cache import enhance_prompt_cached
+from .store import get_store
+from .thumbnails import get_thumbnail_pipeline
+
+# 同时执行的任务数；每个任务内的多张变体再由批量线程池并发拉取
+JOB_WORKERS = int(os.environ.get("STUDIO_JOB_WORKERS", "4"))
+# 每个作品库保留的最近任务数（用于状态面板展示）
+JOB_HISTORY = 20
+# 已结束的任务保留多久（秒）；过期后连同作品库的条目一起释放，没来得及收取的会话重新载入作品库即可看到
+JOB_RETENTION = int(os.environ.get("STUDIO_JOB_RETENTION", "600"))
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class GenerationJob:
+    """一次生成请求（可含多张变体）及其状态与耗时"""
+
+    def __init__(self, library, label, prompt, model_id, model_name, width, height, styles=(), seed=None, count=1,
+                 enhance=False):
+        self.id = uuid.uuid4().hex
+        self.library = library
+        self.label = label
+        self.prompt = prompt
+        self.final_prompt = prompt
+        self.model_id = model_id
+        self.model_name = model_name
+        self.width = width
+        self.height = height
+        self.styles = tuple(styles)
+        self.seed = seed
+        self.total = count
+        self.enhance = enhance
+        self.status = QUEUED
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.done = 0
+        self.errors = []
+        self.items = []
+
+    @property
+    def active(self):
+        return self.status in (QUEUED, RUNNING)
+
+    @property
+    def wait_time(self):
+        """排队等待时长（秒）"""
+        return (self.started or time.time()) - self.created
+
+    @property
+    def run_time(self):
+        """执行时长（秒），未开始时为 None"""
+        if self.started is None:
+            return None
+        return (self.finished or time.time()) - self.started
+
+
+class JobQueue:
+    """进程级任务队列；所有会话共用工作线程，任务按作品库分组展示与收取"""
+
+    def __init__(self, store, workers=JOB_WORKERS, fetch=fetch_image, enhance=enhance_prompt_cached):
+        self._store = store
+        self._fetch = fetch
+        self._enhance = enhance
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._jobs = {}   # 作品库 -> 最近的任务，最新在前
+        self._lock = threading.Lock()
+
+    def submit(self, job):
+        """入队后立即返回"""
+        with self._lock:
+            self._expire()
+            self._jobs.setdefault(job.library, deque()).appendleft(job)
+            self._trim(job.library)
+        self._executor.submit(self._run, job)
+        return job
+
+    def _trim(self, library):
+        # 只丢弃已结束的旧任务；其作品早已落库，还没收取的会话重新载入作品库时即可看到
+        jobs = self._jobs[library]
+        while len(jobs) > JOB_HISTORY and not jobs[-1].active:
+            jobs.pop()
+
+    def _expire(self):
+        # 持有 self._lock 时调用：丢弃结束超过 JOB_RETENTION 的任务，任务全部丢弃的作品库不再占用条目
+        now = time.time()
+        for library in list(self._jobs):
+            jobs = self._jobs[library]
+            while jobs and not jobs[-1].active and now - (jobs[-1].finished or now) > JOB_RETENTION:
+                jobs.pop()
+            if not jobs:
+                del self._jobs[library]
+
+    def jobs(self, library):
+        with self._lock:
+            return list(self._jobs.get(library, ()))
+
+    def status_counts(self):
+        """所有作品库中各状态的任务数"""
+        counts = dict.fromkeys((QUEUED, RUNNING, DONE, FAILED), 0)
+        with self._lock:
+            for jobs in self._jobs.values():
+                for job in jobs:
+                    counts[job.status] += 1
+        return counts
+
+    def has_active(self, library):
+        with self._lock:
+            return any(job.active for job in self._jobs.get(library, ()))
+
+    def harvest(self, library, cursor):
+        """取出该作品库中 cursor 之后新完成的作品（已落库），按完成先后排列
+
+        cursor 为调用方自己保存的 {任务ID: 已收取数}，原地更新；同一作品库在多个标签页中打开时，
+        每个会话各持一份，互不抢收。
+        """
+        items = []
+        with self._lock:
+            self._expire()
+            jobs = list(reversed(self._jobs.get(library, ())))
+        for job in jobs:
+            finished = len(job.items)
+            items.extend(job.items[cursor.get(job.id, 0):finished])
+            cursor[job.id] = finished
+        # 已被丢弃的任务不会再有新作品
+        live = {job.id for job in jobs}
+        for job_id in [job_id for job_id in cursor if job_id not in live]:
+            del cursor[job_id]
+        return items
+
+    def _run(self, job):
+        job.started = time.time()
+        job.status = RUNNING
+        try:
+            # 计时覆盖一次生成的全过程：提示词增强、拉图与落库
+            with timed("generate"):
+                self._generate(job)
+        except Exception as e:
+            job.errors.append(str(e))
+            job.status = FAILED
+        finally:
+            job.finished = time.time()
+            with self._lock:
+                if job.library in self._jobs:
+                    self._trim(job.library)
+                self._expire()
+
+    def _generate(self, job):
+        if job.enhance:
+            try:
+                job.final_prompt = self._enhance(job.prompt)
+            except Exception as e:
+                # 增强失败时沿用原始提示词
+                job.errors.append(f"提示词增强失败: {e}")
+        seeds = resolve_seeds(job.seed, job.total)
+        urls = [
+            generate_image_url(job.final_prompt, model=job.model_id, width=job.width, height=job.height,
+                               seed=s, enhance=False, nologo=True)
+            for s in seeds
+        ]
+        thumbnails = get_thumbnail_pipeline()
+
+        def on_progress(done, total, result):
+            job.done = done
+            if result.error is not None:
+                job.errors.append(str(result.error))
+                return
+            thumbnails.submit(result.url, result.data)
+            now = time.time()
+            item = GalleryItem(
+                hashlib.md5(f"{result.url}{now}".encode()).hexdigest(),
+                job.final_prompt,
+                job.model_name,
+                job.model_id,
+                job.width,
+                job.height,
+                job.styles,
+                seeds[result.index],
+                created=now,
+            )
+            self._store.add(job.library, item)
+            job.items.append(item)
+
+        run_batch(urls, on_progress, fetch=self._fetch)
+        job.status = DONE if job.items else FAILED
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """获取进程共享的任务队列"""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = JobQueue(get_store())
+    return _queue
+
+
+def _collect_jobs():
+    if _queue is None:
+        return
+    for status, count in _queue.status_counts().items():
+        JOBS.set(count, status=status)
+
+
+register_collector(_collect_jobs)
@@ -0,0 +1,151 @@
+"""页面的样式与静态HTML片段：在进程内只生成一次
+
+app.py 每次重跑都会从头执行，其中定义的函数（连同 lru_cache）每次都是新的；需要跨重跑复用的都放在这里。
+"""
+import re
+from functools import lru_cache
+
+from .catalog import AVAILABLE_MODELS
+
+APP_CSS = """
+    .main-header {
+        font-size: 3rem;
+        font-weight: bold;
+        background: linear-gradient(135deg, #667eea 0%, #764ba2 50%, #f093fb 100%);
+        -webkit-background-clip: text;
+        -webkit-text-fill-color: transparent;
+        text-align: center;
+        padding: 2rem 0;
+    }
+    .stButton>button {
+        width: 100%;
+        border-radius: 12px;
+        height: 3.5em;
+        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+        color: white;
+        font-weight: bold;
+        border: none;
+        transition: all 0.3s;
+    }
+    .stButton>button:hover {
+        transform: translateY(-2px);
+        box-shadow: 0 8px 16px rgba(102, 126, 234, 0.4);
+    }
+    .image-card {
+        border-radius: 15px;
+        padding: 15px;
+        background: white;
+        box-shadow: 0 4px 12px rgba(0,0,0,0.1);
+        transition: all 0.3s;
+        margin-bottom: 20px;
+    }
+    .image-card:hover {
+        transform: translateY(-5px);
+        box-shadow: 0 8px 24px rgba(0,0,0,0.15);
+    }
+    .stats-card {
+        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+        color: white;
+        padding: 20px;
+        border-radius: 15px;
+        text-align: center;
+        margin: 10px 0;
+    }
+    .style-tag {
+        display: inline-block;
+        background: #f0f0f0;
+        padding: 5px 15px;
+        border-radius: 20px;
+        margin: 5px;
+        font-size: 0.9em;
+    }
+    .template-card {
+        background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%);
+        color: white;
+        padding: 15px;
+        border-radius: 12px;
+        margin: 10px 0;
+        cursor: pointer;
+        transition: all 0.3s;
+    }
+    .template-card:hover {
+        transform: scale(1.02);
+        box-shadow: 0 6px 20px rgba(245, 87, 108, 0.3);
+    }
+    .model-badge {
+        display: inline-block;
+        padding: 5px 12px;
+        border-radius: 15px;
+        font-size: 0.85em;
+        font-weight: bold;
+        margin: 2px;
+    }
+    .badge-flux { background: linear-gradient(135deg, #667eea, #764ba2); color: white; }
+    .badge-sd { background: linear-gradient(135deg, #f093fb, #f5576c); color: white; }
+    .badge-turbo { background: linear-gradient(135deg, #4facfe, #00f2fe); color: white; }
+    .badge-premium { background: linear-gradient(135deg, #ffd89b, #19547b); color: white; }
+    .scrollable-gallery {
+        max-height: 800px;
+        overflow-y: auto;
+        padding-right: 10px;
+    }
+    .scrollable-gallery::-webkit-scrollbar {
+        width: 8px;
+    }
+    .scrollable-gallery::-webkit-scrollbar-track {
+        background: #f1f1f1;
+        border-radius: 10px;
+    }
+    .scrollable-gallery::-webkit-scrollbar-thumb {
+        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+        border-radius: 10px;
+    }
+    .model-category {
+        background: #f8f9fa;
+        padding: 15px;
+        border-radius: 10px;
+        margin: 10px 0;
+        border-left: 4px solid #667eea;
+    }
+"""
+
+
+@lru_cache(maxsize=1)
+def style_tag():
+    """压缩空白后的 <style> 标签，每次重跑都要输出，体积越小越好"""
+    css = re.sub(r"\s+", " ", APP_CSS)
+    css = re.sub(r"\s*([{}:;,])\s*", r"\1", css).replace(";}", "}")
+    return f"<style>{css.strip()}</style>"
+
+
+@lru_cache(maxsize=4096)
+def template_card_html(name, text):
+    """模板卡片的静态HTML，每个模板只拼一次"""
+    return f"""
+    <div class="template-card">
+        <h4>✨ {name}</h4>
+        <p style="font-size:0.9em; opacity:0.95; margin-top: 10px;">{text[:100]}...</p>
+    </div>
+    """
+
+
+@lru_cache(maxsize=1)
+def model_details():
+    """模型对比页的静态内容：[(类别, [(模型名, 说明Markdown, 徽章HTML)])]"""
+    return [
+        (category, [
+            (
+                model_name,
+                f"""
+                    **模型ID:** `{model_info['model']}`
+                    
+                    **描述:** {model_info['description']}
+                    
+                    **最适合:** {model_info['best_for']}
+                    """,
+                f'<span class="model-badge {model_info["badge"]}">{model_name}</span>',
+            )
+            for model_name, model_info in models.items()
+        ])
+        for category, models in AVAILABLE_MODELS.items()
+    ]
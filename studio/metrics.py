@@ -0,0 +1,303 @@
+"""进程内指标：计数器、仪表、直方图，热点路径计时，以 Prometheus 文本格式导出到本地文件或 HTTP 端点
+
+- ``STUDIO_METRICS_FILE``：定期把指标原子写入该文件（可交给 node_exporter 的 textfile 采集）
+- ``STUDIO_METRICS_PORT``：在该端口提供 ``/metrics``（``STUDIO_METRICS_HOST`` 为监听地址，缺省只监听本机）
+- ``STUDIO_METRICS_INTERVAL``：写文件的间隔秒数
+
+本模块不依赖 studio 的其他模块；各模块在导入时更新这里定义的指标，或注册采集函数在导出前刷新仪表。
+"""
+import atexit
+import bisect
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_FILE = os.environ.get("STUDIO_METRICS_FILE", "")
+METRICS_PORT = int(os.environ.get("STUDIO_METRICS_PORT", "0"))
+METRICS_HOST = os.environ.get("STUDIO_METRICS_HOST", "127.0.0.1")
+METRICS_INTERVAL = float(os.environ.get("STUDIO_METRICS_INTERVAL", "15"))
+
+# 覆盖从拼接URL（微秒级）到 4K 渲染（数分钟）的耗时
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_metrics = {}
+_collectors = []
+_registry_lock = threading.Lock()
+
+
+def _escape_label(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in (*zip(names, values), *extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _lines(self):
+        raise NotImplementedError
+
+    def render(self):
+        documentation = self.documentation.replace("\\", "\\\\").replace("\n", "\\n")
+        return [f"# HELP {self.name} {documentation}", f"# TYPE {self.name} {self.kind}", *self._lines()]
+
+
+class Counter(_Metric):
+    """只增不减的计数"""
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._series.get(self._key(labels), 0)
+
+    def values(self):
+        """标签值元组 -> 当前值"""
+        with self._lock:
+            return dict(self._series)
+
+    def _lines(self):
+        with self._lock:
+            series = sorted(self._series.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in series]
+
+
+class Gauge(Counter):
+    """可增可减的当前值，通常由采集函数在导出前设置"""
+
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = value
+
+
+class Histogram(_Metric):
+    """按固定桶统计的分布，附带总和与次数"""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        # 上界含等号：恰好落在边界上的值计入该桶
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def _lines(self):
+        with self._lock:
+            series = sorted((key, (list(counts), total)) for key, (counts, total) in self._series.items())
+        lines = []
+        for key, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, (("le", _format_value(bound)),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def _register(metric):
+    with _registry_lock:
+        if metric.name in _metrics:
+            raise ValueError(f"指标重复注册: {metric.name}")
+        _metrics[metric.name] = metric
+    return metric
+
+
+def counter(name, documentation, labelnames=()):
+    return _register(Counter(name, documentation, labelnames))
+
+
+def gauge(name, documentation, labelnames=()):
+    return _register(Gauge(name, documentation, labelnames))
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return _register(Histogram(name, documentation, labelnames, buckets))
+
+
+def register_collector(collect):
+    """注册导出前调用的采集函数，用于从限流器、队列等处刷新仪表"""
+    with _registry_lock:
+        _collectors.append(collect)
+
+
+# 热点路径
+OPERATION_SECONDS = histogram("studio_operation_duration_seconds", "热点操作耗时", ("op",))
+OPERATION_ERRORS = counter("studio_operation_errors_total", "热点操作失败次数，kind 为 timeout 或 error", ("op", "kind"))
+RERUN_SECONDS = histogram("studio_rerun_duration_seconds", "Streamlit 脚本完整运行一次的耗时", ("view",))
+
+# 上游 HTTP
+HTTP_SECONDS = histogram("studio_http_request_duration_seconds", "单次上游请求耗时（不含限流排队）",
+                         ("endpoint", "model"))
+HTTP_QUEUE_SECONDS = histogram("studio_http_queue_duration_seconds", "在限流器前排队的耗时", ("endpoint",))
+HTTP_REQUESTS = counter("studio_http_requests_total", "上游请求次数，status 为状态码或 timeout/connection_error",
+                        ("endpoint", "model", "status"))
+MODEL_TTFB_SECONDS = histogram("studio_model_ttfb_seconds", "模型实测对比中各模型的首字节时间", ("model",))
+HTTP_RETRIES = counter("studio_http_retries_total", "上游请求重试次数", ("endpoint", "model"))
+RATE_LIMIT_WINDOW = gauge("studio_rate_limit_window", "自适应并发窗口", ("endpoint",))
+RATE_LIMIT_IN_FLIGHT = gauge("studio_rate_limit_in_flight", "在途请求数", ("endpoint",))
+RATE_LIMIT_WAITING = gauge("studio_rate_limit_waiting", "在限流器前排队的请求数", ("endpoint",))
+
+# 缓存与请求合并
+CACHE_LOOKUPS = counter("studio_cache_lookups_total", "缓存查询次数，result 为 hit 或 miss", ("cache", "result"))
+CACHE_HIT_RATIO = gauge("studio_cache_hit_ratio", "缓存命中率（进程启动以来）", ("cache",))
+SINGLE_FLIGHT_CALLS = counter("studio_single_flight_calls_total",
+                              "请求合并的调用次数，result 为 executed 或 coalesced", ("group", "result"))
+
+# 后台任务
+JOBS = gauge("studio_jobs", "各状态的生成任务数", ("status",))
+
+
+def _is_timeout(error):
+    if isinstance(error, TimeoutError):
+        return True
+    # requests 尚未导入时不可能抛出它的异常，不必为此提前导入
+    requests = sys.modules.get("requests")
+    return requests is not None and isinstance(error, requests.Timeout)
+
+
+def record_error(op, error):
+    OPERATION_ERRORS.inc(op=op, kind="timeout" if _is_timeout(error) else "error")
+
+
+@contextmanager
+def timed(op):
+    """记录一段代码的耗时与失败；也可用作装饰器"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        record_error(op, e)
+        raise
+    finally:
+        OPERATION_SECONDS.observe(time.perf_counter() - start, op=op)
+
+
+def record_cache_lookup(cache, hit):
+    CACHE_LOOKUPS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def _collect_hit_ratios():
+    lookups = CACHE_LOOKUPS.values()
+    for cache in {cache for cache, _ in lookups}:
+        hits = lookups.get((cache, "hit"), 0)
+        total = hits + lookups.get((cache, "miss"), 0)
+        CACHE_HIT_RATIO.set(hits / total if total else 0.0, cache=cache)
+
+
+register_collector(_collect_hit_ratios)
+
+
+def render():
+    """当前全部指标的 Prometheus 文本格式"""
+    with _registry_lock:
+        collectors = list(_collectors)
+        metrics = list(_metrics.values())
+    for collect in collectors:
+        collect()
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(path):
+    """原子写入指标文件，采集方不会读到写了一半的内容"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(render())
+    os.replace(tmp_path, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _write_periodically(path, interval):
+    while True:
+        time.sleep(interval)
+        try:
+            write_textfile(path)
+        except OSError:
+            # 磁盘暂时不可写时下个周期再试
+            pass
+
+
+_started = False
+_start_lock = threading.Lock()
+
+
+def start_exporters(path=METRICS_FILE, port=METRICS_PORT, interval=METRICS_INTERVAL, host=METRICS_HOST):
+    """按配置启动文件与 HTTP 导出；每个进程只启动一次，未配置时什么也不做"""
+    global _started
+    if _started:
+        return
+    with _start_lock:
+        if _started:
+            return
+        _started = True
+        if path:
+            threading.Thread(target=_write_periodically, args=(path, interval), name="metrics-file",
+                             daemon=True).start()
+            atexit.register(write_textfile, path)
+        if port:
+            server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
@@ -0,0 +1,114 @@
+"""Pollinations API 封装：URL 构造、图片拉取与提示词增强"""
+import os
+import random
+import urllib.parse
+
+from .http_client import CONNECT_TIMEOUT, get_client
+from .image_cache import CachedImage, canonical_url, get_image_cache
+from .metrics import timed
+from .single_flight import SingleFlight
+
+# Pollinations API配置；可用环境变量指向兼容的替身服务（如 bench.fake_server）
+POLLINATIONS_API_BASE = os.environ.get("STUDIO_IMAGE_API", "https://image.pollinations.ai/prompt")
+POLLINATIONS_TEXT_API = os.environ.get("STUDIO_TEXT_API", "https://text.pollinations.ai")
+
+# 4K 渲染可能需要较长时间，读超时放宽
+IMAGE_TIMEOUT = (CONNECT_TIMEOUT, 180)
+ENHANCE_TIMEOUT = (CONNECT_TIMEOUT, 15)
+
+ENHANCEMENT_INSTRUCTION = """You are an expert AI art prompt engineer. Enhance this image generation prompt by adding:
+- Detailed visual descriptions
+- Lighting and atmosphere details
+- Art style specifications
+- Quality and technical keywords
+
+Original prompt: {original_prompt}
+
+Enhanced prompt (respond with ONLY the enhanced prompt, no explanations):"""
+
+MAX_SEED = 999999999
+
+# 同一URL（同提示词、模型、尺寸、种子）的并发拉取只向上游请求一次
+image_flights = SingleFlight("image")
+
+
+def generate_image_url(prompt, model="flux", width=1024, height=1024, seed=None, enhance=False, nologo=True):
+    """生成Pollinations API URL"""
+    encoded_prompt = urllib.parse.quote(prompt)
+    url = f"{POLLINATIONS_API_BASE}/{encoded_prompt}"
+
+    params = []
+    if model and model != "flux":
+        params.append(f"model={model}")
+    if width:
+        params.append(f"width={width}")
+    if height:
+        params.append(f"height={height}")
+    if seed is not None:
+        params.append(f"seed={seed}")
+    if enhance:
+        params.append("enhance=true")
+    if nologo:
+        params.append("nologo=true")
+
+    if params:
+        url += "?" + "&".join(params)
+
+    return url
+
+
+def model_from_url(url):
+    """从图片URL中取出模型ID；URL 不带 model 参数即默认的 flux"""
+    return dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(url).query)).get("model", "flux")
+
+
+def resolve_seeds(seed, count):
+    """为一批变体分配种子：固定种子时依次递增，否则随机，保证每个变体的URL都不同"""
+    if seed is not None:
+        return [seed + i for i in range(count)]
+    return [random.randint(0, MAX_SEED) for _ in range(count)]
+
+
+def fetch_original(url, timeout=IMAGE_TIMEOUT, use_cache=True):
+    """拉取图片原始字节及其MIME类型（优先读磁盘缓存），失败时抛出异常；批量落盘时可传 use_cache=False 绕过缓存"""
+    cache = get_image_cache() if use_cache else None
+    cached = cache.get(url) if cache is not None else None
+    if cached is not None:
+        return cached
+    return image_flights.do(canonical_url(url), _download_original, url, timeout, cache)
+
+
+@timed("fetch_image")
+def _download_original(url, timeout, cache):
+    # 等待合并期间领头请求可能刚写完缓存
+    if cache is not None and url in cache:
+        cached = cache.get(url)
+        if cached is not None:
+            return cached
+    # 按模型分别限速，某个模型被限流时不拖累其他模型
+    response = get_client().get(url, timeout=timeout, model=model_from_url(url))
+    response.raise_for_status()
+    content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+    if not content_type.startswith("image/"):
+        raise ValueError(f"非图片响应: {content_type or '未知类型'}")
+    if cache is not None:
+        cache.put(url, response.content, content_type)
+    return CachedImage(response.content, content_type)
+
+
+def fetch_image(url, timeout=IMAGE_TIMEOUT):
+    """拉取图片原始字节，失败时抛出异常"""
+    return fetch_original(url, timeout).data
+
+
+@timed("enhance")
+def enhance_prompt(original_prompt, timeout=ENHANCE_TIMEOUT):
+    """使用Pollinations文本API增强提示词；增强结果不比原文长时返回原文，请求失败时抛出异常"""
+    instruction = ENHANCEMENT_INSTRUCTION.format(original_prompt=original_prompt)
+    url = f"{POLLINATIONS_TEXT_API}/{urllib.parse.quote(instruction)}"
+
+    response = get_client().get(url, timeout=timeout)
+    response.raise_for_status()
+    enhanced = response.text.strip()
+    enhanced = enhanced.strip('"').strip("'").strip()
+    return enhanced if len(enhanced) > len(original_prompt) else original_prompt
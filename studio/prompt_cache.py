@@ -0,0 +1,164 @@
+"""提示词增强结果的持久化缓存（SQLite），跨会话共享，支持TTL、容量淘汰与离线预热
+
+离线预热整个模板库：
+
+    python -m studio.prompt_cache --workers 4
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .image_cache import CACHE_DIR
+from .metrics import record_cache_lookup
+from .pollinations import enhance_prompt
+from .single_flight import SingleFlight
+
+PROMPT_CACHE_PATH = os.environ.get("STUDIO_PROMPT_CACHE", os.path.join(CACHE_DIR, "prompts.sqlite3"))
+PROMPT_CACHE_TTL = int(os.environ.get("STUDIO_PROMPT_CACHE_TTL", str(30 * 24 * 3600)))
+PROMPT_CACHE_MAX_ENTRIES = int(os.environ.get("STUDIO_PROMPT_CACHE_MAX_ENTRIES", "10000"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS enhancements (
+    key TEXT PRIMARY KEY,
+    enhanced TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_enhancements_accessed ON enhancements (accessed_at);
+"""
+
+
+def normalize_prompt(prompt):
+    """缓存键：Unicode 规范化、折叠空白、忽略大小写"""
+    return " ".join(unicodedata.normalize("NFKC", prompt).split()).casefold()
+
+
+class PromptCache:
+    """增强结果缓存；一个进程共用一个连接，WAL 模式允许多进程同时读写"""
+
+    def __init__(self, path=PROMPT_CACHE_PATH, ttl=PROMPT_CACHE_TTL, max_entries=PROMPT_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def get(self, prompt):
+        """读取未过期的增强结果，未命中返回 None"""
+        key = normalize_prompt(prompt)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT enhanced FROM enhancements WHERE key = ? AND created_at > ?",
+                (key, now - self.ttl),
+            ).fetchone()
+            if row is not None:
+                self._conn.execute("UPDATE enhancements SET accessed_at = ? WHERE key = ?", (now, key))
+        record_cache_lookup("prompt", hit=row is not None)
+        return row[0] if row is not None else None
+
+    def put(self, prompt, enhanced):
+        """写入增强结果，并清理过期与超出容量的条目"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO enhancements (key, enhanced, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (normalize_prompt(prompt), enhanced, now, now),
+            )
+            self._conn.execute("DELETE FROM enhancements WHERE created_at <= ?", (now - self.ttl,))
+            self._conn.execute(
+                "DELETE FROM enhancements WHERE key IN ("
+                " SELECT key FROM enhancements ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM enhancements").fetchone()[0]
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_prompt_cache():
+    """获取进程共享的提示词缓存"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = PromptCache()
+    return _cache
+
+
+# 规范化后相同的提示词同时请求增强时只调用一次文本API
+enhance_flights = SingleFlight("enhance")
+
+
+def _enhance_and_store(cache, prompt):
+    enhanced = cache.get(prompt)
+    if enhanced is None:
+        enhanced = enhance_prompt(prompt)
+        cache.put(prompt, enhanced)
+    return enhanced
+
+
+def enhance_prompt_cached(prompt):
+    """带缓存的提示词增强；请求失败时抛出异常且不写入缓存"""
+    cache = get_prompt_cache()
+    enhanced = cache.get(prompt)
+    if enhanced is None:
+        enhanced = enhance_flights.do(normalize_prompt(prompt), _enhance_and_store, cache, prompt)
+    return enhanced
+
+
+def prewarm(prompts, workers=4, force=False, on_result=None):
+    """批量预热增强结果，返回 (成功数, 失败数)"""
+    cache = get_prompt_cache()
+    pending = [p for p in dict.fromkeys(prompts) if force or cache.get(p) is None]
+    ok = failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(enhance_prompt, p): p for p in pending}
+        for future in as_completed(futures):
+            prompt = futures[future]
+            try:
+                cache.put(prompt, future.result())
+                ok += 1
+                error = None
+            except Exception as e:
+                failed += 1
+                error = e
+            if on_result:
+                on_result(prompt, error)
+    return ok, failed
+
+
+def main(argv=None):
+    from .catalog import TEMPLATE_TEXTS
+
+    parser = argparse.ArgumentParser(description="离线预热提示词模板库的AI增强结果")
+    parser.add_argument("--workers", type=int, default=4, help="并发请求数")
+    parser.add_argument("--force", action="store_true", help="忽略已有缓存，全部重新增强")
+    args = parser.parse_args(argv)
+
+    prompts = list(TEMPLATE_TEXTS)
+
+    def report(prompt, error):
+        status = f"失败: {error}" if error else "完成"
+        print(f"[{status}] {prompt[:60]}", file=sys.stderr)
+
+    ok, failed = prewarm(prompts, workers=args.workers, force=args.force, on_result=report)
+    print(f"预热完成：新增 {ok} 条，失败 {failed} 条，跳过 {len(set(prompts)) - ok - failed} 条")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
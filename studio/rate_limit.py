@@ -0,0 +1,222 @@
+"""进程级限流与自适应并发：按接口、按模型的令牌桶控制请求速率，按接口的 AIMD 窗口控制在途请求数
+
+AIMD：每个成功请求让并发窗口增加 1/窗口（约每轮窗口 +1），遇到 429/503/超时时窗口按比例收缩；
+同一轮拥塞只收缩一次（只有在上次收缩之后才发出的请求失败才会再次收缩），
+因此吞吐会收敛在上游允许的最高水平附近，而不是在过载与空闲之间来回震荡。
+令牌桶的速率按同样的规则调整（每个成功请求 +1/速率，即满速时约每秒 +1 个/秒，过载时按比例收缩），
+初始速率只是起点，不是上限。
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# 令牌桶的初始速率（个/秒）与突发额度；速率随后自适应，突发额度足以让一次 20 张以内的批量立即全部发出
+ENDPOINT_RATE = float(os.environ.get("STUDIO_RATE_PER_HOST", "20"))
+ENDPOINT_BURST = float(os.environ.get("STUDIO_RATE_PER_HOST_BURST", "40"))
+MODEL_RATE = float(os.environ.get("STUDIO_RATE_PER_MODEL", "10"))
+MODEL_BURST = float(os.environ.get("STUDIO_RATE_PER_MODEL_BURST", "20"))
+# 自适应速率的上下限
+MIN_RATE = 0.2
+MAX_RATE = float(os.environ.get("STUDIO_RATE_MAX", "100"))
+
+INITIAL_CONCURRENCY = int(os.environ.get("STUDIO_HTTP_PER_HOST", "8"))
+MIN_CONCURRENCY = 1
+MAX_CONCURRENCY = int(os.environ.get("STUDIO_HTTP_MAX_CONCURRENCY", "32"))
+# 过载时窗口收缩的比例；比减半更平缓，窗口在上游上限附近的锯齿更小
+DECREASE_FACTOR = 0.7
+
+
+class TokenBucket:
+    """令牌桶：平均 rate 个/秒，最多积攒 burst 个；rate 随上游反馈加性增、乘性减，可因 Retry-After 暂停发放"""
+
+    def __init__(self, rate, burst, minimum=MIN_RATE, maximum=MAX_RATE, decrease=DECREASE_FACTOR):
+        self.rate = rate
+        self.burst = burst
+        self.minimum = minimum
+        self.maximum = max(maximum, rate)
+        self.decrease = decrease
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._waiting = 0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """取一个令牌，不足时睡到下一个令牌产生"""
+        with self._lock:
+            self._waiting += 1
+        try:
+            while True:
+                with self._lock:
+                    now = time.monotonic()
+                    if now < self._paused_until:
+                        delay = self._paused_until - now
+                    else:
+                        self._refill(now)
+                        if self._tokens >= 1:
+                            self._tokens -= 1
+                            return
+                        delay = (1 - self._tokens) / self.rate
+                time.sleep(delay)
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+    def adjust(self, started, overloaded=False):
+        """按一次请求的结果调整速率；started 为请求放行的时刻，同一轮拥塞只收缩一次"""
+        with self._lock:
+            # 先按旧速率结算已产生的令牌
+            self._refill(max(time.monotonic(), self._updated))
+            if overloaded:
+                if started >= self._last_decrease:
+                    self.rate = max(self.minimum, self.rate * self.decrease)
+                    self._last_decrease = time.monotonic()
+            else:
+                self.rate = min(self.maximum, self.rate + 1 / self.rate)
+
+    def pause(self, seconds):
+        """在 seconds 秒内不再发放令牌，并清空积攒的突发额度"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0
+            self._updated = self._paused_until
+
+    def snapshot(self):
+        with self._lock:
+            self._refill(max(time.monotonic(), self._updated))
+            return {"rate": round(self.rate, 2), "tokens": round(self._tokens, 2), "waiting": self._waiting}
+
+
+class AimdLimiter:
+    """加性增、乘性减的并发窗口"""
+
+    def __init__(self, initial=INITIAL_CONCURRENCY, minimum=MIN_CONCURRENCY, maximum=MAX_CONCURRENCY,
+                 decrease=DECREASE_FACTOR):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease = decrease
+        self._limit = float(initial)
+        self._in_flight = 0
+        self._waiting = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self):
+        return int(self._limit)
+
+    def acquire(self):
+        """等待并占用一个并发名额，返回占用时刻（用于判断失败是否属于已处理过的拥塞）"""
+        with self._cond:
+            self._waiting += 1
+            while self._in_flight >= int(self._limit):
+                self._cond.wait()
+            self._waiting -= 1
+            self._in_flight += 1
+            return time.monotonic()
+
+    def release(self, started, overloaded=False):
+        with self._cond:
+            self._in_flight -= 1
+            if overloaded:
+                if started >= self._last_decrease:
+                    self._limit = max(self.minimum, self._limit * self.decrease)
+                    self._last_decrease = time.monotonic()
+            else:
+                self._limit = min(self.maximum, self._limit + 1 / self._limit)
+            self._cond.notify_all()
+
+    def snapshot(self):
+        with self._cond:
+            return {"limit": self.limit, "in_flight": self._in_flight, "waiting": self._waiting}
+
+
+class Ticket:
+    """一次放行的请求；调用方用 overloaded() 报告上游过载"""
+
+    __slots__ = ("started", "overload", "retry_after")
+
+    def __init__(self, started):
+        self.started = started
+        self.overload = False
+        self.retry_after = None
+
+    def overloaded(self, retry_after=None):
+        self.overload = True
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """按接口（主机）与模型分组的限流器集合，所有会话、批量任务与后台线程共用"""
+
+    def __init__(self, endpoint_rate=ENDPOINT_RATE, endpoint_burst=ENDPOINT_BURST,
+                 model_rate=MODEL_RATE, model_burst=MODEL_BURST, initial_concurrency=INITIAL_CONCURRENCY,
+                 max_concurrency=MAX_CONCURRENCY):
+        self.endpoint_rate = endpoint_rate
+        self.endpoint_burst = endpoint_burst
+        self.model_rate = model_rate
+        self.model_burst = model_burst
+        self.initial_concurrency = initial_concurrency
+        self.max_concurrency = max_concurrency
+        self._endpoint_buckets = {}
+        self._model_buckets = {}
+        self._concurrency = {}
+        self._lock = threading.Lock()
+
+    def _get(self, registry, key, factory):
+        with self._lock:
+            limiter = registry.get(key)
+            if limiter is None:
+                limiter = registry[key] = factory()
+            return limiter
+
+    @contextmanager
+    def slot(self, endpoint, model=None):
+        """依次通过接口令牌桶、模型令牌桶与接口并发窗口；退出时按 Ticket 上报的结果调整窗口"""
+        endpoint_bucket = self._get(self._endpoint_buckets, endpoint,
+                                    lambda: TokenBucket(self.endpoint_rate, self.endpoint_burst))
+        concurrency = self._get(self._concurrency, endpoint,
+                                lambda: AimdLimiter(self.initial_concurrency, maximum=self.max_concurrency))
+        buckets = [endpoint_bucket]
+        if model is not None:
+            buckets.append(self._get(self._model_buckets, (endpoint, model),
+                                     lambda: TokenBucket(self.model_rate, self.model_burst)))
+        for bucket in buckets:
+            bucket.acquire()
+        ticket = Ticket(concurrency.acquire())
+        try:
+            yield ticket
+        finally:
+            concurrency.release(ticket.started, ticket.overload)
+            for bucket in buckets:
+                bucket.adjust(ticket.started, ticket.overload)
+            if ticket.retry_after:
+                endpoint_bucket.pause(ticket.retry_after)
+
+    def snapshot(self):
+        """各接口的并发窗口、在途与排队数，以及各令牌桶状态"""
+        with self._lock:
+            concurrency = dict(self._concurrency)
+            endpoint_buckets = dict(self._endpoint_buckets)
+            model_buckets = dict(self._model_buckets)
+        return {
+            "endpoints": {
+                endpoint: dict(limiter.snapshot(), bucket=endpoint_buckets[endpoint].snapshot())
+                for endpoint, limiter in concurrency.items()
+            },
+            "models": {f"{endpoint}/{model}": bucket.snapshot() for (endpoint, model), bucket in model_buckets.items()},
+        }
+
+    def queue_depth(self):
+        """当前在限流器前排队的请求总数"""
+        snapshot = self.snapshot()
+        return (
+            sum(e["waiting"] + e["bucket"]["waiting"] for e in snapshot["endpoints"].values())
+            + sum(m["waiting"] for m in snapshot["models"].values())
+        )
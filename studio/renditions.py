@@ -0,0 +1,193 @@
+"""多尺寸衍生图：以作品自身的原图为主图，各尺寸预设在本地智能裁剪并缩放得到
+
+所有尺寸都出自用户正在看的这张作品，不再向上游请求新的渲染（原图通常已在磁盘缓存中）；
+比原图大的预设只能由原图插值放大，upscaled_presets 给出这些预设供界面标注。
+结果按 (作品URL, 尺寸) 缓存到磁盘，重复导出不再解码与编码。
+"""
+import io
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from .catalog import IMAGE_SIZES
+from .downloads import FILE_EXTENSIONS
+from .image_cache import CACHE_DIR, ImageCache
+from .metrics import timed
+from .pollinations import fetch_original
+
+RENDITION_DIR = os.path.join(CACHE_DIR, "renditions")
+RENDITION_MAX_BYTES = int(os.environ.get("STUDIO_RENDITION_MAX_BYTES", str(512 * 1024 * 1024)))
+RENDITION_WORKERS = int(os.environ.get("STUDIO_RENDITION_WORKERS", "2"))
+
+# 可导出的尺寸预设（不含“自定义”）
+RENDITION_PRESETS = {name: size for name, size in IMAGE_SIZES.items() if None not in size}
+
+# 智能裁剪时分析用的缩略边长
+ANALYSIS_SIZE = 128
+# 裁剪窗口偏离中心时的能量折扣，边缘信息量相近时优先居中
+CENTER_BIAS = 0.15
+
+_ENCODERS = {
+    "image/jpeg": ("JPEG", {"quality": 92}),
+    "image/png": ("PNG", {}),
+    "image/webp": ("WEBP", {"quality": 90}),
+}
+_DEFAULT_MIME = "image/jpeg"
+
+Rendition = namedtuple("Rendition", ["preset", "width", "height", "data", "mime", "extension"])
+
+
+def edge_profile(image):
+    """主图缩小后的边缘强度图，各尺寸的裁剪位置都从它计算"""
+    from PIL import Image, ImageFilter
+
+    small = image.resize((ANALYSIS_SIZE, ANALYSIS_SIZE), Image.Resampling.BOX).convert("L")
+    edges = small.filter(ImageFilter.FIND_EDGES)
+    # 卷积在图像边界上会产生假边缘
+    return edges.crop((1, 1, edges.width - 1, edges.height - 1))
+
+
+def _best_offset(profile, window):
+    """在一维能量分布上滑动长度为 window 的窗口，返回得分最高的起点"""
+    slack = len(profile) - window
+    if slack <= 0:
+        return 0
+    prefix = [0]
+    for value in profile:
+        prefix.append(prefix[-1] + value)
+    middle = slack / 2
+    best, best_score = 0, -1.0
+    for offset in range(slack + 1):
+        energy = prefix[offset + window] - prefix[offset]
+        score = energy * (1 - CENTER_BIAS * abs(offset - middle) / middle)
+        if score > best_score:
+            best, best_score = offset, score
+    return best
+
+
+def crop_box(size, edges, width, height):
+    """在 size 大小的主图上取目标宽高比、边缘能量最集中的裁剪框 (左, 上, 右, 下)"""
+    from PIL import Image
+
+    src_width, src_height = size
+    target = width / height
+    if abs(src_width / src_height - target) < 1e-3:
+        return (0, 0, src_width, src_height)
+    horizontal = src_width / src_height > target  # 主图更宽时左右裁
+    if horizontal:
+        crop_width, crop_height = round(src_height * target), src_height
+        extent, crop_extent, samples = src_width, crop_width, edges.width
+        # 按列求平均：缩放到一行即得每列的边缘强度
+        profile = list(edges.resize((samples, 1), Image.Resampling.BOX).getdata())
+    else:
+        crop_width, crop_height = src_width, round(src_width / target)
+        extent, crop_extent, samples = src_height, crop_height, edges.height
+        profile = list(edges.resize((1, samples), Image.Resampling.BOX).getdata())
+    window = max(1, round(samples * crop_extent / extent))
+    slack = samples - window
+    offset = _best_offset(profile, window)
+    # 分析图上的起点按比例映射回主图
+    start = round(offset * (extent - crop_extent) / slack) if slack > 0 else (extent - crop_extent) // 2
+    if horizontal:
+        return (start, 0, start + crop_width, crop_height)
+    return (0, start, crop_width, start + crop_height)
+
+
+def upscale_factor(source_size, width, height):
+    """从 source_size 的原图裁出 width x height 需要的放大倍数；不超过 1 表示只裁剪缩小，原图尺寸未知时返回 None"""
+    src_width, src_height = source_size
+    if not src_width or not src_height:
+        return None
+    # 裁剪框总有一条边占满原图，覆盖目标尺寸所需的缩放比取两个方向中较大的
+    return max(width / src_width, height / src_height)
+
+
+def upscaled_presets(source_size):
+    """需要放大原图才能得到的预设名；这些尺寸的细节是插值出来的，不是真实的高分辨率"""
+    return {
+        name for name, (width, height) in RENDITION_PRESETS.items()
+        if (upscale_factor(source_size, width, height) or 0) > 1
+    }
+
+
+def render_rendition(master, edges, width, height, mime):
+    """从已解码的主图裁剪、缩放并编码出一个尺寸"""
+    from PIL import Image
+
+    pil_format, options = _ENCODERS[mime]
+    box = crop_box(master.size, edges, width, height)
+    image = master.resize((width, height), Image.Resampling.LANCZOS, box=box, reducing_gap=2.0)
+    if pil_format == "JPEG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    buffered = io.BytesIO()
+    image.save(buffered, format=pil_format, **options)
+    return buffered.getvalue()
+
+
+class RenditionPipeline:
+    """为作品生成尺寸预设；缺失的尺寸共用一次原图读取与解码，在线程池中并行裁剪编码"""
+
+    def __init__(self, cache, workers=RENDITION_WORKERS, fetch=fetch_original):
+        self.cache = cache
+        self._fetch = fetch
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rendition")
+
+    def _render(self, url, master, edges, width, height, mime):
+        with timed("rendition"):
+            data = render_rendition(master, edges, width, height, mime)
+        self.cache.put(url, data, mime, variant=f"{width}x{height}")
+        return data
+
+    def render(self, item, presets):
+        """按预设名返回 {预设: Rendition}；未知预设抛出 KeyError，原图拉取失败时抛出异常"""
+        from PIL import Image
+
+        sizes = {name: RENDITION_PRESETS[name] for name in presets}
+        if not sizes:
+            return {}
+        # 主图就是作品本身：与画廊、下载共用同一个缓存条目
+        url = item.url
+        done = {}
+        for size in set(sizes.values()):
+            cached = self.cache.get(url, variant=f"{size[0]}x{size[1]}")
+            if cached is not None:
+                done[size] = (cached.data, cached.content_type)
+
+        missing = [size for size in dict.fromkeys(sizes.values()) if size not in done]
+        if missing:
+            original = self._fetch(url)
+            mime = original.content_type if original.content_type in _ENCODERS else _DEFAULT_MIME
+            with Image.open(io.BytesIO(original.data)) as master:
+                master.load()
+                if master.mode not in ("RGB", "RGBA", "L"):
+                    master = master.convert("RGBA" if master.mode in ("P", "LA", "PA") else "RGB")
+                edges = edge_profile(master)
+                futures = {
+                    size: self._executor.submit(self._render, url, master, edges, size[0], size[1], mime)
+                    for size in missing
+                }
+                # 全部结束后再离开，主图在工作线程用完之前不能关闭
+                wait(futures.values())
+            for size, future in futures.items():
+                done[size] = (future.result(), mime)
+
+        renditions = {}
+        for name, (width, height) in sizes.items():
+            data, mime = done[(width, height)]
+            renditions[name] = Rendition(name, width, height, data, mime, FILE_EXTENSIONS.get(mime, "bin"))
+        return renditions
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_rendition_pipeline():
+    """获取进程共享的衍生图流水线"""
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = RenditionPipeline(ImageCache(RENDITION_DIR, RENDITION_MAX_BYTES, name="rendition"))
+    return _pipeline
@@ -0,0 +1,46 @@
+"""请求合并（single-flight）：同一键的并发调用只执行一次，其余调用方等待并共享同一结果或异常"""
+import threading
+from concurrent.futures import Future
+
+from .metrics import SINGLE_FLIGHT_CALLS
+
+
+class SingleFlight:
+    """按键合并进行中的调用；调用结束后立即移除，之后的调用会重新执行（结果复用交给各自的缓存）"""
+
+    def __init__(self, name="default"):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        """执行 fn(*args, **kwargs)；同一 key 已在执行时等待它的结果"""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+        SINGLE_FLIGHT_CALLS.inc(group=self.name, result="executed" if leader else "coalesced")
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,266 @@
+"""持久化的画廊与历史存储（SQLite WAL）：按作品库隔离
+
+会话打开作品库时由 GalleryCollection 一次读入画廊、历史与收藏，之后的筛选、计数与分页都在内存中完成；
+这里只保留整表读取（走各视图的排序索引）、单件读写与导出用的键集分页遍历。
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from .gallery import GalleryItem
+from .pollinations import model_from_url
+
+DATA_DIR = os.environ.get("STUDIO_DATA_DIR", os.path.join(os.path.expanduser("~"), ".local", "share", "ai-art-studio"))
+GALLERY_DB_PATH = os.environ.get("STUDIO_GALLERY_DB", os.path.join(DATA_DIR, "gallery.sqlite3"))
+
+# 作品ID只在作品库内唯一：同一份导出可以导入到任意作品库
+_ITEMS_TABLE = """
+CREATE TABLE IF NOT EXISTS items (
+    id TEXT NOT NULL,
+    library TEXT NOT NULL,
+    url TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    model TEXT NOT NULL,
+    model_id TEXT NOT NULL DEFAULT 'flux',
+    width INTEGER,
+    height INTEGER,
+    styles TEXT NOT NULL,
+    seed INTEGER,
+    created_at REAL NOT NULL,
+    is_favorite INTEGER NOT NULL DEFAULT 0,
+    favorited_at REAL,
+    in_gallery INTEGER NOT NULL DEFAULT 1,
+    in_history INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (library, id)
+)"""
+
+_INDEXES = ("idx_items_gallery", "idx_items_model", "idx_items_favorite", "idx_items_history")
+
+_SCHEMA = _ITEMS_TABLE + """;
+CREATE INDEX IF NOT EXISTS idx_items_gallery ON items (library, in_gallery, created_at);
+CREATE INDEX IF NOT EXISTS idx_items_model ON items (library, in_gallery, model, created_at);
+CREATE INDEX IF NOT EXISTS idx_items_favorite ON items (library, is_favorite, favorited_at);
+CREATE INDEX IF NOT EXISTS idx_items_history ON items (library, in_history, created_at);
+DROP INDEX IF EXISTS idx_items_seed;
+CREATE TABLE IF NOT EXISTS libraries (
+    id TEXT PRIMARY KEY,
+    total_generated INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+# URL 由其余字段推导，查询时不再读取
+_COLUMNS = "id, prompt, model, model_id, width, height, styles, seed, created_at, is_favorite"
+
+
+def _row_to_item(row):
+    item_id, prompt, model, model_id, width, height, styles, seed, created_at, is_favorite = row
+    return GalleryItem(item_id, prompt, model, model_id, width, height, json.loads(styles), seed,
+                       created_at, bool(is_favorite))
+
+
+def _model_filter(models):
+    if not models:
+        return "", ()
+    return f" AND model IN ({', '.join('?' * len(models))})", tuple(models)
+
+
+class GalleryStore:
+    """一个进程共用一个连接；所有方法都以作品库ID区分不同用户"""
+
+    def __init__(self, path=GALLERY_DB_PATH):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def _migrate(self):
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(items)")}
+        if columns and "model_id" not in columns:
+            # 旧库没有 model_id 列，从当时生成的URL中恢复
+            self._conn.execute("ALTER TABLE items ADD COLUMN model_id TEXT NOT NULL DEFAULT 'flux'")
+            rows = self._conn.execute("SELECT id, url FROM items").fetchall()
+            self._conn.executemany(
+                "UPDATE items SET model_id = ? WHERE id = ?",
+                [(model_from_url(url), item_id) for item_id, url in rows],
+            )
+        primary_key = [row[1] for row in sorted(self._conn.execute("PRAGMA table_info(items)"), key=lambda r: r[5])
+                       if row[5]]
+        if columns and primary_key == ["id"]:
+            # 旧库以作品ID为全局主键，导出的作品无法导入其他作品库；重建为 (作品库, 作品ID) 主键
+            names = ", ".join(row[1] for row in self._conn.execute("PRAGMA table_info(items)"))
+            self._conn.execute("BEGIN")
+            try:
+                for index in _INDEXES:
+                    self._conn.execute(f"DROP INDEX IF EXISTS {index}")
+                self._conn.execute("ALTER TABLE items RENAME TO items_v1")
+                self._conn.execute(_ITEMS_TABLE)
+                self._conn.execute(f"INSERT INTO items ({names}) SELECT {names} FROM items_v1")
+                self._conn.execute("DROP TABLE items_v1")
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _all(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _write(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).rowcount
+
+    def add(self, library, item):
+        """写入一件新作品（同时进入画廊与历史）并累加生成计数"""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    f"INSERT INTO items ({_COLUMNS}, url, library) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        item.id, item.prompt, item.model, item.model_id, item.width, item.height,
+                        json.dumps(list(item.styles), ensure_ascii=False), item.seed,
+                        item.created, int(item.is_favorite), item.url, library,
+                    ),
+                )
+                self._conn.execute(
+                    "INSERT INTO libraries (id, total_generated) VALUES (?, 1)"
+                    " ON CONFLICT(id) DO UPDATE SET total_generated = total_generated + 1",
+                    (library,),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def get(self, library, item_id):
+        rows = self._all(f"SELECT {_COLUMNS} FROM items WHERE library = ? AND id = ?", (library, item_id))
+        return _row_to_item(rows[0]) if rows else None
+
+    def set_favorite(self, library, item_id, favorite):
+        """设置收藏状态；新收藏排在收藏列表末尾"""
+        updated = self._write(
+            "UPDATE items SET is_favorite = ?, favorited_at = ? WHERE library = ? AND id = ?",
+            (int(favorite), time.time() if favorite else None, library, item_id),
+        ) > 0
+        if not favorite:
+            self._purge(library)
+        return updated
+
+    def total_generated(self, library):
+        rows = self._all("SELECT total_generated FROM libraries WHERE id = ?", (library,))
+        return rows[0][0] if rows else 0
+
+    # 画廊
+    def gallery(self, library, models=None, favorites_only=False):
+        """画廊作品，最新在前；可按模型筛选、仅收藏（命令行打包用）"""
+        model_sql, model_params = _model_filter(models)
+        favorite_sql = " AND is_favorite = 1" if favorites_only else ""
+        rows = self._all(
+            f"SELECT {_COLUMNS} FROM items WHERE library = ? AND in_gallery = 1{model_sql}{favorite_sql}"
+            " ORDER BY created_at DESC",
+            (library, *model_params),
+        )
+        return [_row_to_item(row) for row in rows]
+
+    def clear_gallery(self, library):
+        self._write("UPDATE items SET in_gallery = 0 WHERE library = ?", (library,))
+        self._purge(library)
+
+    # 收藏
+    def favorites(self, library):
+        """收藏，按收藏先后排列"""
+        rows = self._all(
+            f"SELECT {_COLUMNS} FROM items WHERE library = ? AND is_favorite = 1 ORDER BY favorited_at ASC",
+            (library,),
+        )
+        return [_row_to_item(row) for row in rows]
+
+    # 历史
+    def history(self, library):
+        """历史，最新在前"""
+        rows = self._all(
+            f"SELECT {_COLUMNS} FROM items WHERE library = ? AND in_history = 1 ORDER BY created_at DESC",
+            (library,),
+        )
+        return [_row_to_item(row) for row in rows]
+
+    def iter_items(self, library, batch_size=500):
+        """按时间倒序逐批遍历作品库中的全部作品，产出 (作品, 在画廊中, 在历史中)；按键集分页，不一次读入全部"""
+        cursor = None
+        while True:
+            if cursor is None:
+                where, params = "", ()
+            else:
+                where, params = " AND (created_at < ? OR (created_at = ? AND id < ?))", (cursor[0], cursor[0], cursor[1])
+            rows = self._all(
+                f"SELECT {_COLUMNS}, in_gallery, in_history FROM items WHERE library = ?{where}"
+                " ORDER BY created_at DESC, id DESC LIMIT ?",
+                (library, *params, batch_size),
+            )
+            for row in rows:
+                yield _row_to_item(row[:-2]), bool(row[-2]), bool(row[-1])
+            if len(rows) < batch_size:
+                return
+            cursor = (rows[-1][8], rows[-1][0])
+
+    def import_items(self, library, records):
+        """批量写入 (作品, 在画廊中, 在历史中)，本作品库中已存在的作品ID跳过；返回新写入的数量"""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                before = self._conn.total_changes
+                self._conn.executemany(
+                    f"INSERT OR IGNORE INTO items ({_COLUMNS}, url, library, favorited_at, in_gallery, in_history)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (
+                            item.id, item.prompt, item.model, item.model_id, item.width, item.height,
+                            json.dumps(list(item.styles), ensure_ascii=False), item.seed, item.created,
+                            int(item.is_favorite), item.url, library,
+                            item.created if item.is_favorite else None, int(in_gallery), int(in_history),
+                        )
+                        for item, in_gallery, in_history in records
+                    ],
+                )
+                inserted = self._conn.total_changes - before
+                if inserted:
+                    self._conn.execute(
+                        "INSERT INTO libraries (id, total_generated) VALUES (?, ?)"
+                        " ON CONFLICT(id) DO UPDATE SET total_generated = total_generated + excluded.total_generated",
+                        (library, inserted),
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return inserted
+
+    def clear_history(self, library):
+        self._write("UPDATE items SET in_history = 0 WHERE library = ?", (library,))
+        self._purge(library)
+
+    def _purge(self, library):
+        """删除已不在任何视图中的作品"""
+        self._write(
+            "DELETE FROM items WHERE library = ? AND in_gallery = 0 AND in_history = 0 AND is_favorite = 0",
+            (library,),
+        )
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """获取进程共享的画廊存储"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = GalleryStore()
+    return _store
@@ -0,0 +1,331 @@
+"""提示词模板检索：名称与正文的倒排索引，中英文分词、前缀匹配与 BM25 排序；模板文件变化时增量重建
+
+除内置 PROMPT_TEMPLATES 外，还会加载 STUDIO_TEMPLATE_DIR 目录下的模板文件：
+
+- ``*.json``：与 PROMPT_TEMPLATES 相同的结构 ``{类别: {名称: 模板}}``
+- ``*.jsonl``：每行一个 ``{"category": ..., "name": ..., "template": ...}``
+"""
+import bisect
+import heapq
+import json
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import namedtuple
+from operator import itemgetter
+
+from .metrics import record_error
+
+TEMPLATE_DIR = os.environ.get("STUDIO_TEMPLATE_DIR", "")
+REFRESH_INTERVAL = 2.0
+
+# 名称命中比正文命中更重要
+NAME_WEIGHT = 3
+BM25_K1 = 1.2
+BM25_B = 0.75
+# 前缀展开的词条上限，防止一两个字母的前缀拖慢检索
+MAX_PREFIX_EXPANSIONS = 64
+# 多词查询：各词展开不多时先求交集，交集不超过该数量就直接逐个打分
+MAX_INTERSECT_EXPANSIONS = 4
+MAX_DIRECT_CANDIDATES = 5000
+
+BUILTIN_SOURCE = "<builtin>"
+
+Template = namedtuple("Template", ["key", "category", "name", "text"])
+
+_TOKEN_RE = re.compile(r"[0-9a-z]+|[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+
+
+def _is_cjk(run):
+    return not run[0].isascii()
+
+
+def tokenize(text):
+    """英文按单词、中文按单字加相邻双字切分"""
+    tokens = []
+    for run in _TOKEN_RE.findall(unicodedata.normalize("NFKC", text).casefold()):
+        if _is_cjk(run):
+            tokens.extend(run)
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def _query_terms(query):
+    """查询词：中文优先用双字（单字时用单字），英文的最后一个词按前缀匹配"""
+    terms = []
+    runs = _TOKEN_RE.findall(unicodedata.normalize("NFKC", query).casefold())
+    for index, run in enumerate(runs):
+        if _is_cjk(run):
+            grams = [run[i:i + 2] for i in range(len(run) - 1)] or [run]
+            terms.extend((gram, False) for gram in grams)
+        else:
+            terms.append((run, index == len(runs) - 1))
+    return list(dict.fromkeys(terms))
+
+
+def _load_file(path):
+    """读取一个模板文件，返回 [(key, category, name, text)]"""
+    base = os.path.basename(path)
+    templates = []
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for lineno, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                templates.append(Template(f"{base}:{lineno}", record.get("category", base),
+                                          record["name"], record["template"]))
+        else:
+            for category, entries in json.load(f).items():
+                for name, text in entries.items():
+                    templates.append(Template(f"{base}:{category}:{name}", category, name, text))
+    return templates
+
+
+class TemplateIndex:
+    """线程安全的倒排索引；按来源文件记录文档，文件变化时只重建该文件的部分"""
+
+    def __init__(self, builtin=None, directory=TEMPLATE_DIR):
+        self.directory = directory
+        self._docs = {}          # 文档ID -> Template
+        self._doc_lengths = {}   # 文档ID -> 加权词数
+        self._postings = {}      # 词 -> {文档ID: 加权词频}
+        self._sources = {}       # 来源 -> ((mtime, size), [文档ID])
+        self._total_length = 0
+        self._next_id = 0
+        self._vocabulary = []
+        self._vocabulary_dirty = False
+        self._score_cache = {}
+        self._length_norms = None
+        self._last_refresh = 0.0
+        self._lock = threading.Lock()
+        self.errors = {}         # 读取失败的模板文件 -> 错误信息
+        if builtin:
+            templates = [
+                Template(f"{category}_{name}", category, name, text)
+                for category, entries in builtin.items()
+                for name, text in entries.items()
+            ]
+            self._add_source(BUILTIN_SOURCE, None, templates)
+        self.refresh(force=True)
+
+    def __len__(self):
+        return len(self._docs)
+
+    def _invalidate_scores(self):
+        # 文档数与平均长度变化后，idf 与长度归一化都要重算
+        self._score_cache.clear()
+        self._length_norms = None
+
+    def _add_source(self, source, signature, templates):
+        self._invalidate_scores()
+        doc_ids = []
+        for template in templates:
+            doc_id = self._next_id
+            self._next_id += 1
+            weights = {}
+            for token in tokenize(template.name):
+                weights[token] = weights.get(token, 0) + NAME_WEIGHT
+            for token in tokenize(template.text):
+                weights[token] = weights.get(token, 0) + 1
+            for token, weight in weights.items():
+                postings = self._postings.get(token)
+                if postings is None:
+                    postings = self._postings[token] = {}
+                    self._vocabulary_dirty = True
+                postings[doc_id] = weight
+            length = sum(weights.values())
+            self._docs[doc_id] = template
+            self._doc_lengths[doc_id] = length
+            self._total_length += length
+            doc_ids.append(doc_id)
+        self._sources[source] = (signature, doc_ids)
+
+    def _remove_source(self, source):
+        self._invalidate_scores()
+        _, doc_ids = self._sources.pop(source)
+        for doc_id in doc_ids:
+            template = self._docs.pop(doc_id)
+            self._total_length -= self._doc_lengths.pop(doc_id)
+            for token in set(tokenize(template.name)) | set(tokenize(template.text)):
+                postings = self._postings.get(token)
+                if postings is None:
+                    continue
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[token]
+                    self._vocabulary_dirty = True
+
+    def refresh(self, force=False):
+        """检查模板目录，增量重建新增、修改或删除的文件；返回是否有变化"""
+        now = time.monotonic()
+        if not force and now - self._last_refresh < REFRESH_INTERVAL:
+            return False
+        self._last_refresh = now
+        if not self.directory or not os.path.isdir(self.directory):
+            return False
+
+        current = {}
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith((".json", ".jsonl")):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    # 扫描后被删除
+                    continue
+                current[entry.path] = (stat.st_mtime_ns, stat.st_size)
+
+        changed = False
+        with self._lock:
+            for source in [s for s in self._sources if s != BUILTIN_SOURCE and s not in current]:
+                self._remove_source(source)
+                self.errors.pop(source, None)
+                changed = True
+            for path, signature in current.items():
+                known = self._sources.get(path)
+                if known is not None and known[0] == signature:
+                    continue
+                try:
+                    templates = _load_file(path)
+                    self.errors.pop(path, None)
+                except (ValueError, KeyError, TypeError, AttributeError, OSError) as e:
+                    # 坏文件不影响其余模板；仍记下签名，文件改动之前不再重复解析
+                    record_error("template_load", e)
+                    self.errors[path] = f"{type(e).__name__}: {e}"
+                    templates = []
+                if known is not None:
+                    self._remove_source(path)
+                self._add_source(path, signature, templates)
+                changed = True
+        return changed
+
+    def _expand(self, term, prefix):
+        if not prefix:
+            return [term] if term in self._postings else []
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_dirty = False
+        start = bisect.bisect_left(self._vocabulary, term)
+        expansions = []
+        for token in self._vocabulary[start:start + MAX_PREFIX_EXPANSIONS]:
+            if not token.startswith(term):
+                break
+            expansions.append(token)
+        return expansions
+
+    def _term_scores(self, token):
+        """某个词在各文档上的 BM25 得分：(文档ID -> 得分, 按得分降序的列表)，索引变化前一直缓存"""
+        cached = self._score_cache.get(token)
+        if cached is None:
+            if self._length_norms is None:
+                average_length = self._total_length / len(self._docs)
+                self._length_norms = {
+                    doc_id: BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+                    for doc_id, length in self._doc_lengths.items()
+                }
+            postings = self._postings[token]
+            idf = math.log(1 + (len(self._docs) - len(postings) + 0.5) / (len(postings) + 0.5))
+            norms = self._length_norms
+            scores = {
+                doc_id: idf * tf * (BM25_K1 + 1) / (tf + norms[doc_id])
+                for doc_id, tf in postings.items()
+            }
+            ranked = sorted(scores.items(), key=itemgetter(1), reverse=True)
+            cached = self._score_cache[token] = (scores, ranked)
+        return cached
+
+    def search(self, query, limit=20):
+        """按相关度返回最多 limit 个模板；所有查询词都需命中（最后一个英文词按前缀）"""
+        self.refresh()
+        terms = _query_terms(query)
+        if not terms:
+            return []
+        with self._lock:
+            # 每个查询词展开为若干索引词；同一查询词取各展开中的最高分
+            expanded = []
+            for term, prefix in terms:
+                tokens = self._expand(term, prefix)
+                if not tokens:
+                    return []
+                expanded.append([self._term_scores(token) for token in tokens])
+
+            # 多词查询先在 C 层求交集，交集不大时直接逐个打分；否则用阈值算法提前终止
+            if len(expanded) > 1 and all(len(expansions) <= MAX_INTERSECT_EXPANSIONS for expansions in expanded):
+                docs = [
+                    expansions[0][0].keys() if len(expansions) == 1
+                    else set().union(*(scores.keys() for scores, _ in expansions))
+                    for expansions in expanded
+                ]
+                docs.sort(key=len)
+                candidates = set(docs[0]).intersection(*docs[1:])
+                if len(candidates) <= MAX_DIRECT_CANDIDATES:
+                    top = heapq.nlargest(limit, ((self._score(expanded, doc_id), -doc_id) for doc_id in candidates))
+                    return [self._docs[-neg_id] for _, neg_id in top]
+            return [self._docs[doc_id] for doc_id in self._threshold_top(expanded, limit)]
+
+    @staticmethod
+    def _score(expanded, doc_id):
+        total = 0.0
+        for expansions in expanded:
+            best = None
+            for scores, _ in expansions:
+                score = scores.get(doc_id)
+                if score is not None and (best is None or score > best):
+                    best = score
+            if best is None:
+                return None
+            total += best
+        return total
+
+    def _threshold_top(self, expanded, limit):
+        """Fagin 阈值算法：按得分降序并行扫描各查询词的倒排表，前 limit 名确定后提前结束"""
+        streams = [
+            heapq.merge(*(ranked for _, ranked in expansions), key=itemgetter(1), reverse=True)
+            for expansions in expanded
+        ]
+        heads = [math.inf] * len(streams)
+        seen = set()
+        top = []
+        exhausted = False
+        while not exhausted:
+            for index, stream in enumerate(streams):
+                entry = next(stream, None)
+                if entry is None:
+                    # 该词的所有文档都已见过，满足全部查询词的文档不会再出现
+                    exhausted = True
+                    break
+                doc_id, heads[index] = entry
+                if doc_id in seen:
+                    continue
+                seen.add(doc_id)
+                score = self._score(expanded, doc_id)
+                if score is None:
+                    continue
+                if len(top) < limit:
+                    heapq.heappush(top, (score, -doc_id))
+                elif (score, -doc_id) > top[0]:
+                    heapq.heapreplace(top, (score, -doc_id))
+            if len(top) == limit and top[0][0] >= sum(heads):
+                break
+        return [-neg_id for _, neg_id in sorted(top, reverse=True)]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_template_index():
+    """获取进程共享的模板索引（首次调用时构建）"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                from .catalog import PROMPT_TEMPLATES
+                _index = TemplateIndex(PROMPT_TEMPLATES)
+    return _index
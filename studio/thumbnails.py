@@ -0,0 +1,129 @@
+"""缩略图流水线：为每张作品生成一次紧凑的 WebP/JPEG 缩略图并缓存，解码与缩放在后台线程池中完成"""
+import io
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from functools import lru_cache
+
+from .image_cache import CACHE_DIR, ImageCache
+from .metrics import timed
+from .pollinations import fetch_image
+
+THUMB_DIR = os.path.join(CACHE_DIR, "thumbs")
+THUMB_MAX_BYTES = int(os.environ.get("STUDIO_THUMB_MAX_BYTES", str(256 * 1024 * 1024)))
+THUMB_SIZE = int(os.environ.get("STUDIO_THUMB_SIZE", "480"))
+THUMB_QUALITY = 80
+THUMB_WORKERS = int(os.environ.get("STUDIO_THUMB_WORKERS", str(min(4, os.cpu_count() or 1))))
+# 生成失败的URL在这段时间（秒）内不再重试，避免每次重跑都向上游重新拉取同一张失败的原图
+THUMB_RETRY_AFTER = float(os.environ.get("STUDIO_THUMB_RETRY_AFTER", "60"))
+
+
+@lru_cache(maxsize=1)
+def thumbnail_format():
+    """(PIL格式, MIME类型, 保存参数)：支持 WebP 时用 WebP，否则用 JPEG；首次生成缩略图时才导入 PIL"""
+    from PIL import features
+
+    if features.check("webp"):
+        return "WEBP", "image/webp", {"method": 4}
+    return "JPEG", "image/jpeg", {"optimize": True}
+
+
+def make_thumbnail(data, size=THUMB_SIZE):
+    """把原图字节缩放为最长边不超过 size 的缩略图字节"""
+    from PIL import Image
+
+    pil_format, _, options = thumbnail_format()
+    with timed("thumbnail"), Image.open(io.BytesIO(data)) as img:
+        # JPEG 可在解码阶段按 1/2、1/4、1/8 降采样，4K 原图不必完整解码
+        img.draft("RGB", (size, size))
+        img = img.convert("RGBA" if pil_format == "WEBP" and img.mode in ("RGBA", "LA", "P") else "RGB")
+        img.thumbnail((size, size), Image.Resampling.LANCZOS, reducing_gap=2.0)
+        buffered = io.BytesIO()
+        img.save(buffered, format=pil_format, quality=THUMB_QUALITY, **options)
+        return buffered.getvalue()
+
+
+class ThumbnailPipeline:
+    """按原图URL生成并缓存缩略图；同一URL的并发请求只处理一次"""
+
+    def __init__(self, cache, size=THUMB_SIZE, workers=THUMB_WORKERS, fetch=fetch_image):
+        self.cache = cache
+        self.size = size
+        self._fetch = fetch
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumb")
+        self._pending = {}
+        self._failed = {}   # URL -> (重试时刻, 异常)，按失败先后排列
+        self._lock = threading.Lock()
+
+    def _render(self, url, data):
+        try:
+            if data is None:
+                data = self._fetch(url)
+            thumb = make_thumbnail(data, self.size)
+            self.cache.put(url, thumb, thumbnail_format()[1])
+            return thumb
+        except Exception as e:
+            now = time.monotonic()
+            with self._lock:
+                self._failed.pop(url, None)
+                self._failed[url] = (now + THUMB_RETRY_AFTER, e)
+                # 各条目的有效期相同，最早失败的排在最前，过期的从头部清掉
+                for failed_url, (retry_at, _) in list(self._failed.items()):
+                    if retry_at > now:
+                        break
+                    del self._failed[failed_url]
+            raise
+        finally:
+            with self._lock:
+                self._pending.pop(url, None)
+
+    def get(self, url):
+        """读取已生成的缩略图，未生成返回 None"""
+        cached = self.cache.get(url)
+        return cached.data if cached is not None else None
+
+    def submit(self, url, data=None):
+        """提交后台生成任务；已有原图字节时传入 data 可省去一次读取
+
+        没有 data 且该URL最近失败过时，直接返回带着上次异常的 Future，不再向上游拉取。
+        """
+        cached = self.get(url)
+        if cached is not None:
+            future = Future()
+            future.set_result(cached)
+            return future
+        with self._lock:
+            failed = self._failed.get(url) if data is None else None
+            if failed is not None and failed[0] > time.monotonic():
+                future = Future()
+                future.set_exception(failed[1])
+                return future
+            future = self._pending.get(url)
+            if future is None:
+                future = self._pending[url] = self._executor.submit(self._render, url, data)
+            return future
+
+    def get_many(self, urls, timeout=0.0):
+        """批量获取缩略图：缺失的统一提交后最多等待 timeout 秒，未完成的返回 None"""
+        futures = {url: self.submit(url) for url in dict.fromkeys(urls)}
+        if timeout > 0:
+            wait(futures.values(), timeout=timeout)
+        return {
+            url: future.result() if future.done() and future.exception() is None else None
+            for url, future in futures.items()
+        }
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_thumbnail_pipeline():
+    """获取进程共享的缩略图流水线"""
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = ThumbnailPipeline(ImageCache(THUMB_DIR, THUMB_MAX_BYTES, name="thumbnail"))
+    return _pipeline
@@ -0,0 +1,29 @@
+"""测试使用临时的数据与缓存目录，上游指向本地替身服务；studio 在导入时读取这些环境变量，必须先于任何 studio 导入设置"""
+import os
+import tempfile
+
+import pytest
+
+from bench.fake_server import FakePollinations
+
+_root = tempfile.mkdtemp(prefix="studio-tests-")
+os.environ.setdefault("STUDIO_DATA_DIR", os.path.join(_root, "data"))
+os.environ.setdefault("STUDIO_CACHE_DIR", os.path.join(_root, "cache"))
+
+# 测试绝不访问真实的 Pollinations
+_fake = FakePollinations(seed=0).start()
+os.environ.update(_fake.environ())
+
+
+@pytest.fixture(scope="session")
+def fake_server():
+    """本地 Pollinations 替身服务；用 stats() 前后的差值判断发出了多少上游请求"""
+    return _fake
+
+
+@pytest.fixture
+def store(tmp_path):
+    """每个测试独立的作品库存储"""
+    from studio.store import GalleryStore
+
+    return GalleryStore(str(tmp_path / "gallery.sqlite3"))
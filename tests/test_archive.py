@@ -0,0 +1,90 @@
+"""导出与导入往返：跨作品库导入、旧库主键迁移、坏记录"""
+import io
+import json
+import sqlite3
+import time
+import zlib
+
+import pytest
+
+from studio.archive import import_archive, iter_export, record_to_item
+from studio.gallery import GalleryItem
+from studio.store import GalleryStore
+
+
+def _item(item_id="item0001", model="Flux 1.1 Pro"):
+    return GalleryItem(item_id, "a lighthouse at dusk", model, "flux-pro-1.1", 1024, 1024, ("油画",), 42,
+                       created=time.time())
+
+
+def _export(store, library, fmt="ndjson", compress=False):
+    return io.BytesIO(b"".join(iter_export(store, library, fmt, compress)))
+
+
+@pytest.mark.parametrize("fmt,compress", [("ndjson", False), ("json", True)])
+def test_import_into_another_library(tmp_path, fmt, compress):
+    store = GalleryStore(str(tmp_path / "gallery.sqlite3"))
+    store.add("a" * 32, _item())
+
+    assert import_archive(store, "b" * 32, _export(store, "a" * 32, fmt, compress)) == (1, 0)
+    assert len(store.history("b" * 32)) == 1
+    assert store.get("b" * 32, "item0001").prompt == "a lighthouse at dusk"
+    # 再次导入同一作品库时跳过，原作品库不受影响
+    assert import_archive(store, "b" * 32, _export(store, "a" * 32, fmt, compress)) == (0, 1)
+    assert len(store.history("a" * 32)) == 1
+
+
+def test_migrates_global_primary_key(tmp_path):
+    path = str(tmp_path / "gallery.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE items (id TEXT PRIMARY KEY, library TEXT NOT NULL, url TEXT NOT NULL, prompt TEXT NOT NULL,"
+        " model TEXT NOT NULL, model_id TEXT NOT NULL DEFAULT 'flux', width INTEGER, height INTEGER,"
+        " styles TEXT NOT NULL, seed INTEGER, created_at REAL NOT NULL, is_favorite INTEGER NOT NULL DEFAULT 0,"
+        " favorited_at REAL, in_gallery INTEGER NOT NULL DEFAULT 1, in_history INTEGER NOT NULL DEFAULT 1)"
+    )
+    conn.execute("CREATE INDEX idx_items_gallery ON items (library, in_gallery, created_at)")
+    item = _item()
+    conn.execute(
+        "INSERT INTO items (id, library, url, prompt, model, model_id, width, height, styles, seed, created_at)"
+        " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (item.id, "a" * 32, item.url, item.prompt, item.model, item.model_id, item.width, item.height,
+         json.dumps(list(item.styles)), item.seed, item.created),
+    )
+    conn.commit()
+    conn.close()
+
+    store = GalleryStore(path)
+    assert len(store.gallery("a" * 32)) == 1
+    assert import_archive(store, "b" * 32, _export(store, "a" * 32)) == (1, 0)
+    assert len(store.gallery("b" * 32)) == 1
+
+
+@pytest.mark.parametrize("record", [
+    {"id": "x", "prompt": "p", "model": None, "timestamp": "2024-01-01 00:00:00"},
+    {"id": "x", "prompt": "p", "model": "Flux", "styles": [1], "timestamp": "2024-01-01 00:00:00"},
+    ["not", "an", "object"],
+])
+def test_bad_record_raises_value_error(record):
+    with pytest.raises(ValueError):
+        record_to_item(record)
+
+
+def test_import_stops_on_bad_record(tmp_path):
+    store = GalleryStore(str(tmp_path / "gallery.sqlite3"))
+    data = json.dumps({"id": "x", "prompt": "p", "model": None, "timestamp": "2024-01-01 00:00:00"}) + "\n"
+    with pytest.raises(ValueError):
+        import_archive(store, "b" * 32, io.BytesIO(data.encode("utf-8")))
+    assert len(store.history("b" * 32)) == 0
+
+
+def test_truncated_gzip_keeps_earlier_batches(tmp_path):
+    store = GalleryStore(str(tmp_path / "gallery.sqlite3"))
+    for i in range(200):
+        store.add("a" * 32, _item(f"item{i:04d}"))
+    data = _export(store, "a" * 32, compress=True).getvalue()
+
+    with pytest.raises((EOFError, zlib.error)):
+        import_archive(store, "b" * 32, io.BytesIO(data[:len(data) // 2]), batch_size=10)
+    # 出错前提交的批次留在存储中，调用方需据此重建作品集合
+    assert 0 < len(store.history("b" * 32)) < 200
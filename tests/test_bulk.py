@@ -0,0 +1,22 @@
+"""任务记录校验：不合法的行在解析时就被拒绝，不会拼出上游无法处理的URL"""
+import pytest
+
+from studio.bulk import JobError, parse_job
+
+
+@pytest.mark.parametrize("record", [
+    {"prompt": "a", "width": True, "height": 512},
+    {"prompt": "a", "width": 512, "height": False},
+    {"prompt": "a", "width": 512.0, "height": 512},
+    {"prompt": "a", "seed": True},
+    {"prompt": "a", "seed": "42"},
+    {"prompt": "a", "seed": -1},
+])
+def test_rejects_non_integer_fields(record):
+    with pytest.raises(JobError):
+        parse_job(record)
+
+
+def test_accepts_integer_fields():
+    job = parse_job({"prompt": "a", "width": 512, "height": 768, "seed": 7})
+    assert (job.width, job.height, job.seed) == (512, 768, 7)
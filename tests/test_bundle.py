@@ -0,0 +1,59 @@
+"""打包下载：ZIP 内容、按作品顺序排列的清单、失败的作品只记入清单"""
+import io
+import json
+import time
+import zipfile
+
+from studio.bundle import MANIFEST_FILE, iter_bundle
+from studio.gallery import GalleryItem
+from studio.image_cache import CachedImage
+
+
+def _items(count, prefix="bundle"):
+    return [
+        GalleryItem(f"{prefix}{n:04d}", f"{prefix} item {n}", "Flux 1.1 Pro", "flux-pro-1.1", 64, 64, (), n,
+                    created=1_700_000_000 + n)
+        for n in range(count)
+    ]
+
+
+def _open(chunks):
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+    with archive.open(MANIFEST_FILE) as f:
+        manifest = [json.loads(line) for line in f]
+    return archive, manifest
+
+
+def test_manifest_follows_item_order_not_arrival():
+    items = _items(6)
+    ids = {item.url: n for n, item in enumerate(items)}
+
+    def fetch(url):
+        n = ids[url]
+        # 越靠前的作品越晚到达
+        time.sleep(0.02 * (len(items) - n))
+        if n == 2:
+            raise ConnectionError("upstream down")
+        return CachedImage(f"image {n}".encode(), "image/jpeg")
+
+    progress = []
+    archive, manifest = _open(iter_bundle(items, fetch=fetch, window=6,
+                                          on_progress=lambda done, entry: progress.append(entry.index)))
+    assert progress != sorted(progress)
+    assert [record["index"] for record in manifest] == [1, 2, 3, 4, 5, 6]
+    assert [record["id"] for record in manifest] == [item.id for item in items]
+    assert manifest[2]["file"] is None and manifest[2]["error"] == "upstream down"
+    for record in manifest[:2] + manifest[3:]:
+        assert archive.read(record["file"]) == f"image {record['index'] - 1}".encode()
+    assert len(archive.namelist()) == 6
+
+
+def test_bundles_from_upstream_with_a_small_window(fake_server):
+    items = _items(5, prefix="upstream")
+    before = fake_server.stats()["requests"]
+    archive, manifest = _open(iter_bundle(items, window=2))
+    assert fake_server.stats()["requests"] - before == 5
+    assert all(record["error"] is None for record in manifest)
+    for record in manifest:
+        assert archive.read(record["file"])[:2] == b"\xff\xd8"
+        assert record["bytes"] == archive.getinfo(record["file"]).file_size
@@ -0,0 +1,34 @@
+"""下载准备：原样透传与格式转换（在调用线程中完成，结果缓存）"""
+import io
+import threading
+
+from studio.downloads import Downloader
+from studio.image_cache import CachedImage, ImageCache
+
+
+def _jpeg():
+    from PIL import Image
+
+    buffered = io.BytesIO()
+    Image.new("RGB", (32, 32), (10, 120, 200)).save(buffered, format="JPEG")
+    return buffered.getvalue()
+
+
+def test_passthrough_and_cached_conversion(tmp_path):
+    data = _jpeg()
+    fetches = []
+
+    def fetch(url):
+        fetches.append(threading.current_thread())
+        return CachedImage(data, "image/jpeg")
+
+    downloader = Downloader(ImageCache(str(tmp_path), 1024 * 1024, name="test"), fetch=fetch)
+    original = downloader.prepare("https://example.test/a")
+    assert (original.data, original.mime, original.extension) == (data, "image/jpeg", "jpg")
+
+    converted = downloader.prepare("https://example.test/a", "image/png")
+    assert converted.data.startswith(b"\x89PNG") and converted.extension == "png"
+    assert fetches == [threading.current_thread()] * 2
+    # 再次请求同一格式直接读缓存，不再拉取原图
+    assert downloader.prepare("https://example.test/a", "image/png").data == converted.data
+    assert len(fetches) == 2
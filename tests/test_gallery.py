@@ -0,0 +1,79 @@
+"""会话内作品集合：画廊、收藏、历史视图的排序、筛选、分页与落库"""
+import pytest
+
+from studio.gallery import GalleryCollection, GalleryItem
+
+LIBRARY = "a" * 32
+
+
+def _item(n, model="Flux 1.1 Pro", model_id="flux-pro-1.1"):
+    return GalleryItem(f"item{n:04d}", f"prompt {n}", model, model_id, 512, 512, ("油画",), n,
+                       created=1_700_000_000 + n * 60)
+
+
+@pytest.fixture
+def collection(store):
+    collection = GalleryCollection(store, LIBRARY)
+    for n in range(1, 7):
+        collection.add(_item(n) if n % 2 else _item(n, "Turbo", "turbo"))
+    return collection
+
+
+def _ids(items):
+    return [item.id[-1] for item in items]
+
+
+def test_gallery_order_filter_and_pages(collection):
+    assert _ids(collection.gallery()) == list("654321")
+    assert _ids(collection.gallery(oldest_first=True, limit=2, offset=1)) == list("23")
+    assert _ids(collection.gallery(models=["Turbo"])) == list("642")
+    assert _ids(collection.gallery(models=["Turbo", "Flux 1.1 Pro"], oldest_first=True)) == list("123456")
+    assert collection.count_gallery(models=["Turbo"]) == 3
+    assert sorted(collection.gallery_models()) == ["Flux 1.1 Pro", "Turbo"]
+
+
+def test_favorites_keep_favorite_order(collection):
+    for item_id in ("item0005", "item0002", "item0004"):
+        collection.toggle_favorite(item_id)
+    assert _ids(collection.favorites()) == list("524")
+    assert _ids(collection.gallery(favorites_only=True)) == list("542")
+    assert collection.count_gallery(models=["Turbo"], favorites_only=True) == 2
+    assert collection.toggle_favorite("item0002") is False
+    assert collection.count_favorites() == 2
+    assert collection.toggle_favorite("missing") is None
+
+
+def test_positions_for_date_jumps(collection):
+    moment = 1_700_000_000 + 3 * 60
+    assert collection.gallery_position(moment) == 3
+    assert collection.gallery_position(moment, oldest_first=True) == 2
+    assert collection.history_position(moment) == 3
+
+
+def test_clearing_keeps_favorites_and_persists(collection, store):
+    collection.toggle_favorite("item0003")
+    collection.clear_gallery()
+    assert collection.count_gallery() == 0
+    assert collection.count_history() == 6
+    collection.clear_history()
+    assert collection.count_history() == 0
+    assert _ids(collection.favorites()) == ["3"]
+
+    reloaded = GalleryCollection(store, LIBRARY)
+    assert (reloaded.count_gallery(), reloaded.count_history()) == (0, 0)
+    assert _ids(reloaded.favorites()) == ["3"]
+    assert reloaded.total_generated == 6
+
+
+def test_reload_shares_one_object_per_item(collection, store):
+    collection.toggle_favorite("item0006")
+    reloaded = GalleryCollection(store, LIBRARY)
+    assert _ids(reloaded.gallery()) == list("654321")
+    assert reloaded.gallery(limit=1)[0] is reloaded.history(limit=1)[0] is reloaded.favorites()[0]
+
+
+def test_adopt_is_idempotent(collection):
+    item = _item(7)
+    assert collection.adopt(item)
+    assert not collection.adopt(item)
+    assert collection.count_gallery() == 7
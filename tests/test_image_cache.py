@@ -0,0 +1,52 @@
+"""磁盘图片缓存：规范化URL寻址、按字节预算的 LRU 淘汰、重启后按访问顺序重建"""
+import os
+import time
+
+from studio.image_cache import ImageCache, cache_key
+
+
+def _cache(tmp_path, max_bytes=300):
+    return ImageCache(str(tmp_path), max_bytes, name="test")
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = _cache(tmp_path)
+    for name in "abc":
+        cache.put(f"https://example.test/{name}", name.encode() * 100, "image/jpeg")
+    assert cache.get("https://example.test/a") is not None
+    cache.put("https://example.test/d", b"d" * 100, "image/jpeg")
+
+    assert cache.get("https://example.test/b") is None
+    for name in "acd":
+        assert cache.get(f"https://example.test/{name}").data == name.encode() * 100
+    assert cache.stats()["bytes"] == 300
+
+
+def test_variants_and_canonical_urls(tmp_path):
+    cache = _cache(tmp_path)
+    cache.put("https://Example.test/a%20b?width=1&seed=2", b"original", "image/jpeg")
+    cache.put("https://example.test/a b?width=1&seed=2", b"png", "image/png", variant="image/png")
+
+    hit = cache.get("https://example.test/a b?seed=2&width=1")
+    assert hit.data == b"original" and hit.content_type == "image/jpeg"
+    assert cache.get("https://example.test/a%20b?seed=2&width=1", variant="image/png").data == b"png"
+
+
+def test_oversized_entries_are_not_cached(tmp_path):
+    cache = _cache(tmp_path)
+    cache.put("https://example.test/big", b"x" * 301, "image/jpeg")
+    assert cache.get("https://example.test/big") is None
+
+
+def test_index_survives_restart_in_access_order(tmp_path):
+    cache = _cache(tmp_path)
+    for name in "ab":
+        cache.put(f"https://example.test/{name}", name.encode() * 100, "image/jpeg")
+    # 访问顺序由文件 mtime 持久化：把 a 标成更早访问过
+    old = time.time() - 60
+    key = cache_key("https://example.test/a")
+    os.utime(os.path.join(str(tmp_path), key[:2], key + ".jpg"), (old, old))
+
+    reopened = _cache(tmp_path, max_bytes=100)
+    assert reopened.stats()["entries"] == 1
+    assert reopened.get("https://example.test/b") is not None
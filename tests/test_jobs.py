@@ -0,0 +1,75 @@
+"""后台任务队列：各会话独立的收取游标、过期任务与空作品库条目的释放"""
+import io
+import time
+
+import pytest
+
+from studio import jobs
+from studio.jobs import GenerationJob, JobQueue
+from studio.store import GalleryStore
+
+
+def _png():
+    from PIL import Image
+
+    buffered = io.BytesIO()
+    Image.new("RGB", (64, 64), (200, 80, 40)).save(buffered, format="PNG")
+    return buffered.getvalue()
+
+
+@pytest.fixture
+def queue(tmp_path):
+    data = _png()
+    queue = JobQueue(GalleryStore(str(tmp_path / "gallery.sqlite3")), workers=2, fetch=lambda url: data)
+    yield queue
+    queue._executor.shutdown(wait=True)
+
+
+def _run(queue, library, prompt="a red fox", count=1):
+    job = queue.submit(GenerationJob(library, prompt, prompt, "flux", "Flux", 512, 512, seed=1, count=count))
+    deadline = time.time() + 10
+    while job.active and time.time() < deadline:
+        time.sleep(0.01)
+    assert job.status == jobs.DONE
+    return job
+
+
+def test_finished_jobs_expire_with_their_library(queue, monkeypatch):
+    _run(queue, "a" * 32)
+    assert queue.jobs("a" * 32)
+
+    monkeypatch.setattr(jobs, "JOB_RETENTION", -1)
+    assert queue.harvest("b" * 32, {}) == []
+    assert queue.jobs("a" * 32) == []
+    assert "a" * 32 not in queue._jobs
+
+
+def test_recent_jobs_are_kept(queue):
+    job = _run(queue, "a" * 32)
+    assert queue.harvest("a" * 32, {}) == job.items
+    assert queue.jobs("a" * 32) == [job]
+
+
+def test_each_cursor_harvests_every_item_once(queue):
+    first = _run(queue, "a" * 32, count=2)
+    tab_a, tab_b = {}, {}
+    assert queue.harvest("a" * 32, tab_a) == first.items
+    assert queue.harvest("a" * 32, tab_a) == []
+
+    second = _run(queue, "a" * 32, "a blue whale")
+    assert queue.harvest("a" * 32, tab_a) == second.items
+    # 另一个标签页没有被抢收，仍能拿到全部作品
+    assert queue.harvest("a" * 32, tab_b) == first.items + second.items
+    assert queue.harvest("b" * 32, {}) == []
+
+
+def test_cursor_drops_discarded_jobs(queue, monkeypatch):
+    _run(queue, "a" * 32)
+    cursor = {}
+    queue.harvest("a" * 32, cursor)
+    assert len(cursor) == 1
+
+    monkeypatch.setattr(jobs, "JOB_HISTORY", 1)
+    job = _run(queue, "a" * 32, "a blue whale")
+    assert queue.harvest("a" * 32, cursor) == job.items
+    assert list(cursor) == [job.id]
@@ -0,0 +1,28 @@
+"""页面标记跨重跑复用：app.py 每次重跑都会重新执行，缓存必须放在 studio.markup 里才真正生效"""
+import os
+
+from streamlit.testing.v1 import AppTest
+
+from studio import markup
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def test_markup_is_built_once_across_reruns():
+    at = AppTest.from_file(APP_PATH, default_timeout=60).run()
+    at.radio(key="active_view").set_value("🤖 模型对比").run()
+    at.radio(key="active_view").set_value("📚 提示词模板库").run()
+    at.text_input(key="template_search").input("portrait").run()
+    assert not at.exception
+    cards = markup.template_card_html.cache_info()
+    details = markup.model_details.cache_info()
+
+    # 再跑几次：不应再有新的构建，只有命中
+    for _ in range(3):
+        at.run()
+    at.radio(key="active_view").set_value("🤖 模型对比").run()
+    assert not at.exception
+    assert markup.template_card_html.cache_info().misses == cards.misses
+    assert markup.template_card_html.cache_info().hits > cards.hits
+    assert markup.model_details.cache_info().misses == details.misses == 1
+    assert markup.style_tag.cache_info().misses == 1
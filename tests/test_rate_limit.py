@@ -0,0 +1,70 @@
+"""限流：AIMD 并发窗口的收缩与恢复、令牌桶速率自适应与 Retry-After 暂停"""
+import threading
+import time
+
+import pytest
+
+from studio.rate_limit import AimdLimiter, TokenBucket
+
+
+def test_window_decreases_once_per_congestion_epoch():
+    limiter = AimdLimiter(initial=8, minimum=1, maximum=16, decrease=0.5)
+    tickets = [limiter.acquire() for _ in range(3)]
+    limiter.release(tickets[0], overloaded=True)
+    assert limiter.limit == 4
+    # 同一轮拥塞中早先发出的请求随后失败，不再重复收缩
+    limiter.release(tickets[1], overloaded=True)
+    assert limiter.limit == 4
+    # 收缩之后才发出的请求失败，说明仍然过载
+    limiter.release(tickets[2])
+    limiter.release(limiter.acquire(), overloaded=True)
+    assert limiter.limit == 2
+
+
+def test_window_recovers_additively():
+    limiter = AimdLimiter(initial=2, minimum=1, maximum=4, decrease=0.5)
+    limiter.release(limiter.acquire(), overloaded=True)
+    assert limiter.limit == 1
+    for _ in range(3):
+        limiter.release(limiter.acquire())
+    assert limiter.limit == 2
+    for _ in range(100):
+        limiter.release(limiter.acquire())
+    assert limiter.limit == 4
+
+
+def test_window_blocks_beyond_limit():
+    limiter = AimdLimiter(initial=1, minimum=1, maximum=1)
+    started = limiter.acquire()
+    acquired = threading.Event()
+    thread = threading.Thread(target=lambda: (limiter.acquire(), acquired.set()))
+    thread.start()
+    assert not acquired.wait(0.1)
+    limiter.release(started)
+    assert acquired.wait(2)
+    thread.join()
+
+
+def test_bucket_rate_adapts():
+    bucket = TokenBucket(rate=10, burst=10, minimum=1, maximum=20, decrease=0.5)
+    started = time.monotonic()
+    bucket.adjust(started)
+    assert bucket.rate == pytest.approx(10.1)
+    bucket.adjust(started, overloaded=True)
+    assert bucket.rate == pytest.approx(5.05)
+    # 同一轮拥塞只收缩一次
+    bucket.adjust(started, overloaded=True)
+    assert bucket.rate == pytest.approx(5.05)
+    for _ in range(1000):
+        bucket.adjust(time.monotonic())
+    assert bucket.rate == 20
+
+
+def test_bucket_pause_honors_retry_after():
+    bucket = TokenBucket(rate=1000, burst=5)
+    bucket.acquire()
+    bucket.pause(0.2)
+    assert bucket.snapshot()["tokens"] == 0
+    start = time.monotonic()
+    bucket.acquire()
+    assert time.monotonic() - start >= 0.19
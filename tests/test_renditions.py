@@ -0,0 +1,15 @@
+"""尺寸预设：超过原图的预设需要标注为放大"""
+from studio.renditions import RENDITION_PRESETS, upscale_factor, upscaled_presets
+
+
+def test_upscale_factor_covers_the_crop():
+    # 横屏原图裁竖屏：裁剪框高度占满原图，1920 < 2160 只需缩小
+    assert upscale_factor((3840, 2160), 1080, 1920) < 1
+    assert upscale_factor((1024, 1024), 3840, 2160) == 3840 / 1024
+    assert upscale_factor((None, None), 1024, 1024) is None
+
+
+def test_upscaled_presets():
+    assert upscaled_presets((1024, 1024)) == set(RENDITION_PRESETS) - {"方形 1:1 (1024x1024)"}
+    assert upscaled_presets((3840, 3840)) == set()
+    assert upscaled_presets((None, None)) == set()
@@ -0,0 +1,80 @@
+"""请求合并：同一键的并发调用只执行一次，结果与异常由所有调用方共享"""
+import threading
+import time
+
+import pytest
+
+from studio.single_flight import SingleFlight
+
+CALLERS = 5
+
+
+def _wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def _run_concurrently(flight, fn):
+    results = [None] * CALLERS
+
+    def call(index):
+        try:
+            results[index] = flight.do("key", fn)
+        except Exception as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(CALLERS)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight("test")
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        return object()
+
+    threads, results = _run_concurrently(flight, fn)
+    _wait_for(lambda: flight.coalesced == CALLERS - 1)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1 and flight.executed == 1
+    assert all(result is results[0] for result in results)
+    # 调用结束后不再合并，下一次重新执行
+    assert flight.in_flight() == 0
+    flight.do("key", fn)
+    assert len(calls) == 2
+
+
+def test_exception_is_shared():
+    flight = SingleFlight("test")
+    release = threading.Event()
+
+    def fn():
+        release.wait(5)
+        raise ValueError("upstream failed")
+
+    threads, results = _run_concurrently(flight, fn)
+    _wait_for(lambda: flight.coalesced == CALLERS - 1)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert flight.executed == 1
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_distinct_keys_run_independently():
+    flight = SingleFlight("test")
+    assert flight.do("a", lambda: 1) == 1
+    assert flight.do("b", lambda: 2) == 2
+    assert flight.executed == 2 and flight.coalesced == 0
+    with pytest.raises(KeyError):
+        flight.do("c", {}.__getitem__, "missing")
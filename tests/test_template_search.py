@@ -0,0 +1,72 @@
+"""模板索引：按相关度排序、名称命中优先、前缀匹配，以及模板目录的增量刷新"""
+import json
+import os
+
+import pytest
+
+from studio.template_search import TemplateIndex
+
+BUILTIN = {
+    "风景": {
+        "Sunset Beach": "golden hour over a quiet beach, soft waves",
+        "Mountain Lake": "alpine lake at dawn, mist, a small sunset glow on the peaks",
+    },
+    "人像": {
+        "Studio Portrait": "studio lighting portrait, shallow depth of field",
+        "赛博朋克街头": "neon city street at night, rain, cyberpunk portrait",
+    },
+}
+
+
+@pytest.fixture
+def index(tmp_path):
+    return TemplateIndex(BUILTIN, directory=str(tmp_path))
+
+
+def _names(templates):
+    return [template.name for template in templates]
+
+
+def test_name_match_ranks_first(index):
+    assert _names(index.search("sunset")) == ["Sunset Beach", "Mountain Lake"]
+    assert _names(index.search("portrait")) == ["Studio Portrait", "赛博朋克街头"]
+
+
+def test_all_terms_required_and_last_term_is_prefix(index):
+    assert _names(index.search("portrait neo")) == ["赛博朋克街头"]
+    assert _names(index.search("portrait beach")) == []
+    assert _names(index.search("赛博")) == ["赛博朋克街头"]
+    assert index.search("   ") == []
+
+
+def test_limit_keeps_the_best(index):
+    assert _names(index.search("portrait", limit=1)) == ["Studio Portrait"]
+
+
+def test_refresh_adds_updates_and_removes_files(index, tmp_path):
+    path = tmp_path / "extra.jsonl"
+    path.write_text(json.dumps({"name": "Desert Caravan", "template": "camels at sunset"}) + "\n", encoding="utf-8")
+    assert index.refresh(force=True)
+    assert len(index) == 5
+    assert "Desert Caravan" in _names(index.search("sunset"))
+
+    path.write_text(json.dumps({"name": "Snow Field", "template": "quiet snow field"}) + "\n", encoding="utf-8")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert index.refresh(force=True)
+    assert "Desert Caravan" not in _names(index.search("sunset"))
+    assert _names(index.search("snow")) == ["Snow Field"]
+
+    # 没有变化时不重建
+    assert not index.refresh(force=True)
+
+    path.unlink()
+    assert index.refresh(force=True)
+    assert len(index) == 4 and index.search("snow") == []
+
+
+def test_refresh_is_throttled(index, tmp_path):
+    (tmp_path / "late.json").write_text(json.dumps({"风景": {"Late Night": "moon"}}), encoding="utf-8")
+    assert not index.refresh()
+    assert index.refresh(force=True)
+    assert _names(index.search("moon")) == ["Late Night"]
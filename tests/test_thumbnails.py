@@ -0,0 +1,37 @@
+"""缩略图流水线：失败的URL在重试间隔内不再向上游拉取"""
+import pytest
+
+from studio import thumbnails
+from studio.image_cache import ImageCache
+from studio.thumbnails import ThumbnailPipeline
+
+
+@pytest.fixture
+def pipeline_and_fetches(tmp_path):
+    fetches = []
+
+    def fetch(url):
+        fetches.append(url)
+        raise ConnectionError("upstream down")
+
+    pipeline = ThumbnailPipeline(ImageCache(str(tmp_path), 1024 * 1024, name="test"), workers=1, fetch=fetch)
+    yield pipeline, fetches
+    pipeline._executor.shutdown(wait=True)
+
+
+def test_failed_url_is_not_refetched(pipeline_and_fetches):
+    pipeline, fetches = pipeline_and_fetches
+    with pytest.raises(ConnectionError):
+        pipeline.submit("https://example.test/a").result(timeout=5)
+    for _ in range(3):
+        assert pipeline.get_many(["https://example.test/a"]) == {"https://example.test/a": None}
+    assert fetches == ["https://example.test/a"]
+
+
+def test_failed_url_is_retried_after_interval(pipeline_and_fetches, monkeypatch):
+    pipeline, fetches = pipeline_and_fetches
+    monkeypatch.setattr(thumbnails, "THUMB_RETRY_AFTER", 0)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            pipeline.submit("https://example.test/a").result(timeout=5)
+    assert len(fetches) == 2